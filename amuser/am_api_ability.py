@@ -4,11 +4,13 @@ This module contains the ``ArchivematicaAPIAbility`` class, which represents a
 user's ability to use Archivematica's APIs to interact with Archivematica.
 """
 
+import hashlib
 import logging
 import os
 import time
 
 import requests
+from lxml import etree
 
 from . import base
 
@@ -24,86 +26,205 @@ class ArchivematicaAPIAbility(base.Base):
     interact with AM.
     """
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # SIP UUID => (SS package record, path) of the downloaded pointer files.
+        self._pointer_files = {}
+
     def download_aip(self, transfer_name, sip_uuid, ss_api_key):
         """Use the AM SS API to download the completed AIP.
         Calls http://localhost:8000/api/v2/file/<SIP-UUID>/download/\
                   ?username=<SS-USERNAME>&api_key=<SS-API-KEY>
+
+        The size of the download is verified against the SS package record
+        and its checksum against the fixity recorded in the pointer file,
+        unless the AIP is encrypted or uncompressed (the SS then sends a
+        decrypted file or a tarball made on the fly).
         """
         payload = {"username": self.ss_username, "api_key": ss_api_key}
         url = f"{self.ss_url}api/v2/file/{sip_uuid}/download/"
         aip_name = f"{transfer_name}-{sip_uuid}.7z"
         aip_path = os.path.join(self.tmp_path, aip_name)
-        max_attempts = self.max_download_aip_attempts
-        attempt = 0
-        while True:
-            r = requests.get(url, params=payload, stream=True)
-            if r.ok:
-                _save_download(r, aip_path)
-                return aip_path
-            elif r.status_code in (404, 500) and attempt < max_attempts:
-                logger.warning(
-                    "Trying again to download AIP %s via GET request to URL %s;"
-                    " SS returned status code %s and message %s",
-                    sip_uuid,
-                    url,
-                    r.status_code,
-                    r.text,
-                )
-                attempt += 1
-                time.sleep(self.optimistic_wait)
-            else:
-                logger.warning(
-                    "Unable to download AIP %s via GET request to"
-                    " URL %s; SS returned status code %s and message"
-                    " %s",
-                    sip_uuid,
-                    url,
-                    r.status_code,
-                    r.text,
-                )
-                raise ArchivematicaAPIAbilityError(f"Unable to download AIP {sip_uuid}")
+        expected_size = fixity = None
+        package = self._get_package(sip_uuid, payload)
+        if (
+            package
+            and not package.get("encrypted")
+            and os.path.splitext(package.get("current_path", ""))[1]
+        ):
+            expected_size = package.get("size")
+            fixity = self._get_package_fixity(sip_uuid, payload, package)
+        return self._download(
+            url,
+            payload,
+            aip_path,
+            f"AIP {sip_uuid}",
+            expected_size=expected_size,
+            fixity=fixity,
+        )
 
     def download_aip_pointer_file(self, sip_uuid, ss_api_key):
         """Use the AM SS API to download the completed AIP's pointer file.
         Calls http://localhost:8000/api/v2/file/<SIP-UUID>/pointer_file/\
                   ?username=<SS-USERNAME>&api_key=<SS-API-KEY>
+
+        The pointer file fetched by ``download_aip`` is reused if the SS
+        package record of the AIP has not changed since.
         """
         payload = {"username": self.ss_username, "api_key": ss_api_key}
         url = f"{self.ss_url}api/v2/file/{sip_uuid}/pointer_file/"
-        pointer_file_name = f"pointer.{sip_uuid}.xml"
-        pointer_file_path = os.path.join(self.tmp_path, pointer_file_name)
+        package = self._get_package(sip_uuid, payload)
+        pointer_file_path = self._get_downloaded_pointer_file(sip_uuid, package)
+        if pointer_file_path:
+            logger.info("Reusing the pointer file of AIP %s", sip_uuid)
+            return pointer_file_path
+        pointer_file_path = self._download(
+            url,
+            payload,
+            self._get_pointer_file_path(sip_uuid),
+            f"AIP {sip_uuid} pointer file",
+        )
+        if package:
+            self._pointer_files[sip_uuid] = package, pointer_file_path
+        return pointer_file_path
+
+    def _get_pointer_file_path(self, sip_uuid):
+        return os.path.join(self.tmp_path, f"pointer.{sip_uuid}.xml")
+
+    def _get_downloaded_pointer_file(self, sip_uuid, package):
+        """Return the path of the pointer file of the AIP if it was downloaded
+        while its SS package record was ``package``, or ``None``.
+        """
+        downloaded_package, pointer_file_path = self._pointer_files.get(
+            sip_uuid, (None, None)
+        )
+        if package and package == downloaded_package:
+            if os.path.isfile(pointer_file_path):
+                return pointer_file_path
+        return None
+
+    def _get_package(self, sip_uuid, payload):
+        """Return the SS package record of the AIP or ``None``."""
+        try:
+            r = requests.get(f"{self.ss_url}api/v2/file/{sip_uuid}/", params=payload)
+            if r.ok:
+                return r.json()
+        except (requests.RequestException, ValueError) as err:
+            logger.warning(
+                "Unable to get the SS package record of %s: %s", sip_uuid, err
+            )
+        return None
+
+    def _get_package_fixity(self, sip_uuid, payload, package):
+        """Return the message digest algorithm and the message digest of the
+        AIP recorded in its pointer file, or ``None`` if they are unknown.
+        The pointer file is kept for ``download_aip_pointer_file``.
+        """
+        pointer_file_path = self._get_downloaded_pointer_file(sip_uuid, package)
+        try:
+            if pointer_file_path:
+                doc = etree.parse(pointer_file_path)
+            else:
+                r = requests.get(
+                    f"{self.ss_url}api/v2/file/{sip_uuid}/pointer_file/",
+                    params=payload,
+                )
+                if not r.ok:
+                    return None
+                doc = etree.fromstring(r.content)
+                pointer_file_path = self._get_pointer_file_path(sip_uuid)
+                with open(pointer_file_path, "wb") as f:
+                    f.write(r.content)
+                self._pointer_files[sip_uuid] = package, pointer_file_path
+        except (requests.RequestException, etree.LxmlError, OSError) as err:
+            logger.warning("Unable to get the pointer file of %s: %s", sip_uuid, err)
+            return None
+        # The PREMIS namespace depends on the Archivematica version.
+        algorithm = doc.xpath(
+            "string(//*[local-name()='fixity']/*[local-name()='messageDigestAlgorithm'])"
+        )
+        digest = doc.xpath(
+            "string(//*[local-name()='fixity']/*[local-name()='messageDigest'])"
+        )
+        algorithm = algorithm.strip().lower().replace("-", "")
+        if not digest or algorithm not in hashlib.algorithms_available:
+            return None
+        return algorithm, digest.strip().lower()
+
+    def _download(
+        self, url, payload, file_path, description, expected_size=None, fixity=None
+    ):
+        """Stream the response to a GET request to ``url`` into ``file_path``.
+
+        Failed attempts are retried up to ``max_download_aip_attempts`` times.
+        A download interrupted midway, or stalled for
+        ``download_stall_timeout`` seconds, is resumed with an HTTP Range
+        request when the server supports it. ``expected_size`` (in bytes) and
+        ``fixity`` (a message digest algorithm and message digest pair), when
+        given, are checked once the download is complete.
+        """
         max_attempts = self.max_download_aip_attempts
         attempt = 0
+        progress = _DownloadProgress(description, expected_size, fixity)
         while True:
-            r = requests.get(url, params=payload, stream=True)
-            if r.ok:
-                _save_download(r, pointer_file_path)
-                return pointer_file_path
-            elif r.status_code in (404, 500) and attempt < max_attempts:
-                logger.warning(
-                    "Trying again to download AIP %s pointer file via GET"
-                    " request to URL %s; SS returned status code %s and message"
-                    " %s",
-                    sip_uuid,
+            headers = {}
+            if progress.size:
+                headers["Range"] = f"bytes={progress.size}-"
+            error = None
+            try:
+                # Give up on stalled connections so that they are resumed. The
+                # SS may take a long time to send the first byte of encrypted
+                # or uncompressed AIPs, which it decrypts or packs first.
+                r = requests.get(
                     url,
-                    r.status_code,
-                    r.text,
-                )
-                attempt += 1
-                time.sleep(self.optimistic_wait)
-            else:
-                logger.warning(
-                    "Unable to download AIP %s pointer file via GET"
-                    " request to URL %s; SS returned status code %s"
-                    " and message %s",
-                    sip_uuid,
-                    url,
-                    r.status_code,
-                    r.text,
-                )
-                raise ArchivematicaAPIAbilityError(
-                    f"Unable to download AIP {sip_uuid} pointer file"
+                    params=payload,
+                    headers=headers,
+                    stream=True,
+                    timeout=(self.nihilistic_wait, self.download_stall_timeout),
                 )
+                if r.status_code == 206:
+                    logger.info(
+                        "Resuming download of %s at byte %d", description, progress.size
+                    )
+                    _save_download(r, file_path, progress, self.download_chunk_size)
+                elif r.ok:
+                    progress.restart()
+                    _save_download(r, file_path, progress, self.download_chunk_size)
+                elif r.status_code not in (404, 500) or attempt >= max_attempts:
+                    logger.warning(
+                        "Unable to download %s via GET request to URL %s; SS"
+                        " returned status code %s and message %s",
+                        description,
+                        url,
+                        r.status_code,
+                        r.text,
+                    )
+                    raise ArchivematicaAPIAbilityError(
+                        f"Unable to download {description}"
+                    )
+                else:
+                    error = (
+                        f"SS returned status code {r.status_code} and message {r.text}"
+                    )
+            except requests.RequestException as err:
+                if attempt >= max_attempts:
+                    raise ArchivematicaAPIAbilityError(
+                        f"Unable to download {description}: {err}"
+                    )
+                error = err
+            if error is None and progress.is_incomplete():
+                error = f"got {progress.size} of {expected_size} bytes"
+            if error is None:
+                progress.verify()
+                return file_path
+            logger.warning(
+                "Trying again to download %s via GET request to URL %s; %s",
+                description,
+                url,
+                error,
+            )
+            attempt += 1
+            time.sleep(self.optimistic_wait)
 
     def poll_until_aip_stored(
         self, sip_uuid, ss_api_key, poll_interval=1, max_polls=None
@@ -124,7 +245,71 @@ class ArchivematicaAPIAbility(base.Base):
             time.sleep(poll_interval)
 
 
-def _save_download(request, file_path):
-    with open(file_path, "wb") as f:
-        for block in request.iter_content(1024):
+class _DownloadProgress:
+    """Track the bytes written by a download, its checksum and throughput."""
+
+    # Seconds between progress log messages.
+    log_interval = 10
+
+    def __init__(self, description, expected_size=None, fixity=None):
+        self.description = description
+        self.expected_size = expected_size
+        self.fixity = fixity
+        self.restart()
+
+    def restart(self):
+        self.size = 0
+        self.checksum = hashlib.new(self.fixity[0]) if self.fixity else None
+        self.started = self.last_logged = time.monotonic()
+
+    def update(self, block):
+        self.size += len(block)
+        if self.checksum is not None:
+            self.checksum.update(block)
+        now = time.monotonic()
+        if now - self.last_logged >= self.log_interval:
+            self.last_logged = now
+            logger.info(
+                "Downloaded %.1f of %s MB of %s (%.1f MB/s)",
+                self.size / 1e6,
+                "?"
+                if self.expected_size is None
+                else f"{self.expected_size / 1e6:.1f}",
+                self.description,
+                self.throughput(),
+            )
+
+    def throughput(self):
+        """Return the throughput since the download (re)started in MB/s."""
+        return self.size / 1e6 / max(time.monotonic() - self.started, 1e-6)
+
+    def is_incomplete(self):
+        return self.expected_size is not None and self.size < self.expected_size
+
+    def verify(self):
+        if self.expected_size is not None and self.size != self.expected_size:
+            raise ArchivematicaAPIAbilityError(
+                f"Downloaded {self.size} bytes of {self.description} but its SS"
+                f" package record has {self.expected_size}"
+            )
+        if self.checksum is not None and self.checksum.hexdigest() != self.fixity[1]:
+            raise ArchivematicaAPIAbilityError(
+                f"The {self.fixity[0]} checksum of the downloaded"
+                f" {self.description} does not match its pointer file"
+            )
+        logger.info(
+            "Downloaded %.1f MB of %s (%.1f MB/s)",
+            self.size / 1e6,
+            self.description,
+            self.throughput(),
+        )
+
+
+def _save_download(request, file_path, progress, chunk_size):
+    """Write the body of the streamed ``request`` to ``file_path``, appending
+    to it if ``progress`` says some bytes were written already.
+    """
+    with open(file_path, "ab" if progress.size else "wb") as f:
+        for block in request.iter_content(chunk_size):
             f.write(block)
+            progress.update(block)
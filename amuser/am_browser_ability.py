@@ -6,10 +6,14 @@ Archivematica. This class provides an interface to Selenium for opening browser
 windows and interacting with Archivematica's GUIs.
 """
 
+import json
 import logging
+import os
 import time
 
 import requests
+from lxml import etree
+from lxml import html
 from selenium.common.exceptions import ElementNotInteractableException
 from selenium.common.exceptions import ElementNotVisibleException
 from selenium.common.exceptions import NoSuchElementException
@@ -32,6 +36,10 @@ class ArchivematicaBrowserAbilityError(base.ArchivematicaUserError):
     pass
 
 
+class ProcessingConfigFormError(ArchivematicaBrowserAbilityError):
+    """The processing config form could not be used without a browser."""
+
+
 class ArchivematicaBrowserAbility(
     auth_abl.ArchivematicaBrowserAuthenticationAbility,
     tra_ing_abl.ArchivematicaBrowserTransferIngestAbility,
@@ -45,21 +53,114 @@ class ArchivematicaBrowserAbility(
 
     @property
     def ss_api_key(self):
+        """Return the API key of the SS user. It is read from the SS API key
+        cache file if it is still valid there; otherwise it is retrieved by
+        logging into the SS with ``requests`` (or with the browser, if that
+        fails) and written to the cache file.
+        """
         if not self._ss_api_key:
-            self.driver.get(self.get_ss_login_url())
-            self.driver.find_element(By.ID, "id_username").send_keys(self.ss_username)
-            self.driver.find_element(By.ID, "id_password").send_keys(self.ss_password)
-            self.driver.find_element(
-                By.CSS_SELECTOR, c.varvn("SELECTOR_SS_LOGIN_BUTTON", self.vn)
-            ).click()
-            self.driver.get(self.get_default_ss_user_edit_url())
-            block = WebDriverWait(self.driver, 20)
-            block.until(EC.presence_of_element_located((By.CSS_SELECTOR, "code")))
-            self._ss_api_key = self.driver.find_element(
-                By.TAG_NAME, "code"
-            ).text.strip()
+            self._ss_api_key = self._get_cached_ss_api_key()
+        if not self._ss_api_key:
+            try:
+                self._ss_api_key = self._get_ss_api_key_html()
+            except (
+                requests.RequestException,
+                etree.LxmlError,
+                ArchivematicaBrowserAbilityError,
+            ) as err:
+                logger.warning(
+                    "Unable to get the SS API key without a browser: %s", err
+                )
+                self._ss_api_key = self._get_ss_api_key_from_browser()
+            self._cache_ss_api_key(self._ss_api_key)
         return self._ss_api_key
 
+    def _get_ss_api_key_html(self):
+        """Log into the SS with a ``requests`` session and return the API key
+        shown in the user edit page.
+        """
+        session = requests.session()
+        login_url = self.get_ss_login_url()
+        r = session.get(login_url)
+        r.raise_for_status()
+        login_form = _get_login_form(r.content, r.url)
+        login_form.fields["username"] = self.ss_username
+        login_form.fields["password"] = self.ss_password
+        r = session.post(
+            login_form.action or r.url,
+            data=login_form.form_values(),
+            headers={"Referer": r.url},
+        )
+        r.raise_for_status()
+        user_edit_url = self.get_default_ss_user_edit_url()
+        r = session.get(user_edit_url)
+        r.raise_for_status()
+        page = html.fromstring(r.content)
+        if page.xpath("//input[@name='password']"):
+            raise ArchivematicaBrowserAbilityError(
+                f"Unable to log into the SS at {login_url}"
+            )
+        code_els = page.xpath("//code")
+        if not code_els or not code_els[0].text_content().strip():
+            raise ArchivematicaBrowserAbilityError(
+                f"No API key in the SS user edit page {user_edit_url}"
+            )
+        return code_els[0].text_content().strip()
+
+    def _get_ss_api_key_from_browser(self):
+        self.driver.get(self.get_ss_login_url())
+        self.driver.find_element(By.ID, "id_username").send_keys(self.ss_username)
+        self.driver.find_element(By.ID, "id_password").send_keys(self.ss_password)
+        self.driver.find_element(
+            By.CSS_SELECTOR, c.varvn("SELECTOR_SS_LOGIN_BUTTON", self.vn)
+        ).click()
+        self.driver.get(self.get_default_ss_user_edit_url())
+        block = WebDriverWait(self.driver, 20)
+        block.until(EC.presence_of_element_located((By.CSS_SELECTOR, "code")))
+        return self.driver.find_element(By.TAG_NAME, "code").text.strip()
+
+    @property
+    def _ss_api_key_cache_key(self):
+        return f"{self.ss_username}@{self.ss_url.rstrip('/')}"
+
+    def _get_cached_ss_api_key(self):
+        """Return the SS API key in the cache file if the SS still accepts it."""
+        if not self.ss_api_key_cache_path:
+            return None
+        path = os.path.expanduser(self.ss_api_key_cache_path)
+        ss_api_key = _read_ss_api_key_cache(path).get(self._ss_api_key_cache_key)
+        if not ss_api_key:
+            return None
+        try:
+            r = requests.get(
+                f"{self.ss_url}api/v2/pipeline/",
+                params={
+                    "username": self.ss_username,
+                    "api_key": ss_api_key,
+                    "limit": 1,
+                },
+            )
+        except requests.RequestException as err:
+            logger.warning("Unable to check the cached SS API key: %s", err)
+            return None
+        if r.status_code != requests.codes.ok:
+            logger.info(
+                "The SS rejected the cached API key of %s with status code %s",
+                self.ss_username,
+                r.status_code,
+            )
+            return None
+        return ss_api_key
+
+    def _cache_ss_api_key(self, ss_api_key):
+        if not self.ss_api_key_cache_path or not ss_api_key:
+            return
+        path = os.path.expanduser(self.ss_api_key_cache_path)
+        try:
+            _write_ss_api_key_cache(path, self._ss_api_key_cache_key, ss_api_key)
+        except OSError as err:
+            logger.warning("Unable to write the SS API key cache %s: %s", path, err)
+
     def get_displayed_tabs(self):
         ret = []
         for li_el in self.driver.find_element(
@@ -142,15 +243,7 @@ class ArchivematicaBrowserAbility(
         url = self.get_aip_in_archival_storage_url(aip_uuid)
         max_attempts = self.max_navigate_aip_archival_storage_attempts
         attempt = 0
-        s = requests.session()
-        s.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 6.3; WOW64) AppleWebKit/537.36 (KHTML,"
-                " like Gecko) Chrome/44.0.2403.157 Safari/537.36"
-            }
-        )
-        for cookie in self.driver.get_cookies():
-            s.cookies.update({cookie["name"]: cookie["value"]})
+        s = self.get_cookie_session()
         while True:
             if attempt > max_attempts:
                 raise ArchivematicaBrowserAbilityError(f"Unable to navigate to {url}")
@@ -410,9 +503,84 @@ class ArchivematicaBrowserAbility(
             decision_el.clear()
             decision_el.send_keys(choice_value)
 
-    def ensure_default_processing_config_in_default_state(self):
+    def set_processing_config_decisions(self, decisions):
+        """Set the decisions of the default processing config to the choices
+        in ``decisions``, a dict from decision labels to choice values (e.g.,
+        ``{"Store AIP": "Yes"}``), and save it.
+
+        The edit form is requested with the cookies of the browser and only the
+        decisions whose current choices differ are changed, in a single
+        submission of the form; nothing is submitted if none differ. If the
+        form cannot be used that way, the decisions are set one by one in the
+        browser. Return ``True`` if the config was saved.
+        """
+        try:
+            return self._set_processing_config_decisions_html(decisions)
+        except (
+            requests.RequestException,
+            etree.LxmlError,
+            ProcessingConfigFormError,
+        ) as err:
+            logger.warning(
+                "Unable to set the processing config decisions without a"
+                " browser: %s",
+                err,
+            )
+        for decision_label, choice_value in decisions.items():
+            self.set_processing_config_decision(
+                decision_label=decision_label, choice_value=choice_value
+            )
+        self.save_default_processing_config()
+        return True
+
+    def _set_processing_config_decisions_html(self, decisions):
+        edit_default_processing_config_url = (
+            self.get_edit_default_processing_config_url()
+        )
+        with self.get_cookie_session() as session:
+            r = session.get(edit_default_processing_config_url)
+            r.raise_for_status()
+            form = _get_processing_config_form(r.content, r.url)
+            form_values = form.form_values()
+            current_values = dict(form_values)
+            changes = {}
+            for decision_label, choice_value in decisions.items():
+                name, value = _get_processing_config_choice(
+                    form, decision_label, choice_value
+                )
+                if current_values.get(name) != value:
+                    changes[name] = value
+            if not changes:
+                logger.info("The default processing config needs no changes")
+                return False
+            data = [(name, changes.get(name, value)) for name, value in form_values]
+            data.extend(
+                (name, value)
+                for name, value in changes.items()
+                if name not in current_values
+            )
+            r = session.post(
+                form.action or edit_default_processing_config_url,
+                data=data,
+                headers={"Referer": edit_default_processing_config_url},
+            )
+            r.raise_for_status()
+            # The form is shown again, with its errors, unless it is saved.
+            if not r.history:
+                raise ProcessingConfigFormError(
+                    f"The processing config form at {edit_default_processing_config_url}"
+                    " was not accepted"
+                )
+        logger.info("Saved %s change(s) to the default processing config", len(changes))
+        # The form in the browser, if open, no longer shows the saved config.
+        if self.driver.current_url == edit_default_processing_config_url:
+            self.navigate(edit_default_processing_config_url, reload=True)
+        return True
+
+    def ensure_default_processing_config_in_default_state(self, decisions=None):
         """Make sure that the default processing config is in its default
-        state.
+        state, with the choices in ``decisions`` (see
+        ``set_processing_config_decisions``) on top of it, if given.
 
         The following JavaScript in the browser console will summarize the
         needed details of the default state of the default processing config::
@@ -431,90 +599,40 @@ class ArchivematicaBrowserAbility(
                 })
             });
         """
-        self.set_processing_config_decision(
-            decision_label="Generate transfer structure report", choice_value="No"
-        )
-        self.set_processing_config_decision(
-            decision_label=("Perform file format identification (Transfer)"),
-            choice_value="None",
-        )
-        self.set_processing_config_decision(
-            decision_label="Extract packages", choice_value="Yes"
-        )
-        self.set_processing_config_decision(
-            decision_label="Delete packages after extraction", choice_value="Yes"
-        )
-        self.set_processing_config_decision(
-            decision_label="Examine contents", choice_value="Skip examine contents"
-        )
-        self.set_processing_config_decision(
-            decision_label="Create SIP(s)", choice_value="None"
-        )
-        self.set_processing_config_decision(
-            decision_label="Perform file format identification (Ingest)",
-            choice_value="No, use existing data",
-        )
-        self.set_processing_config_decision(
-            decision_label="Normalize", choice_value="None"
-        )
-        self.set_processing_config_decision(
-            decision_label="Approve normalization", choice_value="None"
-        )
-        self.set_processing_config_decision(
-            decision_label="Reminder: add metadata if desired", choice_value="Continue"
-        )
-        self.set_processing_config_decision(
-            decision_label="Transcribe files (OCR)", choice_value="No"
-        )
-        self.set_processing_config_decision(
-            decision_label=(
-                "Perform file format identification (Submission documentation & metadata)"
-            ),
-            choice_value="None",
-        )
-        self.set_processing_config_decision(
-            decision_label="Select compression algorithm", choice_value="7z using bzip2"
-        )
-        self.set_processing_config_decision(
-            decision_label="Select compression level",
-            choice_value="5 - normal compression",
-        )
-        self.set_processing_config_decision(
-            decision_label="Store AIP", choice_value="None"
-        )
-        self.set_processing_config_decision(
-            decision_label="Store AIP location", choice_value="None"
-        )
-        self.set_processing_config_decision(
-            decision_label="Store DIP location", choice_value="None"
-        )
+        default_decisions = {
+            "Generate transfer structure report": "No",
+            "Perform file format identification (Transfer)": "None",
+            "Extract packages": "Yes",
+            "Delete packages after extraction": "Yes",
+            "Examine contents": "Skip examine contents",
+            "Create SIP(s)": "None",
+            "Perform file format identification (Ingest)": "No, use existing data",
+            "Normalize": "None",
+            "Approve normalization": "None",
+            "Reminder: add metadata if desired": "Continue",
+            "Transcribe files (OCR)": "No",
+            "Perform file format identification (Submission documentation & metadata)": "None",
+            "Select compression algorithm": "7z using bzip2",
+            "Select compression level": "5 - normal compression",
+            "Store AIP": "None",
+            "Store AIP location": "None",
+            "Store DIP location": "None",
+        }
         if self.vn in ("1.7", "1.8"):
-            self.set_processing_config_decision(
-                decision_label="Perform policy checks on access derivatives",
-                choice_value="None",
-            )
-            self.set_processing_config_decision(
-                decision_label="Perform policy checks on originals", choice_value="None"
-            )
-            self.set_processing_config_decision(
-                decision_label="Perform policy checks on preservation derivatives",
-                choice_value="None",
-            )
-            self.set_processing_config_decision(
-                decision_label="Assign UUIDs to directories", choice_value="None"
-            )
-            self.set_processing_config_decision(
-                decision_label="Bind PIDs", choice_value="None"
-            )
-            self.set_processing_config_decision(
-                decision_label="Document empty directories", choice_value="None"
+            default_decisions.update(
+                {
+                    "Perform policy checks on access derivatives": "None",
+                    "Perform policy checks on originals": "None",
+                    "Perform policy checks on preservation derivatives": "None",
+                    "Assign UUIDs to directories": "None",
+                    "Bind PIDs": "None",
+                    "Document empty directories": "None",
+                }
             )
         if self.vn in ("1.8",):
-            self.set_processing_config_decision(
-                decision_label="Generate thumbnails", choice_value="No"
-            )
-
-        self.save_default_processing_config()
+            default_decisions["Generate thumbnails"] = "No"
+        default_decisions.update(decisions or {})
+        self.set_processing_config_decisions(default_decisions)
 
     # ==========================================================================
     # New Installation
@@ -576,3 +694,84 @@ def _get_decision_id_from_label(decision_label):
             "Unable to determine a decision id given input parameters"
         )
     return decision_id
+
+
+def _get_processing_config_form(content, url):
+    """Return the lxml form of the processing config edit page ``content``."""
+    page = html.fromstring(content, base_url=url)
+    if page.xpath("//input[@name='password']"):
+        raise ProcessingConfigFormError(f"Not logged in when requesting {url}")
+    for form in page.forms:
+        if form.xpath(".//input[@value='Save']"):
+            return form
+    raise ProcessingConfigFormError(f"No processing config form at {url}")
+
+
+def _get_processing_config_choice(form, decision_label, choice_value):
+    """Return the name of the field of the decision labelled ``decision_label``
+    in the processing config ``form`` and the value of its choice
+    ``choice_value``, as ``set_processing_config_decision`` would pick it.
+    """
+    try:
+        decision_id = _get_decision_id_from_label(decision_label)
+    except ArchivematicaBrowserAbilityError as err:
+        raise ProcessingConfigFormError(f"{err}: {decision_label}") from err
+    decision_els = form.xpath(".//*[@id=$id]", id=decision_id)
+    if not decision_els:
+        raise ProcessingConfigFormError(
+            f"No processing config decision {decision_label} ({decision_id})"
+        )
+    decision_el = decision_els[0]
+    if decision_el.tag != "select":
+        return decision_el.get("name"), choice_value
+    for option_el in decision_el.iter("option"):
+        text = " ".join(option_el.text_content().split())
+        if text == choice_value:
+            return decision_el.get("name"), option_el.get("value", text)
+    raise ProcessingConfigFormError(
+        f'No choice "{choice_value}" for processing config decision'
+        f" {decision_label}"
+    )
+
+
+def _get_login_form(content, url):
+    """Return the lxml form of the login page ``content``."""
+    page = html.fromstring(content, base_url=url)
+    for form in page.forms:
+        if "username" in form.fields and "password" in form.fields:
+            return form
+    raise ArchivematicaBrowserAbilityError(f"No login form at {url}")
+
+
+def _read_ss_api_key_cache(path):
+    """Return the dict of SS API keys in the cache file at ``path``, which is
+    empty if the file does not exist or cannot be read.
+    """
+    try:
+        with open(path) as cache_file:
+            cache = json.load(cache_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as err:
+        logger.warning("Unable to read the SS API key cache %s: %s", path, err)
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_ss_api_key_cache(path, key, ss_api_key):
+    """Add ``ss_api_key`` to the cache file at ``path`` under ``key``. The file
+    is only readable and writable by its owner and is replaced atomically.
+    """
+    cache = _read_ss_api_key_cache(path)
+    cache[key] = ss_api_key
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(cache, cache_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -5,6 +5,7 @@ import os
 import tempfile
 import time
 
+import requests
 import tenacity
 from amclient import AMClient
 from lxml import etree
@@ -34,6 +35,9 @@ class ArchivematicaBrowserIngestAbility(selenium_ability.ArchivematicaSeleniumAb
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.click_aip_directory_attempts = 0
+        # Transfer name => SIP UUID. The abilities are created for each
+        # scenario, so this only lives as long as the scenario.
+        self._sip_uuids = {}
 
     def remove_all_ingests(self):
         """Remove all ingests in the Ingest tab."""
@@ -50,16 +54,57 @@ class ArchivematicaBrowserIngestAbility(selenium_ability.ArchivematicaSeleniumAb
             self.remove_top_transfer(top_transfer_elem)
 
     def get_sip_uuid(self, transfer_name):
+        """Return the UUID of the SIP created from the transfer named
+        ``transfer_name``. It is looked up in the ingest status JSON of the
+        dashboard with the cookies of the browser and remembered for the rest
+        of the scenario. The Ingest tab is only scanned in a new browser if
+        that fails.
+        """
+        sip_uuid = self._sip_uuids.get(transfer_name)
+        if sip_uuid:
+            return sip_uuid
         logger.info("Getting SIP UUID from transfer name %s", transfer_name)
-        self.driver.quit()
-        self.driver = self.get_driver()
+        try:
+            sip_uuid = self._get_sip_uuid_from_status(transfer_name)
+        except (requests.RequestException, ValueError) as err:
+            logger.warning(
+                "Unable to get the SIP UUID of %s from the ingest status: %s",
+                transfer_name,
+                err,
+            )
+            sip_uuid = self._get_sip_uuid_from_dom(transfer_name)
+        logger.info("Got SIP UUID %s", sip_uuid)
+        if sip_uuid:
+            self._sip_uuids[transfer_name] = sip_uuid
+        return sip_uuid
+
+    def _get_sip_uuid_from_status(self, transfer_name):
+        """Poll the ingest status JSON until it lists a SIP named
+        ``transfer_name`` and return its UUID, or ``None`` if it does not
+        appear as long as ``wait_for_transfer_to_appear`` would wait for it.
+
+        Raise ``ValueError`` if the response is not the status JSON, e.g.,
+        because the browser is not logged in.
+        """
+        status_url = self.get_ingest_status_url()
+        timeout = self.max_check_transfer_appeared_attempts * self.quick_wait
+        with self.get_cookie_session() as session:
+            for _ in utils.poll(timeout, self.quick_wait, self.apathetic_wait):
+                r = session.get(status_url, headers={"Accept": "application/json"})
+                r.raise_for_status()
+                sip_uuid = _get_sip_uuid_from_status(r.json(), transfer_name)
+                if sip_uuid:
+                    return sip_uuid
+        return None
+
+    def _get_sip_uuid_from_dom(self, transfer_name):
+        self.replace_driver()
         ingest_url = self.get_ingest_url()
         self.driver.get(ingest_url)
         if self.driver.current_url != ingest_url:
             self.login()
         self.driver.get(ingest_url)
         sip_uuid, _, _ = self.wait_for_transfer_to_appear(transfer_name)
-        logger.info("Got SIP UUID %s", sip_uuid)
         return sip_uuid
 
     @tenacity.retry(stop=tenacity.stop_after_attempt(20), wait=tenacity.wait_fixed(15))
@@ -195,8 +240,7 @@ class ArchivematicaBrowserIngestAbility(selenium_ability.ArchivematicaSeleniumAb
         normalization report, parse it and return a list of dicts.
         """
         report = []
-        self.driver.quit()
-        self.driver = self.get_driver()
+        self.replace_driver()
         url = self.get_ingest_url()
         self.driver.get(url)
         if self.driver.current_url != url:
@@ -223,3 +267,21 @@ class ArchivematicaBrowserIngestAbility(selenium_ability.ArchivematicaSeleniumAb
                 row[keys[index]] = td_el.text
             report.append(row)
         return report
+
+
+def _get_sip_uuid_from_status(status, transfer_name):
+    """Return the UUID of the most recent SIP named ``transfer_name`` in the
+    ingest ``status`` JSON, or ``None``. The directory of a SIP may or may not
+    include its UUID as a suffix.
+    """
+    if not isinstance(status, dict) or not isinstance(status.get("objects"), list):
+        raise ValueError("Unexpected ingest status JSON")
+    matches = []
+    for sip in status["objects"]:
+        sip_uuid = sip.get("uuid")
+        directory = (sip.get("directory") or "").rstrip("/")
+        if sip_uuid and directory in (transfer_name, f"{transfer_name}-{sip_uuid}"):
+            matches.append((sip.get("timestamp") or 0, sip_uuid))
+    if not matches:
+        return None
+    return max(matches)[1]
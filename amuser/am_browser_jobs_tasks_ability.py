@@ -1,43 +1,62 @@
 """Archivematica Browser Jobs & Tasks Ability"""
 
+import concurrent.futures
 import logging
-import sys
+import math
+import threading
 import time
+from urllib import parse
 
+import requests
+from amclient import AMClient
+from lxml import etree
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 
+from . import base
 from . import constants as c
+from . import dashboard
 from . import selenium_ability
 from . import utils
 
 logger = logging.getLogger("amuser.jobstasks")
 
 
+class ArchivematicaBrowserJobsTasksAbilityError(base.ArchivematicaUserError):
+    pass
+
+
+class JobWaitTimeoutError(base.ArchivematicaUserError):
+    """Raised when a job does not appear, or does not reach one of the
+    expected outputs, before the deadline.
+    """
+
+    def __init__(self, ms_name, unit_uuid, timeout, job_output=None):
+        self.ms_name = ms_name
+        self.unit_uuid = unit_uuid
+        self.timeout = timeout
+        self.job_output = job_output
+        super().__init__(
+            f'Gave up waiting for job "{ms_name}" of unit {unit_uuid} after'
+            f" {timeout} seconds; last job output: {job_output}"
+        )
+
+
 class ArchivematicaBrowserJobsTasksAbility(
     selenium_ability.ArchivematicaSeleniumAbility
 ):
     """Archivematica Browser Jobs & Tasks Ability."""
 
-    @selenium_ability.recurse_on_stale
     def get_job_output(self, ms_name, transfer_uuid):
         """Get the output---"Completed successfully", "Failed"---of the Job
         model representing the execution of micro-service ``ms_name`` in
         transfer ``transfer_uuid``.
         """
         ms_name, group_name = utils.micro_service2group(ms_name)
-        ms_group_elem = self.get_transfer_micro_service_group_elem(
-            group_name, transfer_uuid
-        )
-        for job_elem in ms_group_elem.find_elements(By.CSS_SELECTOR, "div.job"):
-            for span_elem in job_elem.find_elements(
-                By.CSS_SELECTOR, "div.job-detail-microservice span"
-            ):
-                if span_elem.text.strip() == ms_name:
-                    return job_elem.find_element(
-                        By.CSS_SELECTOR, "div.job-detail-currentstep span"
-                    ).text.strip()
-        return None
+        job = self._find_job(ms_name, group_name, transfer_uuid, squash=False)
+        if job is None:
+            return None
+        return job["output"]
 
     def expose_job(self, ms_name, transfer_uuid, unit_type="transfer"):
         """Expose (i.e., click MS group and wait for appearance of) the job
@@ -103,15 +122,77 @@ class ArchivematicaBrowserJobsTasksAbility(
         # Selenium driver; then parse the table there.
         table_dict = {"job_output": job_output, "tasks": {}}
         tasks_url = self.get_tasks_url(job_uuid)
-        table_dict = self.parse_tasks_table(tasks_url, table_dict)
+        table_dict = self.parse_tasks_table(
+            tasks_url,
+            table_dict,
+            task_count=self._get_job_task_count(transfer_uuid, job_uuid),
+        )
         return table_dict
 
-    def parse_tasks_table(self, tasks_url, table_dict):
+    def parse_tasks_table(self, tasks_url, table_dict, task_count=None):
+        """Parse the tasks at ``tasks_url`` into ``table_dict``. The pages of
+        tasks are requested with the cookies of the browser and parsed as HTML;
+        when ``task_count`` is known, all the pages after the first one are
+        requested concurrently. A new browser is used if that fails.
+        """
+        try:
+            return self._parse_tasks_table_html(tasks_url, table_dict, task_count)
+        except (
+            requests.RequestException,
+            etree.LxmlError,
+            ArchivematicaBrowserJobsTasksAbilityError,
+        ) as err:
+            logger.warning(
+                "Unable to get the tasks at %s without a browser: %s", tasks_url, err
+            )
         old_driver = self.driver
         table_dict = self._parse_tasks_table_am_gte_1_7(tasks_url, table_dict)
         self.driver = old_driver
         return table_dict
 
+    def _parse_tasks_table_html(self, tasks_url, table_dict, task_count=None):
+        with self.get_cookie_session() as session:
+            page = _get_tasks_page(session, tasks_url)
+            page_size = _parse_tasks_page(page, table_dict)
+            next_tasks_url = _get_next_tasks_url(page, tasks_url)
+            page_urls = _get_tasks_page_urls(next_tasks_url, task_count, page_size)
+            if page_urls:
+                with _ThreadSessions(session) as sessions:
+                    with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=c.MAX_CONCURRENT_TASKS_PAGE_REQUESTS
+                    ) as executor:
+                        for page in executor.map(sessions.get_tasks_page, page_urls):
+                            _parse_tasks_page(page, table_dict)
+                return table_dict
+            while next_tasks_url:
+                page = _get_tasks_page(session, next_tasks_url)
+                _parse_tasks_page(page, table_dict)
+                next_tasks_url = _get_next_tasks_url(page, next_tasks_url)
+        return table_dict
+
+    def _get_job_task_count(self, unit_uuid, job_uuid):
+        """Return the number of tasks of the job according to the jobs API, or
+        ``None`` if the API cannot be used.
+        """
+        if not self.am_api_key:
+            return None
+        jobs = self._get_am_client(unit_uuid).get_jobs()
+        if not isinstance(jobs, list):
+            return None
+        for job in jobs:
+            if job.get("uuid") == job_uuid:
+                return len(job.get("tasks", []))
+        return None
+
+    def _get_am_client(self, unit_uuid, **kwargs):
+        return AMClient(
+            am_api_key=self.am_api_key,
+            am_user_name=self.am_username,
+            am_url=self.am_url.rstrip("/"),
+            unit_uuid=unit_uuid,
+            **kwargs,
+        )
+
     def _parse_tasks_table_am_gte_1_7(self, tasks_url, table_dict):
         """Parse all the Task <article> elements at ``task_url`` and return
         them as a dict in ``table_dict``. Note: <table> elements are no longer
@@ -168,50 +249,276 @@ class ArchivematicaBrowserJobsTasksAbility(
             table_dict = self._parse_tasks_table_am_gte_1_7(next_tasks_url, table_dict)
         return table_dict
 
-    @selenium_ability.recurse_on_stale
     def get_job_uuid(
         self,
         ms_name,
         group_name,
         transfer_uuid,
         job_outputs=c.JOB_OUTPUTS_COMPLETE,
-        level=0,
     ):
         """Get the UUID of the Job model representing the execution of
-        micro-service ``ms_name`` in transfer ``transfer_uuid``.
+        micro-service ``ms_name`` in transfer ``transfer_uuid``, once its
+        output is one of ``job_outputs``. Return the UUID and the output.
+
+        The job is checked through the jobs API when there is an AM API key and
+        in the dashboard otherwise, or if the API cannot be used. Return
+        ``(None, None)`` if there is no such job.
         """
-        ms_group_elem = self.get_transfer_micro_service_group_elem(
-            group_name, transfer_uuid
+        if self.am_api_key:
+            try:
+                return self.wait_for_job(
+                    ms_name,
+                    group_name,
+                    transfer_uuid,
+                    job_outputs=job_outputs,
+                    missing_timeout=self.nihilistic_wait,
+                )
+            except ArchivematicaBrowserJobsTasksAbilityError as err:
+                logger.warning("%s; checking the dashboard instead", err)
+        return self._get_job_uuid_from_dom(
+            ms_name, group_name, transfer_uuid, job_outputs
         )
-        for job_elem in ms_group_elem.find_elements(By.CSS_SELECTOR, "div.job"):
-            for span_elem in job_elem.find_elements(
-                By.CSS_SELECTOR, "div.job-detail-microservice span"
-            ):
-                if utils.squash(span_elem.text) == utils.squash(ms_name):
-                    job_output = job_elem.find_element(
-                        By.CSS_SELECTOR, "div.job-detail-currentstep span"
-                    ).text.strip()
-                    if job_output in job_outputs:
-                        return (span_elem.get_attribute("title").strip(), job_output)
-                    if level < (sys.getrecursionlimit() / 2):
-                        # The job is taking a long time to complete. Half the
-                        # amount of checking to avoid stack-overflow.
-                        logger.warning(
-                            f"Recursion limit close to being reached: level: {level} <= {sys.getrecursionlimit()}"
-                        )
-                        time.sleep(self.quick_wait)
-                    else:
-                        time.sleep(self.optimistic_wait)
-                    level += 1
-                    try:
-                        return self.get_job_uuid(
-                            ms_name, group_name, transfer_uuid, level=level
-                        )
-                    except RecursionError:
-                        logger.error(
-                            "Recursion depth exceeded attempting to get job UUID, consider re-running the test"
-                        )
-        return None, None
+
+    def wait_for_job(
+        self,
+        ms_name,
+        group_name,
+        unit_uuid,
+        job_outputs=c.JOB_OUTPUTS_COMPLETE,
+        timeout=None,
+        missing_timeout=None,
+    ):
+        """Poll the jobs API until the job of micro-service ``ms_name`` in
+        group ``group_name`` of the unit with UUID ``unit_uuid`` exists and,
+        unless ``job_outputs`` is ``None``, its output is one of
+        ``job_outputs``. Return the UUID and the output of the job, or
+        ``(None, None)`` if ``missing_timeout`` is given and the job does not
+        exist after that many seconds.
+
+        Raise ``JobWaitTimeoutError`` after ``timeout`` seconds (by default,
+        ``job_wait_timeout``) and ``ArchivematicaBrowserJobsTasksAbilityError``
+        if the API does not respond to the first request.
+        """
+        timeout = timeout or self.job_wait_timeout
+        am_client = self._get_am_client(unit_uuid, job_microservice=group_name)
+        job_output = None
+        started = time.monotonic()
+        for attempt, _ in enumerate(
+            utils.poll(timeout, self.quick_wait, self.apathetic_wait)
+        ):
+            jobs = am_client.get_jobs()
+            if not isinstance(jobs, list):
+                if attempt == 0:
+                    raise ArchivematicaBrowserJobsTasksAbilityError(
+                        f"Unable to get the jobs of unit {unit_uuid} from the API"
+                    )
+                continue
+            matching_jobs = [
+                job
+                for job in jobs
+                if utils.squash(job.get("name", "")) == utils.squash(ms_name)
+            ]
+            if not matching_jobs:
+                if (
+                    missing_timeout is not None
+                    and time.monotonic() - started >= missing_timeout
+                ):
+                    return None, None
+                continue
+            job = _get_latest_job(matching_jobs)
+            job_output = c.JOB_STATUSES2OUTPUTS.get(job["status"], job["status"])
+            if job_outputs is None or job_output in job_outputs:
+                return job["uuid"], job_output
+        raise JobWaitTimeoutError(ms_name, unit_uuid, timeout, job_output)
+
+    def _get_job_uuid_from_dom(self, ms_name, group_name, transfer_uuid, job_outputs):
+        """Dashboard version of ``get_job_uuid``. Return ``(None, None)`` if
+        the job is not in the micro-service group.
+        """
+        timeout = self.job_wait_timeout
+        job_output = None
+        for _ in utils.poll(timeout, self.quick_wait, self.apathetic_wait):
+            job = self._find_job(ms_name, group_name, transfer_uuid)
+            if job is None:
+                return None, None
+            job_output = job["output"]
+            if job_output in job_outputs:
+                return job["uuid"], job_output
+        raise JobWaitTimeoutError(ms_name, transfer_uuid, timeout, job_output)
+
+    def _get_micro_service_group(self, group_name, transfer_uuid):
+        """Return the micro-service group ``group_name`` of the unit with UUID
+        ``transfer_uuid`` in a new snapshot of the dashboard, or ``None``.
+        """
+        snapshot = self.get_dashboard_snapshot()
+        if snapshot.get_unit(transfer_uuid) is None:
+            logger.warning("Unable to find Transfer %s.", transfer_uuid)
+            return None
+        return snapshot.get_group(
+            transfer_uuid, dashboard.get_micro_service_group_name(group_name, self.vn)
+        )
+
+    def _find_job(self, ms_name, group_name, transfer_uuid, squash=True):
+        """Return the job of micro-service ``ms_name`` in group ``group_name``
+        of the unit with UUID ``transfer_uuid`` in a new snapshot of the
+        dashboard (see ``dashboard.DashboardSnapshot.get_job``), or ``None``.
+        """
+        group = self._get_micro_service_group(group_name, transfer_uuid)
+        return dashboard.DashboardSnapshot.get_job(group, ms_name, squash=squash)
+
+
+def _get_latest_job(jobs):
+    """Return the most recent of ``jobs``, which run the same micro-service
+    (e.g., in a transfer and its reingests). The jobs API does not say when
+    jobs were created nor sort them, so the job still running or awaiting a
+    decision is taken first. Only finished jobs fall back to the last one
+    returned.
+    """
+    for job in jobs:
+        if job.get("status") in ("PROCESSING", "USER_INPUT"):
+            return job
+    return jobs[-1]
+
+
+def _has_class(class_name):
+    """Return an XPath predicate matching elements with CSS class
+    ``class_name``.
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def _text(elem, preformatted=False):
+    """Return the text of ``elem`` the way a browser would show it."""
+    text = "".join(elem.itertext())
+    if preformatted:
+        return text.strip()
+    return " ".join(text.split())
+
+
+def _get_tasks_page(session, tasks_url):
+    r = session.get(tasks_url)
+    r.raise_for_status()
+    page = etree.fromstring(r.content, etree.HTMLParser())
+    if page is None or page.xpath("//input[@name='password']"):
+        raise ArchivematicaBrowserJobsTasksAbilityError(
+            f"Not logged in when requesting {tasks_url}"
+        )
+    return page
+
+
+class _ThreadSessions:
+    """Copies of a ``requests`` session, one per thread, since sessions are
+    not thread-safe. They are closed on exit.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.sessions = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for session in self.sessions:
+            session.close()
+
+    def get(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.session.headers)
+            session.cookies.update(self.session.cookies)
+            with self._lock:
+                self.sessions.append(session)
+        return session
+
+    def get_tasks_page(self, tasks_url):
+        return _get_tasks_page(self.get(), tasks_url)
+
+
+def _parse_tasks_page(page, table_dict):
+    """Parse the Task <article> elements of the lxml tree of a tasks page into
+    ``table_dict`` like ``_parse_tasks_table_am_gte_1_7`` does. Return the
+    number of tasks in the page.
+    """
+    task_articles = page.xpath(f"//article[{_has_class('task')}]")
+    for task_art_elem in task_articles:
+        try:
+            _parse_task_article(task_art_elem, table_dict)
+        except IndexError as err:
+            raise ArchivematicaBrowserJobsTasksAbilityError(
+                f"Unable to parse a task of the tasks page: {err}"
+            ) from err
+    return len(task_articles)
+
+
+def _parse_task_article(task_art_elem, table_dict):
+    """Parse a Task <article> element into ``table_dict``."""
+    row_dict = {}
+    stdout = task_art_elem.xpath(f".//*[{_has_class('panel-info')}]//pre")
+    row_dict["stdout"] = _text(stdout[0], preformatted=True) if stdout else ""
+    stderr = task_art_elem.xpath(f".//*[{_has_class('panel-danger')}]//pre")
+    row_dict["stderr"] = _text(stderr[0], preformatted=True) if stderr else ""
+    row_dict["command"] = _text(
+        task_art_elem.xpath(
+            f".//h3[{_has_class('panel-title')} and"
+            f" {_has_class('panel-title-simple')}]"
+        )[0]
+    )
+    arguments = _text(
+        task_art_elem.xpath(
+            f".//div[{_has_class('panel-primary')}]"
+            f"//div[{_has_class('shell-output')}]//pre"
+        )[0],
+        preformatted=True,
+    )
+    row_dict["arguments"] = utils.parse_task_arguments_to_list(arguments)
+    for dl_el in task_art_elem.xpath(f".//div[{_has_class('row')}]//dl"):
+        for el in dl_el.iterdescendants(etree.Element):
+            if el.tag == "dt":
+                attr = _text(el).lower().replace(" ", "_")
+            else:
+                row_dict[attr] = _text(el)
+    row_dict["task_uuid"] = _text(
+        task_art_elem.xpath(f".//div[{_has_class('task-heading')}]//h4")[0]
+    ).split()[1]
+    table_dict["tasks"][row_dict["task_uuid"]] = row_dict
+
+
+def _get_next_tasks_url(page, tasks_url):
+    for link_button in page.xpath(f"//a[{_has_class('btn')}]"):
+        if _text(link_button) == "Next page":
+            return parse.urljoin(tasks_url, link_button.get("href"))
+    return None
+
+
+def _get_tasks_page_urls(next_tasks_url, task_count, page_size):
+    """Return the URLs of all the pages of tasks after the first one, built
+    from the URL of the second page, or ``None`` if they cannot be known.
+    """
+    if not (next_tasks_url and task_count and page_size):
+        return None
+    url = parse.urlsplit(next_tasks_url)
+    query = parse.parse_qsl(url.query)
+    page_params = [name for name, value in query if value == "2"]
+    if len(page_params) != 1:
+        return None
+    page_count = math.ceil(task_count / page_size)
+    return [
+        parse.urlunsplit(
+            url._replace(
+                query=parse.urlencode(
+                    [
+                        (name, str(page_number) if name in page_params else value)
+                        for name, value in query
+                    ]
+                )
+            )
+        )
+        for page_number in range(2, page_count + 1)
+    ]
 
 
 def process_task_header_row(row_elem, row_dict):
@@ -10,6 +10,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 
 from . import constants as c
+from . import dashboard
 from . import selenium_ability
 
 logger = logging.getLogger("amuser.transfer")
@@ -20,10 +21,6 @@ class ArchivematicaBrowserTransferAbility(
 ):
     """Archivematica Browser Transfer Tab Ability."""
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.check_transfer_appeared_attempts = 0
-
     def start_transfer(
         self, transfer_path, transfer_name, accession_no=None, transfer_type=None
     ):
@@ -132,66 +129,28 @@ class ArchivematicaBrowserTransferAbility(
         """Wait until the transfer appears in the transfer tab (after "Start
         transfer" has been clicked). The only way to do this seems to be to
         check each row for our unique ``transfer_name`` and do
-        ``time.sleep(self.micro_wait)`` until it appears, or a max number of
-        waits is exceeded.
-        Returns the transfer UUID and the transfer <div> element.
+        ``time.sleep(self.quick_wait)`` until it appears, or a max number of
+        waits is exceeded. Each check reads a new snapshot of the dashboard.
+        Returns the transfer UUID, the transfer <div> element and the transfer
+        name shown in the dashboard.
         """
-        transfer_name_div_selector = "div.sip-detail-directory"
-        transfer_uuid_div_selector = "div.sip-detail-uuid"
-        self.wait_for_presence(transfer_name_div_selector)
-        transfer_uuid = correct_transfer_div_elem = None
-        for transfer_div_elem in self.driver.find_elements(
-            By.CSS_SELECTOR, c.SELECTOR_TRANSFER_DIV
-        ):
-            transfer_name_div_elem = transfer_div_elem.find_element(
-                By.CSS_SELECTOR, transfer_name_div_selector
-            )
-            transfer_uuid_div_elem = transfer_div_elem.find_element(
-                By.CSS_SELECTOR, transfer_uuid_div_selector
+        self.wait_for_presence("div.sip-detail-directory")
+        for _ in range(self.max_check_transfer_appeared_attempts):
+            snapshot = self.get_dashboard_snapshot()
+            unit, transfer_name_in_dom = snapshot.find_unit(
+                transfer_name, name_is_prefix=name_is_prefix
             )
-            # Identify the transfer by its name. The complication here is that
-            # AM detects a narrow browser window and hides the UUID in the
-            # narrow case. So depending on the visibility/width of things, we
-            # find the UUID in different places.
-            transfer_name_in_dom = transfer_name_div_elem.text.strip()
-            if transfer_name_in_dom.endswith("UUID"):
-                transfer_name_in_dom = transfer_name_in_dom[:-4].strip()
-            if name_is_prefix:
-                cond = transfer_name_in_dom.startswith(transfer_name)
-            else:
-                cond = transfer_name_in_dom == transfer_name
-            if cond:
+            transfer_uuid = unit and dashboard.get_unit_uuid(unit)
+            if transfer_uuid:
                 logger.info(
                     "Changed transfer name from %s to %s",
                     transfer_name,
                     transfer_name_in_dom,
                 )
-                transfer_name = transfer_name_in_dom
-                abbr_elem = transfer_name_div_elem.find_element(By.TAG_NAME, "abbr")
-                if abbr_elem and abbr_elem.is_displayed():
-                    transfer_uuid = abbr_elem.get_attribute("title").strip()
-                else:
-                    transfer_uuid = transfer_uuid_div_elem.text.strip()
-                correct_transfer_div_elem = transfer_div_elem
-        if not transfer_uuid:
-            self.check_transfer_appeared_attempts += 1
-            if (
-                self.check_transfer_appeared_attempts
-                < self.max_check_transfer_appeared_attempts
-            ):
                 time.sleep(self.quick_wait)
-                (
-                    transfer_uuid,
-                    correct_transfer_div_elem,
-                    transfer_name,
-                ) = self.wait_for_transfer_to_appear(
-                    transfer_name, name_is_prefix=name_is_prefix
-                )
-            else:
-                self.check_transfer_appeared_attempts = 0
-                return None, None, None
-        time.sleep(self.quick_wait)
-        return transfer_uuid, correct_transfer_div_elem, transfer_name
+                return transfer_uuid, unit["elem"], transfer_name_in_dom
+            time.sleep(self.quick_wait)
+        return None, None, None
 
     def click_start_transfer_button(self):
         start_transfer_button_elem = self.driver.find_element(
@@ -1,7 +1,6 @@
 """Archivematica Transfer & Ingest Tabs Ability"""
 
 import logging
-import sys
 import time
 
 from selenium.common.exceptions import NoSuchElementException
@@ -65,19 +64,12 @@ class ArchivematicaBrowserTransferIngestAbility(
         decision_point, group_name = self.expose_job(
             decision_point, uuid_val, unit_type=unit_type
         )
-        ms_group_elem = self.get_transfer_micro_service_group_elem(group_name, uuid_val)
+        job = self._find_job(decision_point, group_name, uuid_val)
         action_div_el = None
-        for job_elem in ms_group_elem.find_elements(By.CSS_SELECTOR, "div.job"):
-            for span_elem in job_elem.find_elements(
-                By.CSS_SELECTOR, "div.job-detail-microservice span"
-            ):
-                if utils.squash(span_elem.text) == utils.squash(decision_point):
-                    action_div_el = job_elem.find_element(
-                        By.CSS_SELECTOR, "div.job-detail-actions"
-                    )
-                    break
-            if action_div_el:
-                break
+        if job is not None and job["visible"]:
+            action_div_el = job["elem"].find_element(
+                By.CSS_SELECTOR, "div.job-detail-actions"
+            )
         if action_div_el:
             try:
                 select_el = action_div_el.find_element(By.CSS_SELECTOR, "select")
@@ -120,38 +112,23 @@ class ArchivematicaBrowserTransferIngestAbility(
                 " though we expected this not to be possible."
             )
 
-    @selenium_ability.recurse_on_stale
-    def wait_for_microservice_visibility(
-        self, ms_name, group_name, transfer_uuid, level=0
-    ):
+    def wait_for_microservice_visibility(self, ms_name, group_name, transfer_uuid):
         """Wait until micro-service ``ms_name`` of transfer ``transfer_uuid``
-        is visible.
+        is visible. When there is an AM API key, wait for the job to exist
+        through the jobs API first, so the dashboard is only checked once it
+        should be showing the job.
         """
-        ms_group_elem = self.get_transfer_micro_service_group_elem(
-            group_name, transfer_uuid
-        )
-        for job_elem in ms_group_elem.find_elements(By.CSS_SELECTOR, "div.job"):
-            for span_elem in job_elem.find_elements(
-                By.CSS_SELECTOR, "div.job-detail-microservice span"
-            ):
-                if utils.squash(span_elem.text) == utils.squash(ms_name):
-                    return
-        if level < (sys.getrecursionlimit() / 2):
-            # The job is taking a long time to complete. Half the
-            # amount of checking to avoid stack-overflow.
-            logger.warning(
-                f"Recursion limit close to being reached: level: {level} <= {sys.getrecursionlimit()}"
-            )
-            time.sleep(self.micro_wait)
-        else:
-            time.sleep(self.quick_wait)
-        level += 1
-        try:
-            self.wait_for_microservice_visibility(ms_name, group_name, transfer_uuid)
-        except RecursionError:
-            logger.error(
-                "Recursion depth exceeded waiting for microservice visibility, consider re-running the test"
-            )
+        if self.am_api_key:
+            try:
+                self.wait_for_job(ms_name, group_name, transfer_uuid, job_outputs=None)
+            except jobs_tasks_abl.ArchivematicaBrowserJobsTasksAbilityError as err:
+                logger.warning("%s; checking the dashboard instead", err)
+        timeout = self.job_wait_timeout
+        for _ in utils.poll(timeout, self.micro_wait, self.optimistic_wait):
+            job = self._find_job(ms_name, group_name, transfer_uuid)
+            if job is not None and job["visible"]:
+                return
+        raise jobs_tasks_abl.JobWaitTimeoutError(ms_name, transfer_uuid, timeout)
 
     @selenium_ability.recurse_on_stale
     def click_show_tasks_button(self, ms_name, group_name, transfer_uuid):
@@ -196,39 +173,11 @@ class ArchivematicaBrowserTransferIngestAbility(
             time.sleep(self.quick_wait)
             attempts += 1
 
-    @selenium_ability.recurse_on_stale
     def get_transfer_micro_service_group_elem(self, group_name, transfer_uuid):
         """Get the DOM element (<div>) representing the micro-service group
         with name ``group_name`` of the transfer with UUID ``transfer_uuid``.
         """
-        transfer_div_elem = None
-        transfer_dom_id = f"sip-row-{transfer_uuid}"
-        for elem in self.driver.find_elements(By.CSS_SELECTOR, "div.sip"):
-            try:
-                elem.find_element(By.ID, transfer_dom_id)
-                transfer_div_elem = elem
-            except NoSuchElementException:
-                pass
-        if not transfer_div_elem:
-            logger.warning("Unable to find Transfer %s.", transfer_uuid)
+        group = self._get_micro_service_group(group_name, transfer_uuid)
+        if group is None:
             return None
-        if self.vn == "1.6":
-            expected_name = f"Micro-service: {group_name}"
-        else:
-            expected_name = f"Microservice: {group_name}"
-        result = None
-        for ms_group_elem in transfer_div_elem.find_elements(
-            By.CSS_SELECTOR, "div.microservicegroup"
-        ):
-            name_elem_text = ms_group_elem.find_element(
-                By.CSS_SELECTOR, "span.microservice-group-name"
-            ).text.strip()
-            if name_elem_text == expected_name:
-                logger.info(
-                    'DOM name "%s" MATCHES expected name "%s"',
-                    name_elem_text,
-                    expected_name,
-                )
-                result = ms_group_elem
-                break
-        return result
+        return group["elem"]
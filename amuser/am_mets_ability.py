@@ -4,48 +4,178 @@ This module contains the ``ArchivematicaMETSAbility`` class, which represents an
 Archivematica user's ability to interact with METS XML files.
 """
 
+import array
+import collections
+import itertools
 import os
+import sys
+
+from lxml import etree
 
 from . import base
 from . import constants as c
 from . import utils
 
 
+class METSXPaths:
+    """Registry of precompiled XPath expressions for the queries that the
+    steps run on METS and pointer files, often once per file or directory.
+
+    Compiling an expression once saves parsing it on every call. Values that
+    change between calls are passed as XPath variables instead of being
+    formatted into the expression, e.g.::
+
+        >>> METSXPaths.files_by_use(tree, use="original")
+        >>> METSXPaths.first(METSXPaths.directory_div, structmap, label="objects")
+
+    Expressions return lists of elements and are relative to the element they
+    are evaluated on (the root element when given an element tree). Looking up
+    sections by ID still means scanning the document, so use ``METSIndex`` to
+    do it in a loop.
+    """
+
+    namespaces = dict(c.METS_NSMAP, ddi="http://www.icpsr.umich.edu/DDI")
+
+    # Relative to the mets:mets element.
+    physical_struct_map = etree.XPath(
+        "mets:structMap[@TYPE='physical']", namespaces=namespaces
+    )
+    files = etree.XPath(
+        "mets:fileSec/mets:fileGrp[@USE]/mets:file", namespaces=namespaces
+    )
+    files_by_use = etree.XPath(
+        "mets:fileSec/mets:fileGrp[@USE=$use]/mets:file", namespaces=namespaces
+    )
+    # Relative to a mets:structMap or mets:div element.
+    directory_div = etree.XPath(
+        "mets:div[@LABEL=$label][@TYPE='Directory']", namespaces=namespaces
+    )
+    descendant_div = etree.XPath(".//mets:div[@LABEL=$label]", namespaces=namespaces)
+    # Relative to a mets:amdSec element.
+    tech_mds = etree.XPath("mets:techMD", namespaces=namespaces)
+    object_uuid = etree.XPath(
+        "mets:techMD/mets:mdWrap/mets:xmlData/premis:object/premis:objectIdentifier"
+        "[premis:objectIdentifierType='UUID']/premis:objectIdentifierValue",
+        namespaces=namespaces,
+    )
+    event_types = etree.XPath(
+        "mets:digiprovMD/mets:mdWrap[@MDTYPE='PREMIS:EVENT']"
+        "/mets:xmlData/premis:event/premis:eventType",
+        namespaces=namespaces,
+    )
+    rights_md_ref = etree.XPath("mets:rightsMD/mets:mdRef", namespaces=namespaces)
+    # Relative to a mets:rightsMD element.
+    rights_linking_objects = etree.XPath(
+        "mets:mdWrap/mets:xmlData/premis:rightsStatement"
+        "/premis:linkingObjectIdentifier/premis:linkingObjectIdentifierValue",
+        namespaces=namespaces,
+    )
+    # Relative to a mets:dmdSec element.
+    md_ref = etree.XPath("mets:mdRef", namespaces=namespaces)
+    dc_identifier = etree.XPath(
+        "mets:mdWrap[@MDTYPE='DC']/mets:xmlData/dcterms:dublincore/dc:identifier",
+        namespaces=namespaces,
+    )
+    dc_is_part_of = etree.XPath(
+        "mets:mdWrap[@MDTYPE='DC']/mets:xmlData/dcterms:dublincore/dcterms:isPartOf",
+        namespaces=namespaces,
+    )
+    ddi_codebook = etree.XPath(
+        "mets:mdWrap/mets:xmlData/ddi:codebook", namespaces=namespaces
+    )
+    # Pointer files.
+    pointer_premis_relationship = etree.XPath(
+        ".//mets:mdWrap[@MDTYPE='PREMIS:OBJECT']"
+        "/mets:xmlData/premis:object/premis:relationship",
+        namespaces=namespaces,
+    )
+    pointer_object_characteristics = etree.XPath(
+        "mets:amdSec/mets:techMD/mets:mdWrap/mets:xmlData"
+        "/premis:object/premis:objectCharacteristics",
+        namespaces=namespaces,
+    )
+    # Relative to a pointer file's mets:file element.
+    transform_file = etree.XPath(
+        "mets:transformFile[@TRANSFORMTYPE=$transform_type]", namespaces=namespaces
+    )
+
+    @staticmethod
+    def first(xpath, el, **variables):
+        """Return the first element that ``xpath`` finds in ``el``, or ``None``
+        if it finds nothing or ``el`` is ``None``.
+        """
+        if el is None:
+            return None
+        result = xpath(el, **variables)
+        return result[0] if result else None
+
+
 class ArchivematicaMETSAbility(base.Base):
     """Represents an Archivematica user's ability to interact with METS XML
     files.
     """
 
     mets_nsmap = c.METS_NSMAP
+    xpaths = METSXPaths
 
     @staticmethod
-    def get_premis_events(mets):
-        """Return all PREMIS events in ``mets`` (lxml.etree parse) as a list of
-        dicts.
+    def get_index(mets_doc):
+        """Return a ``METSIndex`` of the METS document ``mets_doc``."""
+        return METSIndex(mets_doc)
+
+    @staticmethod
+    def get_file_summary(mets_doc):
+        """Return a ``METSFileSummary`` of the METS document ``mets_doc``."""
+        return METSFileSummary(mets_doc)
+
+    @staticmethod
+    def get_premis_events(mets, event_types=None):
+        """Return all PREMIS events in ``mets`` as a list of dicts. See
+        ``iter_premis_events``.
         """
-        result = []
-        for premis_event_el in mets.findall(".//premis:event", c.METS_NSMAP):
-            result.append(
-                {
-                    "event_type": premis_event_el.find(
-                        "premis:eventType", c.METS_NSMAP
-                    ).text,
-                    "event_detail": premis_event_el.find(
-                        "premis:eventDetailInformation/premis:eventDetail", c.METS_NSMAP
-                    ).text,
-                    "event_outcome": premis_event_el.find(
-                        "premis:eventOutcomeInformation/premis:eventOutcome",
-                        c.METS_NSMAP,
-                    ).text,
-                    "event_outcome_detail_note": premis_event_el.find(
-                        "premis:eventOutcomeInformation"
-                        "/premis:eventOutcomeDetail"
-                        "/premis:eventOutcomeDetailNote",
-                        c.METS_NSMAP,
-                    ).text,
-                }
-            )
-        return result
+        return list(ArchivematicaMETSAbility.iter_premis_events(mets, event_types))
+
+    @staticmethod
+    def iter_premis_events(mets, event_types=None):
+        """Yield the PREMIS events in ``mets`` as dicts with the ``event_type``,
+        ``event_detail``, ``event_outcome``, ``event_outcome_detail_note`` and
+        ``linked_object`` (the identifier of the object the event is about)
+        keys. ``mets`` is an lxml parse or the path (or a file object) of a
+        METS file, which is then read incrementally so that memory use does not
+        grow with its size. If ``event_types`` is given, only the events of
+        those types are yielded.
+        """
+        for premis_event_el, linked_object in iter_premis_event_elements(
+            mets, event_types
+        ):
+            yield {
+                "event_type": premis_event_el.findtext(
+                    "premis:eventType", namespaces=c.METS_NSMAP
+                ),
+                "event_detail": premis_event_el.findtext(
+                    "premis:eventDetailInformation/premis:eventDetail",
+                    namespaces=c.METS_NSMAP,
+                ),
+                "event_outcome": premis_event_el.findtext(
+                    "premis:eventOutcomeInformation/premis:eventOutcome",
+                    namespaces=c.METS_NSMAP,
+                ),
+                "event_outcome_detail_note": premis_event_el.findtext(
+                    "premis:eventOutcomeInformation"
+                    "/premis:eventOutcomeDetail"
+                    "/premis:eventOutcomeDetailNote",
+                    namespaces=c.METS_NSMAP,
+                ),
+                "linked_object": linked_object,
+            }
+
+    @staticmethod
+    def iter_premis_event_elements(mets, event_types=None):
+        """Yield the ``premis:event`` elements in ``mets`` whose type is in
+        ``event_types`` along with the identifiers of their linked objects.
+        See the ``iter_premis_event_elements`` function.
+        """
+        return iter_premis_event_elements(mets, event_types)
 
     @staticmethod
     def validate_mets_for_pids(mets_doc, accession_no=None):
@@ -54,7 +184,8 @@ class ArchivematicaMETSAbility(base.Base):
         itself. If ``accession_no`` is provided, assert that the PID for the AIP
         directory is the accession number.
         """
-        entities = _get_mets_entities(mets_doc, ns=c.METS_NSMAP)
+        entities = _get_mets_entities(METSIndex(mets_doc))
+        purls = []
         for entity in entities:
             if entity["name"] == "objects":
                 continue
@@ -62,7 +193,6 @@ class ArchivematicaMETSAbility(base.Base):
             assert entity.get(
                 "id"
             ), "Unable to find a DMDID/ADMID for entity {}".format(entity["path"])
-            purls = []
             # All entities should have the following types of identifier
             for idfr_type in ("UUID", "hdl", "URI"):
                 try:
@@ -82,9 +212,12 @@ class ArchivematicaMETSAbility(base.Base):
                     ), f"Identifier {idfr} is not a hdl"
                 else:
                     purls.append(idfr)
-            assert utils.all_urls_resolve(
-                purls
-            ), "At least one PURL does not resolve in\n  {}".format("\n  ".join(purls))
+        # Resolve the PURLs of all entities at once.
+        unresolved = utils.get_unresolved_urls(purls)
+        assert not unresolved, "{} PURL(s) do not resolve:\n  {}".format(
+            len(unresolved),
+            "\n  ".join(f"{url} ({reason})" for url, reason in unresolved.items()),
+        )
 
     @staticmethod
     def assert_empty_dir_documented_identified(mets_doc, empty_dir_rel_path):
@@ -93,100 +226,357 @@ class ArchivematicaMETSAbility(base.Base):
         ``mets_doc`` and that it has the expected identifiers: PID, PURL, and
         UUID.
         """
-        ns = c.METS_NSMAP
-        norm_struct = mets_doc.xpath(
-            "mets:structMap[@LABEL='Normative Directory Structure']", namespaces=ns
-        )[0]
+        index = METSIndex(mets_doc)
+        norm_struct = index.get_struct_map(LABEL="Normative Directory Structure")
         assert norm_struct is not None
-        objects_div_el = norm_struct.xpath(
-            "mets:div[@TYPE='Directory']"
-            "/mets:div[@TYPE='Directory' and @LABEL='objects']",
-            namespaces=ns,
-        )[0]
-        assert objects_div_el is not None
-        xpath = []
-        for dir_ in empty_dir_rel_path.split("/"):
-            xpath.append(f"mets:div[@TYPE='Directory' and @LABEL='{dir_}']")
-        xpath = "/".join(xpath)
-        empty_dir_div_el = objects_div_el.xpath(xpath, namespaces=ns)[0]
-        assert empty_dir_div_el is not None
+        aip_div_el = index.get_child_divs(norm_struct, "Directory")[0]
+        empty_dir_div_el = index.get_div(
+            norm_struct,
+            os.path.join(aip_div_el.get("LABEL"), "objects", empty_dir_rel_path),
+            div_type="Directory",
+        )
+        assert (
+            empty_dir_div_el is not None
+        ), f"Unable to find directory {empty_dir_rel_path} in the normative structMap"
         dmdid = empty_dir_div_el.get("DMDID")
         assert dmdid is not None
-        dmd_sec_el = mets_doc.xpath(f"mets:dmdSec[@ID='{dmdid}']", namespaces=ns)[0]
-        assert dmd_sec_el is not None
-        identifiers = []
-        for obj_idfr_el in dmd_sec_el.findall(
-            "mets:mdWrap/mets:xmlData/premis:object/premis:objectIdentifier", ns
-        ):
-            identifiers.append(
+        identifiers = dict(index.get_identifiers(index.dmd_secs[dmdid]))
+        assert identifiers.get("UUID")
+        assert identifiers.get("hdl")
+        assert identifiers.get("URI")
+
+
+def iter_premis_event_elements(mets, event_types=None, ns=None):
+    """Yield a ``(premis:event element, linked object identifier)`` tuple for
+    each PREMIS event in ``mets``, an lxml parse or the path (or a file
+    object) of a METS file, whose type is in ``event_types`` (all events if
+    ``None``).
+
+    The linked object is the value of the event's first
+    ``linkingObjectIdentifier`` or, since Archivematica does not record one,
+    the UUID of the PREMIS object described in the same amdSec.
+
+    A METS file is read with ``iterparse`` and the elements already processed
+    are cleared, so each yielded element is only valid until the next one is
+    requested. Parsed documents are walked without being modified.
+    """
+    ns = ns or c.METS_NSMAP
+    object_tag = f"{{{ns['premis']}}}object"
+    event_tag = f"{{{ns['premis']}}}event"
+    section_tags = tuple(
+        f"{{{ns['mets']}}}{name}"
+        for name in (
+            "metsHdr",
+            "dmdSec",
+            "amdSec",
+            "fileSec",
+            "structMap",
+            "structLink",
+            "behaviorSec",
+        )
+    )
+    tags = (object_tag, event_tag) + section_tags
+    streaming = isinstance(mets, (str, bytes, os.PathLike)) or hasattr(mets, "read")
+    if streaming:
+        elements = etree.iterparse(mets, events=("end",), tag=tags, huge_tree=True)
+    else:
+        elements = etree.iterwalk(mets, events=("end",), tag=tags)
+    object_identifier = None
+    for _, el in elements:
+        if el.tag == object_tag:
+            object_identifier = _get_premis_object_identifier(el, ns)
+        elif el.tag == event_tag:
+            event_type = el.findtext("premis:eventType", namespaces=ns)
+            if event_types is None or event_type in event_types:
+                linked_object = (
+                    el.findtext(
+                        "premis:linkingObjectIdentifier"
+                        "/premis:linkingObjectIdentifierValue",
+                        namespaces=ns,
+                    )
+                    or object_identifier
+                )
+                yield el, linked_object
+        else:
+            object_identifier = None
+        if not streaming:
+            continue
+        el.clear(keep_tail=True)
+        if el.tag in section_tags:
+            # Also drop the (already cleared) sections that precede it.
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+
+
+def _get_premis_object_identifier(object_el, ns):
+    """Return the UUID of the PREMIS object ``object_el``, or its first
+    identifier if it has no UUID.
+    """
+    identifiers = [
+        (
+            obj_idfr_el.findtext("premis:objectIdentifierType", namespaces=ns),
+            obj_idfr_el.findtext("premis:objectIdentifierValue", namespaces=ns),
+        )
+        for obj_idfr_el in object_el.iterfind("premis:objectIdentifier", ns)
+    ]
+    for idfr_type, idfr_value in identifiers:
+        if idfr_type == "UUID":
+            return idfr_value
+    return identifiers[0][1] if identifiers else None
+
+
+class METSIndex:
+    """Index of a METS document built in a single pass over it.
+
+    It maps the IDs of the ``mets:file``, ``mets:amdSec`` and ``mets:dmdSec``
+    elements to the elements themselves and records, for every ``mets:div``
+    of every structMap, the path of its parent directory (i.e., the joined
+    ``LABEL`` attributes of its ancestor divs), so that looking up an element
+    by ID or a div by path does not require searching the whole document.
+    """
+
+    def __init__(self, doc, ns=None):
+        self.ns = ns or c.METS_NSMAP
+        self.root = doc.getroot() if hasattr(doc, "getroot") else doc
+        mets_ns = self.ns["mets"]
+        self._div_tag = f"{{{mets_ns}}}div"
+        self.files = {}
+        self.amd_secs = {}
+        self.dmd_secs = {}
+        self.struct_maps = []
+        # ``mets:div`` element => path of its parent div.
+        self.parent_paths = {}
+        # (``mets:structMap`` element, path) => ``mets:div`` elements.
+        self._divs_by_path = {}
+        by_tag = {
+            f"{{{mets_ns}}}file": self.files,
+            f"{{{mets_ns}}}amdSec": self.amd_secs,
+            f"{{{mets_ns}}}dmdSec": self.dmd_secs,
+        }
+        struct_map_tag = f"{{{mets_ns}}}structMap"
+        for el in self.root.iter(struct_map_tag, *by_tag):
+            if el.tag == struct_map_tag:
+                self.struct_maps.append(el)
+                self._index_divs(el)
+            else:
+                by_tag[el.tag].setdefault(el.get("ID"), el)
+
+    def _index_divs(self, struct_map):
+        pending = [(struct_map, "")]
+        while pending:
+            parent_el, parent_path = pending.pop()
+            for div_el in parent_el.iterchildren(self._div_tag):
+                self.parent_paths[div_el] = parent_path
+                path = os.path.join(parent_path, div_el.get("LABEL") or "")
+                self._divs_by_path.setdefault((struct_map, path), []).append(div_el)
+                pending.append((div_el, path))
+
+    def get_struct_map(self, **attributes):
+        """Return the first structMap whose attributes match ``attributes``,
+        e.g. ``TYPE="physical"``, or ``None``.
+        """
+        for struct_map in self.struct_maps:
+            if all(struct_map.get(k) == v for k, v in attributes.items()):
+                return struct_map
+        return None
+
+    def get_child_divs(self, parent_el, div_type):
+        """Return the ``mets:div`` children of ``parent_el`` of type
+        ``div_type`` (e.g., 'Directory' or 'Item').
+        """
+        return [
+            div_el
+            for div_el in parent_el.iterchildren(self._div_tag)
+            if div_el.get("TYPE") == div_type
+        ]
+
+    def get_path(self, div_el):
+        """Return the path of ``div_el`` within its structMap."""
+        return os.path.join(self.parent_paths[div_el], div_el.get("LABEL") or "")
+
+    def get_div(self, struct_map, path, div_type=None):
+        """Return the first div at ``path`` in ``struct_map`` which, like all
+        the divs above it, is of type ``div_type`` (any type if ``None``), or
+        ``None``.
+        """
+        for div_el in self._divs_by_path.get((struct_map, os.path.normpath(path)), []):
+            if div_type is None or all(
+                el.get("TYPE") == div_type
+                for el in itertools.chain([div_el], div_el.iterancestors(self._div_tag))
+            ):
+                return div_el
+        return None
+
+    def get_identifiers(self, md_sec_el):
+        """Return the PREMIS object identifiers in ``md_sec_el`` (a
+        ``mets:amdSec`` or ``mets:dmdSec`` element) as a list of (type, value)
+        tuples.
+        """
+        if md_sec_el.tag == f"{{{self.ns['mets']}}}amdSec":
+            xpath = ".//mets:mdWrap/mets:xmlData/premis:object/premis:objectIdentifier"
+        else:
+            xpath = "mets:mdWrap/mets:xmlData/premis:object/premis:objectIdentifier"
+        return [
+            (
+                obj_idfr_el.find("premis:objectIdentifierType", self.ns).text,
+                obj_idfr_el.find("premis:objectIdentifierValue", self.ns).text,
+            )
+            for obj_idfr_el in md_sec_el.findall(xpath, self.ns)
+        ]
+
+
+class METSFileSummary:
+    """Columnar summary of the files in the fileSec of a METS document, built
+    in a single pass over it so that assertions about all the files are
+    cheap, even for documents with a very large number of files.
+
+    Row ``i`` describes the ``i``-th ``mets:file`` element: ``file_uuids[i]``
+    (its ``ID`` without the "file-" prefix), ``uses[i]`` (the ``USE`` of its
+    fileGrp), ``paths[i]`` (the ``xlink:href`` of its ``FLocat``),
+    ``amd_sec_ids[i]`` (its first ``ADMID``), ``has_amd_secs[i]`` (whether
+    that amdSec exists) and ``object_uuids[i]`` (the UUID of the PREMIS
+    object described in that amdSec). The number of PREMIS events of each
+    type in that amdSec is in ``get_event_counts``.
+    """
+
+    __slots__ = (
+        "file_uuids",
+        "uses",
+        "paths",
+        "amd_sec_ids",
+        "has_amd_secs",
+        "object_uuids",
+        "_event_counts",
+    )
+
+    def __init__(self, mets_doc, ns=None):
+        ns = ns or c.METS_NSMAP
+        root = mets_doc.getroot() if hasattr(mets_doc, "getroot") else mets_doc
+        file_tag = f"{{{ns['mets']}}}file"
+        amd_sec_tag = f"{{{ns['mets']}}}amdSec"
+        href_attr = f"{{{ns['xlink']}}}href"
+        files = []
+        # amdSec ID => (object UUID, {event type: count})
+        amd_secs = {}
+        for el in root.iter(file_tag, amd_sec_tag):
+            if el.tag == amd_sec_tag:
+                amd_secs[el.get("ID")] = (
+                    _first_text(METSXPaths.object_uuid(el)),
+                    collections.Counter(
+                        event_type_el.text
+                        for event_type_el in METSXPaths.event_types(el)
+                    ),
+                )
+                continue
+            flocat_el = el.find("mets:FLocat", ns)
+            files.append(
                 (
-                    obj_idfr_el.find("premis:objectIdentifierType", ns).text,
-                    obj_idfr_el.find("premis:objectIdentifierValue", ns).text,
+                    el.get("ID", "").split("file-")[-1],
+                    # Share one string per USE value instead of one per file.
+                    sys.intern(el.getparent().get("USE") or ""),
+                    flocat_el.get(href_attr) if flocat_el is not None else None,
+                    (el.get("ADMID") or "").split(" ")[0] or None,
                 )
             )
-        uuid_id = [ival for itype, ival in identifiers if itype == "UUID"][0]
-        hdl_id = [ival for itype, ival in identifiers if itype == "hdl"][0]
-        uri_id = [ival for itype, ival in identifiers if itype == "URI"][0]
-        assert uuid_id
-        assert hdl_id
-        assert uri_id
+        columns = list(zip(*files)) or [(), (), (), ()]
+        self.file_uuids, self.uses, self.paths, self.amd_sec_ids = map(tuple, columns)
+        self.has_amd_secs = bytearray(
+            amd_sec_id in amd_secs for amd_sec_id in self.amd_sec_ids
+        )
+        no_amd_sec = (None, collections.Counter())
+        rows = [amd_secs.get(amd_sec_id, no_amd_sec) for amd_sec_id in self.amd_sec_ids]
+        self.object_uuids = tuple(object_uuid for object_uuid, _ in rows)
+        event_types = set().union(*(event_counts for _, event_counts in rows))
+        self._event_counts = {
+            event_type: array.array(
+                "I", (event_counts[event_type] for _, event_counts in rows)
+            )
+            for event_type in event_types
+        }
+
+    @classmethod
+    def from_columns(
+        cls,
+        file_uuids,
+        uses,
+        paths,
+        amd_sec_ids,
+        has_amd_secs,
+        object_uuids,
+        event_counts,
+    ):
+        """Return a summary with the given columns, e.g. read from a
+        ``METSDigest``. ``event_counts`` maps each event type to the number
+        of events of that type of each file.
+        """
+        summary = cls.__new__(cls)
+        summary.file_uuids = tuple(file_uuids)
+        summary.uses = tuple(sys.intern(use) for use in uses)
+        summary.paths = tuple(paths)
+        summary.amd_sec_ids = tuple(amd_sec_ids)
+        summary.has_amd_secs = bytearray(has_amd_secs)
+        summary.object_uuids = tuple(object_uuids)
+        summary._event_counts = {
+            event_type: array.array("I", counts)
+            for event_type, counts in event_counts.items()
+        }
+        return summary
+
+    def __len__(self):
+        return len(self.file_uuids)
+
+    def get_rows(self, use=None):
+        """Return the indices of the rows of the files in the fileGrp with
+        ``USE`` attribute ``use``, or of all rows.
+        """
+        if use is None:
+            return range(len(self))
+        return [i for i, use_ in enumerate(self.uses) if use_ == use]
+
+    def get_event_counts(self, event_type):
+        """Return the number of PREMIS events of type ``event_type`` of each
+        file as an array of unsigned integers.
+        """
+        counts = self._event_counts.get(event_type)
+        if counts is None:
+            counts = array.array("I", [0]) * len(self)
+        return counts
+
+
+def _first_text(elements):
+    return elements[0].text if elements else None
 
 
-def _add_entity_identifiers(entity, doc, ns):
+def _add_entity_identifiers(entity, index):
     """Find all of the identifiers for ``entity`` (a dict representing a file
-    or directory) in the lxml ``Element`` instance ``doc`` (which represents a
-    METS.xml file) and add them as a list value for the ``'identifiers'`` key
-    of ``entity``.
+    or directory) in the ``METSIndex`` instance ``index`` and add them as a
+    list value for the ``'identifiers'`` key of ``entity``.
     """
-    e_type = entity["type"]
     e_id = entity["id"]
-    identifiers = []
     if e_id is None:
         return entity
-    elif e_type == "file":
-        amd_sec_el = doc.xpath(f"mets:amdSec[@ID='{e_id}']", namespaces=ns)[0]
-        obj_idfr_els = amd_sec_el.findall(
-            ".//mets:mdWrap/"
-            "mets:xmlData/"
-            "premis:object/"
-            "premis:objectIdentifier",
-            ns,
-        )
-        for obj_idfr_el in obj_idfr_els:
-            identifiers.append(
-                (
-                    obj_idfr_el.find("premis:objectIdentifierType", ns).text,
-                    obj_idfr_el.find("premis:objectIdentifierValue", ns).text,
-                )
-            )
+    if entity["type"] == "file":
+        md_sec_el = index.amd_secs[e_id]
     else:
-        dmd_sec_el = doc.xpath(f"mets:dmdSec[@ID='{e_id}']", namespaces=ns)[0]
-        for obj_idfr_el in dmd_sec_el.findall(
-            "mets:mdWrap/mets:xmlData/premis:object/premis:objectIdentifier", ns
-        ):
-            identifiers.append(
-                (
-                    obj_idfr_el.find("premis:objectIdentifierType", ns).text,
-                    obj_idfr_el.find("premis:objectIdentifierValue", ns).text,
-                )
-            )
-    entity["identifiers"] = identifiers
+        md_sec_el = index.dmd_secs[e_id]
+    entity["identifiers"] = index.get_identifiers(md_sec_el)
     return entity
 
 
-def _get_mets_entities(doc, root_el=None, entities=None, path="", ns=None):
+def _get_mets_entities(index, root_el=None, entities=None):
     """Find all entities (i.e., files and directories) in the physical
-    structmap of ``doc`` and return them as a list of dicts having a crucial
-    ``identifiers`` key which references a list of the entity's identifiers,
-    i.e. its UUID and potentially also its hdl (PID) and URI (PURL).
+    structmap of the METS document indexed by ``index`` and return them as a
+    list of dicts having a crucial ``identifiers`` key which references a list
+    of the entity's identifiers, i.e. its UUID and potentially also its hdl
+    (PID) and URI (PURL).
     """
-    if not entities:
+    is_top_level = entities is None
+    if is_top_level:
         entities = []
     if root_el is None:
-        root_el = doc.xpath("mets:structMap[@TYPE='physical']", namespaces=ns)[0]
-    for dir_el in root_el.xpath("mets:div[@TYPE='Directory']", namespaces=ns):
+        root_el = index.get_struct_map(TYPE="physical")
+    for dir_el in index.get_child_divs(root_el, "Directory"):
         dir_name = dir_el.get("LABEL")
-        dir_path = os.path.join(path, dir_name)
         parent_is_structmap = root_el.get("ID") == "structMap_1"
         is_subm_docm = (
             root_el.get("LABEL") == "objects" and dir_name == "submissionDocumentation"
@@ -198,27 +588,22 @@ def _get_mets_entities(doc, root_el=None, entities=None, path="", ns=None):
                     "type": parent_is_structmap and "aip" or "directory",
                     "id": dir_el.get("DMDID"),
                     "name": dir_name,
-                    "path": dir_path,
+                    "path": index.get_path(dir_el),
                 }
             )
         if not is_subm_docm:
-            entities = _get_mets_entities(
-                doc, dir_el, entities=entities, path=dir_path, ns=ns
-            )
-    for file_el in root_el.xpath("mets:div[@TYPE='Item']", namespaces=ns):
-        file_name = file_el.get("LABEL")
-        file_id = file_el.find("mets:fptr", ns).get("FILEID")
-        file_id = doc.xpath(f"//mets:file[@ID='{file_id}']", namespaces=ns)[0].get(
-            "ADMID"
-        )
+            _get_mets_entities(index, dir_el, entities=entities)
+    for file_el in index.get_child_divs(root_el, "Item"):
+        file_id = file_el.find("mets:fptr", index.ns).get("FILEID")
         entities.append(
             {
                 "type": "file",
-                "id": file_id,
-                "name": file_name,
-                "path": os.path.join(path, file_name),
+                "id": index.files[file_id].get("ADMID"),
+                "name": file_el.get("LABEL"),
+                "path": index.get_path(file_el),
             }
         )
-    for entity in entities:
-        entity = _add_entity_identifiers(entity, doc, ns)
+    if is_top_level:
+        for entity in entities:
+            _add_entity_identifiers(entity, index)
     return entities
@@ -17,6 +17,7 @@ from . import am_mets_ability
 from . import am_ssh_ability
 from . import base
 from . import constants as c
+from . import lazy_aip
 
 logger = logging.getLogger("amuser")
 
@@ -73,23 +74,22 @@ class ArchivematicaUser(base.Base):
     def decompress_aip(self, aip_path, cwd=None):
         cwd = cwd or self.tmp_path
         aip_parent_dir_path = os.path.dirname(aip_path)
-        try:
-            devnull = subprocess.DEVNULL
-        except AttributeError:
-            devnull = open(os.devnull, "wb")
-        aip_dir_name = get_aip_dir_name_from_archive(aip_path)
-        aip_dir_path = os.path.join(aip_parent_dir_path, aip_dir_name)
-        cmd = shlex.split(f"7z x {aip_path} -aoa")
-        logger.info("Decompress AIP command: %s", cmd)
-        logger.info("Decompress AIP cwd: %s", cwd)
-        p = subprocess.Popen(cmd, cwd=cwd, stdout=devnull, stderr=subprocess.STDOUT)
-        p.wait()
-        assert p.returncode == 0
+        aip = self.open_aip(aip_path, extract_dir=cwd)
+        aip_dir_path = os.path.join(aip_parent_dir_path, aip.root)
+        logger.info("Decompress AIP %s in %s", aip_path, cwd)
+        aip.extract_all()
         assert os.path.isdir(
             aip_dir_path
         ), f"Failed to create dir {aip_dir_path} from compressed AIP at {aip_path}"
         return aip_dir_path
 
+    @staticmethod
+    def open_aip(aip_path, extract_dir=None):
+        """Return a ``LazyAIP`` that extracts the files of the compressed AIP
+        at ``aip_path`` into ``extract_dir`` when they are requested.
+        """
+        return lazy_aip.LazyAIP(aip_path, extract_dir=extract_dir)
+
 
 def get_aip_dir_name_from_archive(aip_path):
     cmd = shlex.split(f"7z l {aip_path}")
@@ -33,6 +33,7 @@ class Base:
         ("ss_password", c.DEFAULT_SS_PASSWORD),
         ("ss_url", c.DEFAULT_SS_URL),
         ("ss_api_key", c.DEFAULT_SS_API_KEY),
+        ("ss_api_key_cache_path", c.DEFAULT_SS_API_KEY_CACHE_PATH),
         ("driver_name", c.DEFAULT_DRIVER_NAME),
         ("ssh_accessible", None),
         ("ssh_requires_password", None),
@@ -45,6 +46,7 @@ class Base:
         ("optimistic_wait", c.OPTIMISTIC_WAIT),
         ("quick_wait", c.QUICK_WAIT),
         ("micro_wait", c.MICRO_WAIT),
+        ("job_wait_timeout", c.JOB_WAIT_TIMEOUT),
         (
             "max_click_transfer_directory_attempts",
             c.MAX_CLICK_TRANSFER_DIRECTORY_ATTEMPTS,
@@ -67,6 +69,8 @@ class Base:
             c.MAX_CHECK_TRANSFER_APPEARED_ATTEMPTS,
         ),
         ("max_check_for_ms_group_attempts", c.MAX_CHECK_FOR_MS_GROUP_ATTEMPTS),
+        ("download_chunk_size", c.DOWNLOAD_CHUNK_SIZE),
+        ("download_stall_timeout", c.DOWNLOAD_STALL_TIMEOUT),
     )
 
     url_stdports_re = re.compile(r":(?:80|443)/?$")
@@ -10,10 +10,20 @@ DEFAULT_SS_PASSWORD = "test"
 DEFAULT_SS_URL = "http://192.168.168.192:8000/"
 DEFAULT_AM_API_KEY = None
 DEFAULT_SS_API_KEY = None
+# File where the SS API keys retrieved from the SS are cached, by SS URL and
+# username. Set it to an empty value to disable the cache.
+DEFAULT_SS_API_KEY_CACHE_PATH = "~/.cache/amauat/ss-api-keys.json"
 DEFAULT_DRIVER_NAME = "Chrome"  # 'Firefox' should also work.
 DUMMY_VAL = "Archivematica Acceptance Test"
 METADATA_ATTRS = ("title", "creator")
 JOB_OUTPUTS_COMPLETE = ("Failed", "Completed successfully", "Awaiting decision")
+# Outputs shown in the dashboard for the job statuses returned by the jobs API
+JOB_STATUSES2OUTPUTS = {
+    "COMPLETE": "Completed successfully",
+    "FAILED": "Failed",
+    "USER_INPUT": "Awaiting decision",
+    "PROCESSING": "Executing command(s)",
+}
 TMP_DIR_NAME = ".amsc-tmp"
 PERM_DIR_NAME = "data"
 
@@ -336,6 +346,20 @@ OPTIMISTIC_WAIT = WAIT_FACTOR * 1
 QUICK_WAIT = WAIT_FACTOR * 0.5
 MICRO_WAIT = WAIT_FACTOR * 0.25
 
+# Maximum number of seconds to wait for a job to appear or complete
+JOB_WAIT_TIMEOUT = 7200
+
+# Maximum number of pages of tasks requested at the same time
+MAX_CONCURRENT_TASKS_PAGE_REQUESTS = 4
+
+# Maximum number of URLs (e.g., PURLs) resolved at the same time, in total and
+# per host
+MAX_CONCURRENT_URL_REQUESTS = 16
+MAX_CONCURRENT_URL_REQUESTS_PER_HOST = 4
+# Maximum number of requests per second sent to the same host when resolving
+# URLs
+MAX_URL_REQUESTS_PER_SECOND_PER_HOST = 10
+
 # Use-case-specific maximum attempt counters
 MAX_CLICK_TRANSFER_DIRECTORY_ATTEMPTS = 5
 MAX_CLICK_AIP_DIRECTORY_ATTEMPTS = 5
@@ -347,3 +371,9 @@ MAX_SEARCH_AIP_ARCHIVAL_STORAGE_ATTEMPTS = 120
 MAX_SEARCH_DIP_BACKLOG_ATTEMPTS = 120
 MAX_CHECK_TRANSFER_APPEARED_ATTEMPTS = 1000
 MAX_CHECK_FOR_MS_GROUP_ATTEMPTS = 7200
+
+# Size in bytes of the blocks in which AIPs and pointer files are downloaded
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds without receiving data after which a download is resumed
+DOWNLOAD_STALL_TIMEOUT = 1800
@@ -0,0 +1,162 @@
+"""Dashboard Snapshot.
+
+This module contains the ``DashboardSnapshot`` class, a model of the units
+(transfers or SIPs), micro-service groups and jobs shown in the Transfer or
+Ingest tab of the dashboard. The model is built by a single script run in the
+browser, so looking up a unit, group or job in it does not cost a WebDriver
+request per element.
+"""
+
+from . import utils
+
+# Return the units of the dashboard with their micro-service groups and jobs.
+# The DOM elements are returned as well (Selenium turns them into
+# ``WebElement`` instances) so that they can be clicked. Texts are normalized
+# like Selenium does, but they are read even if the element is hidden, e.g.,
+# in a collapsed micro-service group, so jobs also say whether they are
+# rendered.
+SNAPSHOT_SCRIPT = """
+function text(el) {
+    return el ? el.textContent.replace(/\\s+/g, " ").trim() : "";
+}
+function map(els, func) {
+    return Array.prototype.map.call(els, func);
+}
+return map(document.querySelectorAll("div.sip"), function (sipEl) {
+    var rowEl = sipEl.querySelector("[id^='sip-row-']");
+    var abbrEl = sipEl.querySelector("div.sip-detail-directory abbr");
+    return {
+        elem: sipEl,
+        row_uuid: rowEl ? rowEl.id.slice("sip-row-".length) : null,
+        directory: text(sipEl.querySelector("div.sip-detail-directory")),
+        abbr_uuid: abbrEl ? (abbrEl.getAttribute("title") || "").trim() : null,
+        abbr_displayed: abbrEl ? abbrEl.getClientRects().length > 0 : false,
+        uuid_text: text(sipEl.querySelector("div.sip-detail-uuid")),
+        groups: map(sipEl.querySelectorAll("div.microservicegroup"), function (groupEl) {
+            return {
+                elem: groupEl,
+                name: text(groupEl.querySelector("span.microservice-group-name")),
+                jobs: map(groupEl.querySelectorAll("div.job"), function (jobEl) {
+                    return {
+                        elem: jobEl,
+                        visible: jobEl.getClientRects().length > 0,
+                        microservices: map(
+                            jobEl.querySelectorAll("div.job-detail-microservice span"),
+                            function (spanEl) {
+                                return {
+                                    name: text(spanEl),
+                                    title: (spanEl.getAttribute("title") || "").trim()
+                                };
+                            }
+                        ),
+                        output: text(jobEl.querySelector("div.job-detail-currentstep span"))
+                    };
+                })
+            };
+        })
+    };
+});
+"""
+
+
+def get_micro_service_group_name(group_name, vn):
+    """Return the name of the micro-service group ``group_name`` as shown in
+    the dashboard of AM version ``vn``.
+    """
+    if vn == "1.6":
+        return f"Micro-service: {group_name}"
+    return f"Microservice: {group_name}"
+
+
+class DashboardSnapshot:
+    """The units, micro-service groups and jobs of the dashboard at one point
+    in time, e.g.::
+
+        >>> snapshot = DashboardSnapshot.take(driver)
+        >>> group = snapshot.get_group(unit_uuid, "Microservice: Approve transfer")
+        >>> job = snapshot.get_job(group, "Approve standard transfer")
+        >>> job["uuid"], job["output"]
+
+    Units, groups and jobs are dicts with the DOM element under ``"elem"``.
+    Jobs of collapsed groups are included too, with ``"visible"`` set to
+    ``False``.
+    A new snapshot has to be taken to see changes in the dashboard.
+    """
+
+    def __init__(self, units):
+        self.units = units
+
+    @classmethod
+    def take(cls, driver):
+        return cls(driver.execute_script(SNAPSHOT_SCRIPT) or [])
+
+    def get_unit(self, unit_uuid):
+        """Return the unit with UUID ``unit_uuid``, or ``None``."""
+        result = None
+        for unit in self.units:
+            if unit["row_uuid"] == unit_uuid:
+                result = unit
+        return result
+
+    def find_unit(self, name, name_is_prefix=False):
+        """Return the unit named ``name`` (or whose name starts with ``name``)
+        and its name, or ``(None, None)``. The last matching unit is returned,
+        like ``wait_for_transfer_to_appear`` used to do.
+        """
+        result = None, None
+        for unit in self.units:
+            unit_name = get_unit_name(unit)
+            if name_is_prefix:
+                matches = unit_name.startswith(name)
+            else:
+                matches = unit_name == name
+            if matches:
+                result = unit, unit_name
+        return result
+
+    def get_group(self, unit_uuid, group_name):
+        """Return the micro-service group whose name is ``group_name`` (see
+        ``get_micro_service_group_name``) of the unit with UUID ``unit_uuid``,
+        or ``None``.
+        """
+        unit = self.get_unit(unit_uuid)
+        if unit is None:
+            return None
+        for group in unit["groups"]:
+            if group["name"] == group_name:
+                return group
+        return None
+
+    @staticmethod
+    def get_job(group, ms_name, squash=True):
+        """Return the job of micro-service ``ms_name`` in ``group`` with its
+        UUID under ``"uuid"``, or ``None``. Names are compared with
+        ``utils.squash`` unless ``squash`` is ``False``.
+        """
+        if group is None:
+            return None
+        if squash:
+            ms_name = utils.squash(ms_name)
+        for job in group["jobs"]:
+            for microservice in job["microservices"]:
+                name = microservice["name"]
+                if (utils.squash(name) if squash else name) == ms_name:
+                    return dict(job, uuid=microservice["title"])
+        return None
+
+
+def get_unit_name(unit):
+    """Return the name of ``unit`` without the "UUID" label of its UUID."""
+    name = unit["directory"]
+    if name.endswith("UUID"):
+        name = name[:-4].strip()
+    return name
+
+
+def get_unit_uuid(unit):
+    """Return the UUID of ``unit`` where the dashboard shows it, which depends
+    on the width of the browser window.
+    """
+    if unit["abbr_displayed"] and unit["abbr_uuid"]:
+        return unit["abbr_uuid"]
+    return unit["uuid_text"]
@@ -0,0 +1,224 @@
+"""Lazy AIP.
+
+This module contains the ``LazyAIP`` class, which gives access to the files of
+a compressed AIP (7z, tar or zip) by extracting them only when they are needed.
+"""
+
+import bisect
+import logging
+import os
+import posixpath
+import subprocess
+import tarfile
+import tempfile
+import threading
+import weakref
+import zipfile
+
+from . import base
+
+logger = logging.getLogger("amuser.lazy_aip")
+
+
+class LazyAIPError(base.ArchivematicaUserError):
+    pass
+
+
+class LazyAIP:
+    """A view of a compressed AIP that lists the archive once and extracts its
+    members on demand, e.g.::
+
+        >>> aip = LazyAIP("/tmp/transfer-9f4a(...).7z")
+        >>> mets_path = aip.get_path("data/METS.9f4a(...).xml")
+
+    Members are extracted under ``extract_dir`` and only once. Requesting a
+    directory extracts its whole subtree. Using the instance itself as a path
+    (it implements ``os.PathLike``) extracts the entire AIP and returns the
+    path of its root directory, so code that walks the tree keeps working;
+    converting it to a string does the same.
+    """
+
+    def __init__(self, archive_path, extract_dir=None):
+        self.archive_path = archive_path
+        self.extract_dir = extract_dir or tempfile.mkdtemp()
+        self._archive = _open_archive(archive_path)
+        self.members = sorted(self._archive.list())
+        if not self.members:
+            raise LazyAIPError(f"Archive {archive_path} is empty")
+        # The AIP directory is the top level directory of the archive.
+        self.root = min((member.split("/", 1)[0] for member in self.members), key=len)
+        self.path = os.path.join(self.extract_dir, self.root)
+        self._extracted = set()
+        self._fully_extracted = False
+        self._lock = threading.Lock()
+        self._remove_archive = None
+
+    def __fspath__(self):
+        return self.extract_all()
+
+    def __str__(self):
+        return self.extract_all()
+
+    def __repr__(self):
+        return f"LazyAIP({self.archive_path!r}, extract_dir={self.extract_dir!r})"
+
+    def remove_archive_when_done(self):
+        """Remove the archive once the AIP is fully extracted, or when the
+        instance is garbage collected or the process exits.
+        """
+        self._remove_archive = weakref.finalize(self, _remove_file, self.archive_path)
+        if self._fully_extracted:
+            self._remove_archive()
+
+    def get_path(self, relative_path):
+        """Extract the member at ``relative_path`` (relative to the AIP
+        directory), and all its descendants if it is a directory, and return
+        its local path. The path of a member that is not in the AIP is
+        returned as well, but nothing exists there.
+        """
+        member = posixpath.join(self.root, relative_path.replace(os.sep, "/"))
+        member = member.rstrip("/")
+        with self._lock:
+            if not self._fully_extracted:
+                pending = [
+                    name
+                    for name in self._get_subtree(member)
+                    if name not in self._extracted
+                ]
+                if pending:
+                    logger.info(
+                        "Extracting %d members of %s", len(pending), self.archive_path
+                    )
+                    self._archive.extract(pending, self.extract_dir)
+                    self._extracted.update(pending)
+        return os.path.join(self.path, relative_path)
+
+    def extract_all(self):
+        """Extract the whole AIP and return the path of its directory."""
+        with self._lock:
+            if not self._fully_extracted:
+                logger.info("Extracting all of %s", self.archive_path)
+                self._archive.extract_all(self.extract_dir)
+                self._fully_extracted = True
+                if self._remove_archive is not None:
+                    self._remove_archive()
+        return self.path
+
+    def _get_subtree(self, member):
+        start = bisect.bisect_left(self.members, member)
+        result = []
+        if start < len(self.members) and self.members[start] == member:
+            result.append(member)
+        # Members under ``member`` sort between ``member/`` and ``member0``
+        # since "0" is the character that follows "/".
+        start = bisect.bisect_left(self.members, member + "/")
+        end = bisect.bisect_left(self.members, member + "0")
+        result.extend(self.members[start:end])
+        return result
+
+
+def _remove_file(path):
+    """Remove the file at ``path``, and its directory if it is left empty."""
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def _open_archive(archive_path):
+    if tarfile.is_tarfile(archive_path):
+        return _TarArchive(archive_path)
+    if zipfile.is_zipfile(archive_path):
+        return _ZipArchive(archive_path)
+    if os.path.splitext(archive_path)[1] == ".7z":
+        return _SevenZipArchive(archive_path)
+    raise LazyAIPError(f"Unsupported archive format: {archive_path}")
+
+
+class _SevenZipArchive:
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+
+    def list(self):
+        """Parse the technical listing (``-slt``) of the archive, which has a
+        block of ``Key = Value`` lines per member after a ``----------`` line.
+        """
+        output = self._run("l", "-slt")
+        members = []
+        in_members = False
+        for line in output.splitlines():
+            if line.startswith("----------"):
+                in_members = True
+            elif in_members and line.startswith("Path = "):
+                members.append(line[len("Path = ") :].replace(os.sep, "/"))
+        return members
+
+    def extract(self, members, extract_dir):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as listfile:
+            listfile.write("\n".join(members))
+            listfile.flush()
+            # -spd disables wildcard matching so that names are taken as is.
+            self._run("x", "-y", "-spd", f"-o{extract_dir}", listfiles=[listfile.name])
+
+    def extract_all(self, extract_dir):
+        self._run("x", "-y", f"-o{extract_dir}")
+
+    def _run(self, command, *switches, listfiles=()):
+        cmd = ["7z", command, *switches, self.archive_path]
+        cmd.extend(f"@{listfile}" for listfile in listfiles)
+        try:
+            return subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode("utf8")
+        except (OSError, subprocess.CalledProcessError) as err:
+            raise LazyAIPError(f"7z failed on {self.archive_path}: {err}")
+
+
+class _TarArchive:
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+
+    def list(self):
+        with tarfile.open(self.archive_path) as tar:
+            return [member.name.rstrip("/") for member in tar.getmembers()]
+
+    def extract(self, members, extract_dir):
+        members = set(members)
+        with tarfile.open(self.archive_path) as tar:
+            self._extractall(
+                tar,
+                extract_dir,
+                [m for m in tar.getmembers() if m.name.rstrip("/") in members],
+            )
+
+    def extract_all(self, extract_dir):
+        with tarfile.open(self.archive_path) as tar:
+            self._extractall(tar, extract_dir)
+
+    @staticmethod
+    def _extractall(tar, extract_dir, members=None):
+        # Extraction filters are only available in recent Python versions.
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(extract_dir, members=members, filter="data")
+        else:
+            tar.extractall(extract_dir, members=members)
+
+
+class _ZipArchive:
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+
+    def list(self):
+        with zipfile.ZipFile(self.archive_path) as zip_file:
+            return [name.rstrip("/") for name in zip_file.namelist()]
+
+    def extract(self, members, extract_dir):
+        members = set(members)
+        with zipfile.ZipFile(self.archive_path) as zip_file:
+            zip_file.extractall(
+                extract_dir,
+                [n for n in zip_file.namelist() if n.rstrip("/") in members],
+            )
+
+    def extract_all(self, extract_dir):
+        with zipfile.ZipFile(self.archive_path) as zip_file:
+            zip_file.extractall(extract_dir)
@@ -0,0 +1,460 @@
+"""METS Digest.
+
+This module contains the ``METSDigest`` class, which keeps what the METS
+assertions read from a METS file (its file inventory, PREMIS events, rights,
+metadata sections and structMap paths) in an SQLite database next to it, so
+that running the assertions again does not parse the XML again.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+
+from . import am_mets_ability
+from . import base
+from . import constants as c
+
+logger = logging.getLogger("amuser.mets_digest")
+
+# Increment it whenever the schema or its contents change so that digests
+# written by older versions are built again.
+SCHEMA_VERSION = 1
+
+DIGEST_SUFFIX = ".mets-digest.sqlite"
+
+AIP_METS_NAME_RE = re.compile(
+    r"^METS\.([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.xml$"
+)
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    row INTEGER PRIMARY KEY,
+    id TEXT,
+    uuid TEXT,
+    use TEXT,
+    path TEXT,
+    amd_sec_id TEXT,
+    dmd_ids TEXT
+);
+CREATE TABLE amd_secs (id TEXT PRIMARY KEY, object_uuid TEXT);
+CREATE TABLE events (
+    amd_sec_id TEXT,
+    type TEXT,
+    detail TEXT,
+    outcome TEXT,
+    outcome_detail_note TEXT,
+    linked_object TEXT
+);
+CREATE INDEX events_amd_sec_id ON events (amd_sec_id);
+CREATE TABLE md_secs (id TEXT, section TEXT, md_type TEXT);
+CREATE TABLE rights (rights_md_id TEXT, linking_object TEXT);
+CREATE TABLE struct_maps (id INTEGER PRIMARY KEY, type TEXT, label TEXT);
+CREATE TABLE divs (
+    struct_map INTEGER,
+    path TEXT,
+    type TEXT,
+    dmd_ids TEXT,
+    file_id TEXT
+);
+"""
+
+MD_SECTIONS = ("techMD", "rightsMD", "sourceMD", "digiprovMD")
+
+NORMATIVE_STRUCT_MAP_LABEL = "Normative Directory Structure"
+
+
+class METSDigestError(base.ArchivematicaUserError):
+    pass
+
+
+def get_digest_path(mets_path):
+    """Return the path of the digest of the METS file at ``mets_path``. The
+    digest of an AIP METS file (``<AIP>-<UUID>/data/METS.<UUID>.xml``) is
+    kept next to the AIP directory rather than inside it, so that it is not
+    taken for part of the AIP. Other digests are kept next to their METS
+    file.
+    """
+    mets_path = os.path.abspath(os.fspath(mets_path))
+    data_dir, mets_name = os.path.split(mets_path)
+    aip_dir = os.path.dirname(data_dir)
+    match = AIP_METS_NAME_RE.match(mets_name)
+    if (
+        match
+        and os.path.basename(data_dir) == "data"
+        and os.path.basename(aip_dir).endswith(match.group(1))
+    ):
+        return aip_dir + DIGEST_SUFFIX
+    return mets_path + DIGEST_SUFFIX
+
+
+def _get_stamp(mets_path):
+    stat = os.stat(mets_path)
+    return {
+        "schema_version": str(SCHEMA_VERSION),
+        "mets_size": str(stat.st_size),
+        "mets_mtime_ns": str(stat.st_mtime_ns),
+    }
+
+
+class METSDigest:
+    """SQLite digest of the METS file at ``mets_path``.
+
+    Use ``load`` to open the digest of a METS file, which returns ``None`` if
+    it does not exist or the METS file changed since it was written, and
+    ``build`` to write it from the parsed METS document. Each query opens its
+    own read-only connection, so instances can be shared between threads.
+    """
+
+    def __init__(self, mets_path, path):
+        self.mets_path = mets_path
+        self.path = path
+
+    def __repr__(self):
+        return f"METSDigest({self.mets_path!r}, {self.path!r})"
+
+    @classmethod
+    def load(cls, mets_path, path=None):
+        """Return the digest of the METS file at ``mets_path`` or ``None``
+        if there is no up to date digest at ``path``.
+        """
+        path = path or get_digest_path(mets_path)
+        if not os.path.isfile(path):
+            return None
+        digest = cls(mets_path, path)
+        try:
+            meta = dict(digest._query("SELECT key, value FROM meta"))
+        except sqlite3.Error as err:
+            logger.warning("Ignoring the unreadable METS digest %s: %s", path, err)
+            return None
+        if meta != _get_stamp(mets_path):
+            logger.info("Ignoring the outdated METS digest %s", path)
+            return None
+        return digest
+
+    @classmethod
+    def build(cls, mets_path, mets_doc, path=None, ns=None):
+        """Write the digest of the METS file at ``mets_path``, parsed as
+        ``mets_doc`` (an lxml element or element tree), to ``path`` and
+        return it. The database is written to a temporary file first so that
+        readers never see a partial digest.
+        """
+        path = path or get_digest_path(mets_path)
+        stamp = _get_stamp(mets_path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            connection = sqlite3.connect(tmp_path)
+            try:
+                with connection:
+                    connection.executescript(SCHEMA)
+                    _write_digest(connection, mets_doc, ns or c.METS_NSMAP)
+                    connection.executemany(
+                        "INSERT INTO meta VALUES (?, ?)", sorted(stamp.items())
+                    )
+            finally:
+                connection.close()
+        except sqlite3.Error as err:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise METSDigestError(f"Cannot write the METS digest {path}: {err}")
+        os.replace(tmp_path, path)
+        logger.info("Wrote the METS digest %s", path)
+        return cls(mets_path, path)
+
+    def _query(self, sql, params=()):
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def get_file_summary(self):
+        """Return the ``METSFileSummary`` of the files of the METS file."""
+        rows = self._query(
+            "SELECT f.uuid, f.use, f.path, f.amd_sec_id, a.id IS NOT NULL,"
+            " a.object_uuid FROM files f LEFT JOIN amd_secs a"
+            " ON a.id = f.amd_sec_id ORDER BY f.row"
+        )
+        event_counts = {}
+        for row, event_type, count in self._query(
+            "SELECT f.row, e.type, COUNT(*) FROM files f JOIN events e"
+            " ON e.amd_sec_id = f.amd_sec_id GROUP BY f.row, e.type"
+        ):
+            counts = event_counts.get(event_type)
+            if counts is None:
+                counts = event_counts[event_type] = [0] * len(rows)
+            counts[row] = count
+        columns = list(zip(*rows)) or [(), (), (), (), (), ()]
+        return am_mets_ability.METSFileSummary.from_columns(
+            *columns, event_counts=event_counts
+        )
+
+    def iter_premis_events(self, event_types=None):
+        """Yield the PREMIS events of the METS file as dicts with the same
+        keys as ``ArchivematicaMETSAbility.iter_premis_events``.
+        """
+        sql = (
+            "SELECT type, detail, outcome, outcome_detail_note, linked_object"
+            " FROM events"
+        )
+        params = ()
+        if event_types is not None:
+            params = tuple(event_types)
+            sql += " WHERE type IN ({})".format(", ".join("?" * len(params)))
+        for row in self._query(sql + " ORDER BY rowid", params):
+            yield dict(
+                zip(
+                    (
+                        "event_type",
+                        "event_detail",
+                        "event_outcome",
+                        "event_outcome_detail_note",
+                        "linked_object",
+                    ),
+                    row,
+                )
+            )
+
+    def get_md_section_ids(self, section, md_type):
+        """Return the set of IDs of the ``section`` elements (e.g. 'dmdSec'
+        or 'rightsMD') that wrap or reference metadata of type ``md_type``.
+        """
+        return {
+            md_sec_id
+            for (md_sec_id,) in self._query(
+                "SELECT id FROM md_secs WHERE section = ? AND md_type = ?",
+                (section, md_type),
+            )
+        }
+
+    def get_rights_linking_object_identifiers(self):
+        """Return the set of the objects linked to the PREMIS rights
+        statements of the METS file.
+        """
+        return {
+            linking_object
+            for (linking_object,) in self._query("SELECT linking_object FROM rights")
+        }
+
+    def get_struct_map_entries(self, root_path, struct_map_type="physical"):
+        """Return a set of ``(relative path, type)`` tuples for the divs
+        under the div at ``root_path`` (its ``LABEL`` and those of its
+        ancestors joined) of the first structMap of type ``struct_map_type``,
+        like ``get_structmap_entries`` in the steps utilities.
+        """
+        prefix = root_path + os.sep
+        rows = self._query(
+            "SELECT d.path, d.type FROM divs d WHERE d.struct_map ="
+            " (SELECT MIN(id) FROM struct_maps WHERE type = ?)"
+            " AND substr(d.path, 1, ?) = ?",
+            (struct_map_type, len(prefix), prefix),
+        )
+        entries = set()
+        for path, type_ in rows:
+            if type_ not in ("Item", "Directory"):
+                msg = f'Cannot handle structMap items with attribute TYPE "{type_}"'
+                raise ValueError(msg)
+            entries.add((path[len(prefix) :], type_))
+        return entries
+
+    def get_entry_dmd_sec_ids(self, md_type):
+        """Return a list of ``(div type, file use, dmdSec ID)`` tuples, one
+        for each dmdSec of type ``md_type`` of each entry of the physical
+        structMap, where the file use is ``None`` for directories.
+
+        Entries are merged with those of the "Normative Directory Structure"
+        logical structMap as ``metsrw`` does: when it exists, only the
+        physical divs it lists are kept, and the directories that only it
+        lists (i.e., empty directories) are added. The dmdSecs of an item are
+        those of its div and of its file.
+        """
+        struct_maps = self._query("SELECT id, type, label FROM struct_maps")
+        physical = next(
+            (id_ for id_, type_, _ in struct_maps if type_ == "physical"), None
+        )
+        normative = next(
+            (
+                id_
+                for id_, type_, label in struct_maps
+                if type_ == "logical" and label == NORMATIVE_STRUCT_MAP_LABEL
+            ),
+            None,
+        )
+        if physical is None:
+            return []
+        rows = self._query(
+            "SELECT d.struct_map, d.path, d.type, d.dmd_ids, f.use, f.dmd_ids"
+            " FROM divs d LEFT JOIN files f ON f.id = d.file_id"
+            " WHERE d.struct_map IN (?, ?)",
+            (physical, normative),
+        )
+        # (path, type) => row
+        physical_divs = {row[1:3]: row for row in rows if row[0] == physical}
+        if normative is None:
+            divs = physical_divs.values()
+        else:
+            divs = []
+            for row in rows:
+                if row[0] != normative:
+                    continue
+                physical_row = physical_divs.get(row[1:3])
+                if physical_row is not None:
+                    divs.append(physical_row)
+                elif row[2] == "Directory":
+                    divs.append(row)
+        md_sec_ids = self.get_md_section_ids("dmdSec", md_type)
+        result = []
+        for _, _, type_, div_dmd_ids, use, file_dmd_ids in divs:
+            if type_ != "Directory" and use is None:
+                # Only the divs of directories and files are entries.
+                continue
+            dmd_ids = (div_dmd_ids or "").split()
+            if type_ != "Directory":
+                dmd_ids += [
+                    dmd_id
+                    for dmd_id in (file_dmd_ids or "").split()
+                    if dmd_id not in dmd_ids
+                ]
+            result.extend(
+                (type_, use if type_ != "Directory" else None, dmd_id)
+                for dmd_id in dmd_ids
+                if dmd_id in md_sec_ids
+            )
+        return result
+
+
+def _write_digest(connection, mets_doc, ns):
+    root = mets_doc.getroot() if hasattr(mets_doc, "getroot") else mets_doc
+    mets_ns = ns["mets"]
+    file_tag = f"{{{mets_ns}}}file"
+    amd_sec_tag = f"{{{mets_ns}}}amdSec"
+    dmd_sec_tag = f"{{{mets_ns}}}dmdSec"
+    struct_map_tag = f"{{{mets_ns}}}structMap"
+    href_attr = f"{{{ns['xlink']}}}href"
+    xpaths = am_mets_ability.METSXPaths
+    files = []
+    amd_secs = []
+    events = []
+    md_secs = []
+    rights = []
+    struct_maps = []
+    divs = []
+    for el in root.iter(file_tag, amd_sec_tag, dmd_sec_tag, struct_map_tag):
+        if el.tag == file_tag:
+            flocat_el = el.find("mets:FLocat", ns)
+            file_id = el.get("ID", "")
+            files.append(
+                (
+                    len(files),
+                    file_id,
+                    file_id.split("file-")[-1],
+                    el.getparent().get("USE") or "",
+                    flocat_el.get(href_attr) if flocat_el is not None else None,
+                    (el.get("ADMID") or "").split(" ")[0] or None,
+                    el.get("DMDID"),
+                )
+            )
+        elif el.tag == amd_sec_tag:
+            amd_sec_id = el.get("ID")
+            object_uuid = xpaths.first(xpaths.object_uuid, el)
+            object_uuid = object_uuid.text if object_uuid is not None else None
+            amd_secs.append((amd_sec_id, object_uuid))
+            for event_type_el in xpaths.event_types(el):
+                event_el = event_type_el.getparent()
+                events.append(
+                    (
+                        amd_sec_id,
+                        event_type_el.text,
+                        event_el.findtext(
+                            "premis:eventDetailInformation/premis:eventDetail",
+                            namespaces=ns,
+                        ),
+                        event_el.findtext(
+                            "premis:eventOutcomeInformation/premis:eventOutcome",
+                            namespaces=ns,
+                        ),
+                        event_el.findtext(
+                            "premis:eventOutcomeInformation"
+                            "/premis:eventOutcomeDetail"
+                            "/premis:eventOutcomeDetailNote",
+                            namespaces=ns,
+                        ),
+                        event_el.findtext(
+                            "premis:linkingObjectIdentifier"
+                            "/premis:linkingObjectIdentifierValue",
+                            namespaces=ns,
+                        )
+                        or object_uuid,
+                    )
+                )
+            for md_sec_el in el:
+                section = _get_localname(md_sec_el)
+                if section not in MD_SECTIONS:
+                    continue
+                md_secs.extend(_get_md_sec_rows(md_sec_el, section))
+                if section == "rightsMD":
+                    rights.extend(
+                        (md_sec_el.get("ID"), linking_object_el.text)
+                        for linking_object_el in xpaths.rights_linking_objects(
+                            md_sec_el
+                        )
+                    )
+        elif el.tag == dmd_sec_tag:
+            md_secs.extend(_get_md_sec_rows(el, "dmdSec"))
+        else:
+            struct_map_id = len(struct_maps)
+            struct_maps.append((struct_map_id, el.get("TYPE"), el.get("LABEL")))
+            divs.extend(_get_div_rows(el, struct_map_id, mets_ns))
+    connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", files)
+    # Like a dict, the last amdSec with a given ID wins.
+    connection.executemany("INSERT OR REPLACE INTO amd_secs VALUES (?, ?)", amd_secs)
+    connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", events)
+    connection.executemany("INSERT INTO md_secs VALUES (?, ?, ?)", md_secs)
+    connection.executemany("INSERT INTO rights VALUES (?, ?)", rights)
+    connection.executemany("INSERT INTO struct_maps VALUES (?, ?, ?)", struct_maps)
+    connection.executemany("INSERT INTO divs VALUES (?, ?, ?, ?, ?)", divs)
+
+
+def _get_localname(el):
+    # Comments and processing instructions have no tag name.
+    return el.tag.rpartition("}")[2] if isinstance(el.tag, str) else None
+
+
+def _get_md_sec_rows(md_sec_el, section):
+    md_sec_id = md_sec_el.get("ID")
+    md_types = {child.get("MDTYPE") for child in md_sec_el} - {None}
+    return [(md_sec_id, section, md_type) for md_type in sorted(md_types)]
+
+
+def _get_div_rows(struct_map_el, struct_map_id, mets_ns):
+    """Return a row for each ``mets:div`` of ``struct_map_el`` with a
+    ``LABEL``. Divs without one, and their descendants, have no path and are
+    skipped.
+    """
+    div_tag = f"{{{mets_ns}}}div"
+    fptr_tag = f"{{{mets_ns}}}fptr"
+    rows = []
+    pending = [(child, "") for child in reversed(struct_map_el)]
+    while pending:
+        div_el, parent_path = pending.pop()
+        if div_el.tag != div_tag:
+            continue
+        label = div_el.get("LABEL")
+        if not label:
+            continue
+        path = os.path.join(parent_path, label)
+        fptr_el = div_el.find(fptr_tag)
+        rows.append(
+            (
+                struct_map_id,
+                path,
+                div_el.get("TYPE"),
+                div_el.get("DMDID"),
+                fptr_el.get("FILEID") if fptr_el is not None else None,
+            )
+        )
+        pending.extend((child, path) for child in reversed(div_el))
+    return rows
@@ -2,7 +2,10 @@
 
 import logging
 import os
+import threading
+import time
 
+import requests
 from selenium import webdriver
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import TimeoutException
@@ -13,6 +16,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from . import base
+from . import dashboard
 
 logger = logging.getLogger("amuser.selenium")
 
@@ -21,21 +25,183 @@ class ArchivematicaSeleniumError(base.ArchivematicaUserError):
     pass
 
 
+class WebDriverPool:
+    """Pool of WebDriver sessions that outlive the ``ArchivematicaUser``
+    instances, which are created for each scenario, so that scenarios do not
+    have to start a browser and log in again.
+
+    Drivers are pooled by key (see ``ArchivematicaSeleniumAbility``), so a
+    driver is only reused by a user of the same browser and AM and SS
+    accounts. Released drivers keep their cookies, and so their logged in
+    sessions, but their extra windows are closed (except in Firefox, see
+    ``ArchivematicaSeleniumAbility.tear_down``) and the local and session
+    storage of their current page is cleared. A driver is quit instead of
+    being kept after ``max_uses`` uses, if it cannot be reset, or if
+    ``max_idle`` drivers with the same key are already idle, so that the pool
+    never accumulates drivers. Idle drivers that crashed are replaced when
+    acquired.
+    """
+
+    def __init__(self, max_uses=20, max_idle=1):
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.startup_seconds = 0.0
+        # key => [(driver, uses)]
+        self._idle = {}
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, create_driver):
+        """Return an idle driver with ``key`` or a new one created with
+        ``create_driver``.
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                driver, uses = idle.pop()
+            try:
+                # Any command fails if the browser crashed or the session ended.
+                driver.execute_script("return true;")
+            except WebDriverException as err:
+                logger.info("Discarding crashed pooled driver: %s", err)
+                with self._lock:
+                    self.discarded += 1
+                _quit(driver)
+                continue
+            with self._lock:
+                self._uses[id(driver)] = uses
+                self.reused += 1
+            return driver
+        start = time.monotonic()
+        driver = create_driver()
+        with self._lock:
+            self.startup_seconds += time.monotonic() - start
+            self.created += 1
+            self._uses[id(driver)] = 0
+        return driver
+
+    def discard(self, driver):
+        """Quit ``driver``, which was acquired from the pool, instead of
+        releasing it.
+        """
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.discarded += 1
+        _quit(driver)
+
+    def release(self, key, driver):
+        """Reset ``driver`` and keep it for the next ``acquire`` with
+        ``key``, or quit it.
+        """
+        with self._lock:
+            uses = self._uses.pop(id(driver), 0) + 1
+            if uses >= self.max_uses:
+                self.recycled += 1
+        if uses >= self.max_uses:
+            _quit(driver)
+            return
+        try:
+            self._reset(driver)
+        except WebDriverException as err:
+            logger.info("Discarding pooled driver that cannot be reset: %s", err)
+            with self._lock:
+                self.discarded += 1
+            _quit(driver)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((driver, uses))
+                return
+        _quit(driver)
+
+    @staticmethod
+    def _reset(driver):
+        # Getting the window handles can hang in Firefox.
+        if driver.capabilities.get("browserName") != "firefox":
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script(
+                "window.localStorage.clear(); window.sessionStorage.clear();"
+            )
+        except WebDriverException:
+            # Pages like about:blank have no storage.
+            pass
+        driver.get("about:blank")
+
+    def close(self):
+        """Quit all the idle drivers."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for drivers in idle.values():
+            for driver, _ in drivers:
+                _quit(driver)
+
+    def stats(self):
+        with self._lock:
+            created, reused = self.created, self.reused
+            recycled, discarded = self.recycled, self.discarded
+            startup_seconds = self.startup_seconds
+        average_startup = startup_seconds / created if created else 0
+        return {
+            "created": created,
+            "reused": reused,
+            "recycled": recycled,
+            "discarded": discarded,
+            "startup_seconds": round(startup_seconds, 1),
+            # Logging in again is not included.
+            "estimated_seconds_saved": round(reused * average_startup, 1),
+        }
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
 class ArchivematicaSeleniumAbility(base.Base):
     """Archivematica Selenium Ability: common, reusable Selenium-based
     functionality for superclasses.
+
+    If ``driver_pool`` is set to a ``WebDriverPool``, ``set_up`` takes the
+    driver from it and ``tear_down`` returns it instead of quitting it.
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.driver = None
         self.all_drivers = []
+        self.driver_pool = kwargs.get("driver_pool")
+
+    @property
+    def headless(self):
+        return os.environ.get("HEADLESS") == "1"
+
+    @property
+    def driver_pool_key(self):
+        return (
+            self.driver_name,
+            self.headless,
+            self.am_url,
+            self.am_username,
+            self.ss_url,
+            self.ss_username,
+        )
 
     def get_driver(self):
-        try:
-            headless = os.environ["HEADLESS"] == "1"
-        except KeyError:
-            headless = False
+        headless = self.headless
         if self.driver_name == "Chrome":
             options = webdriver.ChromeOptions()
             if headless:
@@ -54,29 +220,73 @@ class ArchivematicaSeleniumAbility(base.Base):
         return driver
 
     def set_up(self):
-        self.driver = self.get_driver()
+        if self.driver_pool is None:
+            self.driver = self.get_driver()
+        else:
+            self.driver = self.driver_pool.acquire(
+                self.driver_pool_key, self.get_driver
+            )
         # Do not maximize window in Chrome to workaround:
         # https://bugs.chromium.org/p/chromedriver/issues/detail?id=1901
         if self.driver_name not in ("Chrome-Hub", "Chrome"):
             self.driver.maximize_window()
 
+    def replace_driver(self):
+        """Quit the current driver and continue with a new one. A pooled
+        driver is discarded through the pool, which provides the new one.
+        """
+        if self.driver_pool is None:
+            self.driver.quit()
+            self.driver = self.get_driver()
+        else:
+            self.driver_pool.discard(self.driver)
+            self.driver = self.driver_pool.acquire(
+                self.driver_pool_key, self.get_driver
+            )
+
     def tear_down(self):
         """Tear down by closing all of the browser windows, clearing the
         temporary directory, and quitting all drivers.
         TODO: figure out why in some cases (with some browsers, e.g., Firefox)
         the following call to ``self.driver.window_handles`` causes Selenium to
         hang indefinitely.
+
+        With a driver pool, the current driver is returned to the pool and
+        only the other drivers are quit.
         """
-        if self.driver_name != "Firefox":
+        pooled_driver = None
+        if self.driver_pool is not None and self.driver is not None:
+            pooled_driver = self.driver
+            self.driver_pool.release(self.driver_pool_key, pooled_driver)
+        elif self.driver_name != "Firefox":
             for window_handle in self.driver.window_handles:
                 self.driver.switch_to.window(window_handle)
                 self.driver.quit()
         self.clear_tmp_dir()
         for driver in self.all_drivers:
-            try:
-                driver.quit()
-            except WebDriverException:
-                pass
+            if driver is not pooled_driver:
+                _quit(driver)
+
+    def get_cookie_session(self):
+        """Return a ``requests`` session that sends the cookies of the browser,
+        so that it is logged in wherever the browser is.
+        """
+        session = requests.session()
+        session.headers.update(
+            {
+                "User-Agent": "Mozilla/5.0 (Windows NT 6.3; WOW64) AppleWebKit/537.36 (KHTML,"
+                " like Gecko) Chrome/44.0.2403.157 Safari/537.36"
+            }
+        )
+        for cookie in self.driver.get_cookies():
+            session.cookies.update({cookie["name"]: cookie["value"]})
+        return session
+
+    def get_dashboard_snapshot(self):
+        """Return a ``dashboard.DashboardSnapshot`` of the Transfer or Ingest
+        tab open in the browser.
+        """
+        return dashboard.DashboardSnapshot.take(self.driver)
 
     def navigate(self, url, reload=False):
         """Navigate to ``url``; login and try again, if redirected."""
@@ -18,6 +18,7 @@ AM_URLS = (
     ),
     ("get_handle_config_url", "{}administration/handle/"),
     ("get_ingest_url", "{}ingest/"),
+    ("get_ingest_status_url", "{}ingest/status/"),
     ("get_installer_welcome_url", "{}installer/welcome/"),
     ("get_login_url", "{}administration/accounts/login/"),
     ("get_metadata_add_url", "{}ingest/{}/metadata/add/"),
@@ -1,7 +1,10 @@
 """Utilities for AM User."""
 
+import concurrent.futures
 import logging
+import threading
 import time
+from urllib import parse
 
 import requests
 
@@ -10,6 +13,29 @@ from . import constants as c
 logger = logging.getLogger("amuser.utils")
 
 
+def poll(timeout, min_interval, max_interval, backoff_factor=1.5):
+    """Generate attempts at checking for something for up to ``timeout``
+    seconds. The generator sleeps between attempts, for ``min_interval``
+    seconds at first and then for ``backoff_factor`` times longer each time, up
+    to ``max_interval`` seconds. It stops once the timeout has expired::
+
+        >>> for _ in poll(60, 1, 10):
+        ...     if is_ready():
+        ...         break
+        ... else:
+        ...     raise TimeoutError
+    """
+    deadline = time.monotonic() + timeout
+    interval = min_interval
+    while True:
+        yield
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff_factor, max_interval)
+
+
 def squash(string_):
     """Simple function that makes it easy to compare two strings for
     equality even if they have incidental (for our purposes) formatting
@@ -98,13 +124,88 @@ def unixtimestamp():
 
 def all_urls_resolve(urls):
     """Return ``True`` only if all URLs in ``urls`` return good status codes
-    when GET-requested.
+    when requested.
     """
-    for purl in urls:
-        r = requests.get(purl)
-        if r.status_code != 200:
-            return False
-    return True
+    return not get_unresolved_urls(urls)
+
+
+def get_unresolved_urls(
+    urls,
+    max_workers=c.MAX_CONCURRENT_URL_REQUESTS,
+    max_per_host=c.MAX_CONCURRENT_URL_REQUESTS_PER_HOST,
+    timeout=c.NIHILISTIC_WAIT,
+    max_rate_per_host=c.MAX_URL_REQUESTS_PER_SECOND_PER_HOST,
+):
+    """Resolve the distinct URLs in ``urls`` concurrently and return a dict
+    that maps each URL that does not resolve to the reason why, e.g. its
+    status code.
+
+    At most ``max_workers`` requests are in flight at any time and at most
+    ``max_per_host`` of them to the same host, which gets at most
+    ``max_rate_per_host`` requests per second. Each URL is requested with HEAD
+    first, and with GET if HEAD does not succeed, since some resolvers do not
+    implement HEAD.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    hosts = {parse.urlsplit(url).netloc for url in urls}
+    host_semaphores = {host: threading.BoundedSemaphore(max_per_host) for host in hosts}
+    host_rate_limiters = {host: _RateLimiter(1 / max_rate_per_host) for host in hosts}
+    max_workers = min(max_workers, len(urls))
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=len(host_semaphores), pool_maxsize=max_workers
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def resolve(url):
+            host = parse.urlsplit(url).netloc
+            with host_semaphores[host]:
+                return _resolve_url(session, url, timeout, host_rate_limiters[host])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            reasons = dict(zip(urls, executor.map(resolve, urls)))
+    unresolved = {url: reason for url, reason in reasons.items() if reason}
+    logger.info("%d of %d URLs do not resolve", len(unresolved), len(urls))
+    return unresolved
+
+
+class _RateLimiter:
+    """Space the calls to ``wait`` at least ``interval`` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_time = 0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _resolve_url(session, url, timeout, rate_limiter):
+    """Return ``None`` if ``url`` resolves, or the reason why it does not."""
+    try:
+        rate_limiter.wait()
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+        if response.status_code == 200:
+            return None
+    except requests.exceptions.RequestException as err:
+        logger.debug("HEAD request to %s failed: %s", url, err)
+    try:
+        rate_limiter.wait()
+        with session.get(url, timeout=timeout, stream=True) as response:
+            if response.status_code == 200:
+                return None
+            return f"status code {response.status_code}"
+    except requests.exceptions.RequestException as err:
+        return str(err)
 
 
 def micro_service2group(micro_service):
@@ -0,0 +1,313 @@
+"""Generator of synthetic Archivematica AIP METS files.
+
+The documents have the shape of the METS files written by Archivematica: a DC
+dmdSec, a dmdSec for the AIP and for each directory, an amdSec for each original file
+with its PREMIS object, events, agents and optionally rights, a fileSec, the
+physical structMap and the "Normative Directory Structure" logical structMap.
+They are written incrementally, so even documents with 100,000 files are
+generated without holding them in memory. Run it from the root of the
+repository to write one::
+
+    $ python -m benchmarks.mets_generator --files 10000 --depth 3 METS.xml
+"""
+
+import argparse
+import io
+import itertools
+import uuid
+
+from lxml import etree
+
+from amuser import constants as c
+
+NSMAP = c.METS_NSMAP
+METS = f"{{{NSMAP['mets']}}}"
+PREMIS = f"{{{NSMAP['premis']}}}"
+DC = f"{{{NSMAP['dc']}}}"
+DCTERMS = f"{{{NSMAP['dcterms']}}}"
+XLINK = f"{{{NSMAP['xlink']}}}"
+
+TRANSFER_NAME = "transfer"
+SIP_UUID = str(uuid.UUID(int=0))
+CREATED = "2020-01-01T00:00:00"
+HANDLE_PREFIX = "12345"
+RESOLVER_URL = "https://hdl.handle.net"
+
+# The event types Archivematica records for every original file, in order.
+EVENT_TYPES = (
+    "ingestion",
+    "message digest calculation",
+    "virus check",
+    "format identification",
+    "validation",
+    "normalization",
+    "fixity check",
+    "registration",
+)
+
+AGENTS = (
+    ("preservation system", "Archivematica-1.16", "software"),
+    ("repository code", "demo", "organization"),
+    ("Archivematica user pk", "1", "Archivematica user"),
+)
+
+
+class Layout:
+    """The directories and files of a synthetic AIP. Files are spread
+    round-robin over the directories at depth ``depth`` below ``objects``,
+    each directory having ``branching`` subdirectories.
+    """
+
+    def __init__(self, files, depth=2, branching=3):
+        leaves = [""]
+        self.directories = []
+        for _ in range(depth):
+            leaves = [
+                f"{parent}dir_{i}/" for parent in leaves for i in range(branching)
+            ]
+            self.directories.extend(leaf.rstrip("/") for leaf in leaves)
+        self.directories.sort()
+        self.files = sorted(
+            f"{leaves[i % len(leaves)]}file_{i}.txt" for i in range(files)
+        )
+        self.directory_uuids = {
+            path: str(uuid.UUID(int=(1 << 64) + i))
+            for i, path in enumerate(self.directories)
+        }
+        self.file_uuids = {
+            path: str(uuid.UUID(int=i + 1)) for i, path in enumerate(self.files)
+        }
+
+
+def write_mets(output, files, depth=2, branching=3, events_per_file=3, rights=True):
+    """Write a synthetic AIP METS file with ``files`` original files to
+    ``output``, a path or a binary file object. See ``Layout``. Each file has
+    ``events_per_file`` PREMIS events, whose types cycle over
+    ``EVENT_TYPES``, and a rightsMD if ``rights`` is set.
+    """
+    layout = Layout(files, depth=depth, branching=branching)
+    with etree.xmlfile(output, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(f"{METS}mets", nsmap=NSMAP):
+            xf.write(etree.Element(f"{METS}metsHdr", CREATEDATE=CREATED))
+            _write_dmd_secs(xf, layout)
+            for i, path in enumerate(layout.files):
+                xf.write(
+                    _make_amd_sec(
+                        i, layout.file_uuids[path], path, events_per_file, rights
+                    )
+                )
+            xf.write(_make_file_sec(layout))
+            xf.write(_make_struct_map(layout, normative=False))
+            xf.write(_make_struct_map(layout, normative=True))
+
+
+def generate_mets(files, **kwargs):
+    """Return the element tree of a synthetic AIP METS file. See
+    ``write_mets``.
+    """
+    output = io.BytesIO()
+    write_mets(output, files, **kwargs)
+    output.seek(0)
+    return etree.parse(output)
+
+
+def _sub(parent, tag, text=None, **attrib):
+    el = etree.SubElement(parent, tag, **attrib)
+    el.text = text
+    return el
+
+
+def _md_wrap(parent, md_type):
+    md_wrap = _sub(parent, f"{METS}mdWrap", MDTYPE=md_type)
+    return _sub(md_wrap, f"{METS}xmlData")
+
+
+def _add_premis_object(parent, object_uuid, path, category="file"):
+    obj = _sub(parent, f"{PREMIS}object", version="3.0")
+    identifiers = [("UUID", object_uuid)]
+    if category != "file":
+        identifiers.extend(
+            [
+                ("hdl", f"{HANDLE_PREFIX}/{object_uuid}"),
+                ("URI", f"{RESOLVER_URL}/{HANDLE_PREFIX}/{object_uuid}"),
+            ]
+        )
+    for identifier_type, value in identifiers:
+        identifier = _sub(obj, f"{PREMIS}objectIdentifier")
+        _sub(identifier, f"{PREMIS}objectIdentifierType", identifier_type)
+        _sub(identifier, f"{PREMIS}objectIdentifierValue", value)
+    if category == "file":
+        characteristics = _sub(obj, f"{PREMIS}objectCharacteristics")
+        fixity = _sub(characteristics, f"{PREMIS}fixity")
+        _sub(fixity, f"{PREMIS}messageDigestAlgorithm", "sha256")
+        _sub(fixity, f"{PREMIS}messageDigest", object_uuid.replace("-", "") * 2)
+        _sub(characteristics, f"{PREMIS}size", "1024")
+    _sub(obj, f"{PREMIS}originalName", path)
+    return obj
+
+
+def _write_dmd_secs(xf, layout):
+    dmd_sec = etree.Element(f"{METS}dmdSec", ID="dmdSec_dc", CREATED=CREATED)
+    dublincore = _sub(_md_wrap(dmd_sec, "DC"), f"{DCTERMS}dublincore")
+    _sub(dublincore, f"{DC}title", "Synthetic AIP")
+    _sub(dublincore, f"{DC}identifier", SIP_UUID)
+    xf.write(dmd_sec)
+    dmd_sec = etree.Element(f"{METS}dmdSec", ID="dmdSec_aip", CREATED=CREATED)
+    _add_premis_object(
+        _md_wrap(dmd_sec, "PREMIS:OBJECT"),
+        SIP_UUID,
+        f"{TRANSFER_NAME}-{SIP_UUID}",
+        category="intellectual entity",
+    )
+    xf.write(dmd_sec)
+    for i, path in enumerate(layout.directories):
+        dmd_sec = etree.Element(f"{METS}dmdSec", ID=f"dmdSec_dir_{i}", CREATED=CREATED)
+        _add_premis_object(
+            _md_wrap(dmd_sec, "PREMIS:OBJECT"),
+            layout.directory_uuids[path],
+            f"%SIPDirectory%objects/{path}/",
+            category="intellectual entity",
+        )
+        xf.write(dmd_sec)
+
+
+def _make_amd_sec(i, file_uuid, path, events_per_file, rights):
+    amd_sec = etree.Element(f"{METS}amdSec", ID=f"amdSec_{i}")
+    tech_md = _sub(amd_sec, f"{METS}techMD", ID=f"techMD_{i}")
+    _add_premis_object(
+        _md_wrap(tech_md, "PREMIS:OBJECT"), file_uuid, f"%SIPDirectory%objects/{path}"
+    )
+    if rights:
+        rights_md = _sub(amd_sec, f"{METS}rightsMD", ID=f"rightsMD_{i}")
+        statement = _sub(
+            _md_wrap(rights_md, "PREMIS:RIGHTS"), f"{PREMIS}rightsStatement"
+        )
+        _sub(statement, f"{PREMIS}rightsBasis", "Copyright")
+        linking_object = _sub(statement, f"{PREMIS}linkingObjectIdentifier")
+        _sub(linking_object, f"{PREMIS}linkingObjectIdentifierType", "UUID")
+        _sub(linking_object, f"{PREMIS}linkingObjectIdentifierValue", file_uuid)
+    event_types = itertools.islice(itertools.cycle(EVENT_TYPES), events_per_file)
+    for j, event_type in enumerate(event_types):
+        digiprov_md = _sub(amd_sec, f"{METS}digiprovMD", ID=f"digiprovMD_{i}_{j}")
+        event = _sub(_md_wrap(digiprov_md, "PREMIS:EVENT"), f"{PREMIS}event")
+        identifier = _sub(event, f"{PREMIS}eventIdentifier")
+        _sub(identifier, f"{PREMIS}eventIdentifierType", "UUID")
+        _sub(
+            identifier,
+            f"{PREMIS}eventIdentifierValue",
+            str(uuid.UUID(int=(2 << 64) + i * len(EVENT_TYPES) + j)),
+        )
+        _sub(event, f"{PREMIS}eventType", event_type)
+        _sub(event, f"{PREMIS}eventDateTime", CREATED)
+        detail = _sub(event, f"{PREMIS}eventDetailInformation")
+        _sub(detail, f"{PREMIS}eventDetail", f'program="synthetic"; {event_type}')
+        outcome = _sub(event, f"{PREMIS}eventOutcomeInformation")
+        _sub(outcome, f"{PREMIS}eventOutcome", "Pass")
+        outcome_detail = _sub(outcome, f"{PREMIS}eventOutcomeDetail")
+        _sub(outcome_detail, f"{PREMIS}eventOutcomeDetailNote", "Synthetic event")
+        for agent_type, value, _ in AGENTS:
+            agent = _sub(event, f"{PREMIS}linkingAgentIdentifier")
+            _sub(agent, f"{PREMIS}linkingAgentIdentifierType", agent_type)
+            _sub(agent, f"{PREMIS}linkingAgentIdentifierValue", value)
+    for k, (agent_type, value, role) in enumerate(AGENTS):
+        digiprov_md = _sub(amd_sec, f"{METS}digiprovMD", ID=f"digiprovMD_{i}_a{k}")
+        agent = _sub(_md_wrap(digiprov_md, "PREMIS:AGENT"), f"{PREMIS}agent")
+        identifier = _sub(agent, f"{PREMIS}agentIdentifier")
+        _sub(identifier, f"{PREMIS}agentIdentifierType", agent_type)
+        _sub(identifier, f"{PREMIS}agentIdentifierValue", value)
+        _sub(agent, f"{PREMIS}agentType", role)
+    return amd_sec
+
+
+def _make_file_sec(layout):
+    file_sec = etree.Element(f"{METS}fileSec")
+    file_grp = _sub(file_sec, f"{METS}fileGrp", USE="original")
+    for i, path in enumerate(layout.files):
+        file_uuid = layout.file_uuids[path]
+        file_el = _sub(
+            file_grp,
+            f"{METS}file",
+            ID=f"file-{file_uuid}",
+            GROUPID=f"Group-{file_uuid}",
+            ADMID=f"amdSec_{i}",
+        )
+        _sub(
+            file_el,
+            f"{METS}FLocat",
+            LOCTYPE="OTHER",
+            OTHERLOCTYPE="SYSTEM",
+            **{f"{XLINK}href": f"objects/{path}"},
+        )
+    return file_sec
+
+
+def _make_struct_map(layout, normative):
+    if normative:
+        struct_map = etree.Element(
+            f"{METS}structMap",
+            ID="structMap_2",
+            TYPE="logical",
+            LABEL="Normative Directory Structure",
+        )
+    else:
+        struct_map = etree.Element(
+            f"{METS}structMap",
+            ID="structMap_1",
+            TYPE="physical",
+            LABEL="Archivematica default",
+        )
+    aip_div = _sub(
+        struct_map,
+        f"{METS}div",
+        TYPE="Directory",
+        LABEL=f"{TRANSFER_NAME}-{SIP_UUID}",
+        DMDID="dmdSec_aip",
+    )
+    # Archivematica describes the SIP with the DC dmdSec of the objects
+    # directory.
+    divs = {
+        "": _sub(
+            aip_div, f"{METS}div", TYPE="Directory", LABEL="objects", DMDID="dmdSec_dc"
+        )
+    }
+    for i, path in enumerate(layout.directories):
+        parent, _, name = path.rpartition("/")
+        divs[path] = _sub(
+            divs[parent],
+            f"{METS}div",
+            TYPE="Directory",
+            LABEL=name,
+            DMDID=f"dmdSec_dir_{i}",
+        )
+    for path in layout.files:
+        parent, _, name = path.rpartition("/")
+        div = _sub(divs[parent], f"{METS}div", TYPE="Item", LABEL=name)
+        if not normative:
+            _sub(div, f"{METS}fptr", FILEID=f"file-{layout.file_uuids[path]}")
+    if normative:
+        _sub(divs[""], f"{METS}div", TYPE="Directory", LABEL="empty_dir")
+    return struct_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="path of the METS file to write")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--events-per-file", type=int, default=3)
+    parser.add_argument("--no-rights", dest="rights", action="store_false")
+    args = parser.parse_args()
+    write_mets(
+        args.output,
+        args.files,
+        depth=args.depth,
+        branching=args.branching,
+        events_per_file=args.events_per_file,
+        rights=args.rights,
+    )
+
+
+if __name__ == "__main__":
+    main()
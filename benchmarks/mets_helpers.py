@@ -0,0 +1,214 @@
+"""Benchmark of the METS ability and of the METS helpers of the steps.
+
+Generate synthetic AIP METS files (see ``benchmarks.mets_generator``) with
+each of the given numbers of files and time the METS queries run by the
+steps on them. Every case runs in its own process so that its peak resident
+set size can be recorded along with its best time. Results are written as
+JSON to compare runs and catch scaling regressions. Run it from the root of
+the repository (the steps utilities need ``features`` on the path)::
+
+    $ PYTHONPATH=features python -m benchmarks.mets_helpers \\
+        --files 1000 10000 100000 --output mets_helpers.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from lxml import etree
+
+from benchmarks import mets_generator
+
+# The cases import the modules they use so that the peak RSS of a case does not
+# include modules it does not need, e.g. the steps utilities and Selenium.
+
+
+def _parse(mets_path):
+    return etree.parse(mets_path)
+
+
+def _build_digest(mets_path, tmp_dir):
+    from amuser import mets_digest
+
+    return mets_digest.METSDigest.build(
+        mets_path,
+        _parse(mets_path),
+        path=os.path.join(tmp_dir, f"METS{mets_digest.DIGEST_SUFFIX}"),
+    )
+
+
+def _case_premis_events_tree(mets_path, tmp_dir):
+    from amuser.am_mets_ability import ArchivematicaMETSAbility
+
+    tree = _parse(mets_path)
+    return lambda: ArchivematicaMETSAbility.get_premis_events(tree)
+
+
+def _case_premis_events_streaming(mets_path, tmp_dir):
+    from amuser.am_mets_ability import ArchivematicaMETSAbility
+
+    return lambda: ArchivematicaMETSAbility.get_premis_events(mets_path)
+
+
+def _case_mets_entities(mets_path, tmp_dir):
+    from amuser import am_mets_ability
+
+    tree = _parse(mets_path)
+    return lambda: am_mets_ability._get_mets_entities(am_mets_ability.METSIndex(tree))
+
+
+def _case_file_summary(mets_path, tmp_dir):
+    from amuser.am_mets_ability import METSFileSummary
+
+    tree = _parse(mets_path)
+    return lambda: METSFileSummary(tree)
+
+
+def _case_filesec_files(mets_path, tmp_dir):
+    from features.steps import utils
+
+    tree = _parse(mets_path)
+    return lambda: utils.get_filesec_files(tree, use="original")
+
+
+def _case_transfer_dir_from_structmap(mets_path, tmp_dir):
+    from features.steps import utils
+
+    tree = _parse(mets_path)
+    return lambda: utils.get_transfer_dir_from_structmap(
+        tree, mets_generator.TRANSFER_NAME, mets_generator.SIP_UUID
+    )
+
+
+def _case_digest_build(mets_path, tmp_dir):
+    return lambda: _build_digest(mets_path, tmp_dir)
+
+
+def _case_digest_md_section_ids(mets_path, tmp_dir):
+    digest = _build_digest(mets_path, tmp_dir)
+    return lambda: digest.get_md_section_ids("rightsMD", "PREMIS:RIGHTS")
+
+
+def _case_digest_struct_map_entries(mets_path, tmp_dir):
+    digest = _build_digest(mets_path, tmp_dir)
+    return lambda: digest.get_struct_map_entries(
+        f"{mets_generator.TRANSFER_NAME}-{mets_generator.SIP_UUID}"
+    )
+
+
+def _case_digest_file_summary(mets_path, tmp_dir):
+    digest = _build_digest(mets_path, tmp_dir)
+    return digest.get_file_summary
+
+
+# Name => function that does the setup of a case given the METS path and a
+# temporary directory and returns the callable to time.
+CASES = {
+    "get_premis_events (tree)": _case_premis_events_tree,
+    "get_premis_events (streaming)": _case_premis_events_streaming,
+    "_get_mets_entities": _case_mets_entities,
+    "METSFileSummary": _case_file_summary,
+    "get_filesec_files": _case_filesec_files,
+    "get_transfer_dir_from_structmap": _case_transfer_dir_from_structmap,
+    "METSDigest.build": _case_digest_build,
+    "METSDigest.get_md_section_ids": _case_digest_md_section_ids,
+    "METSDigest.get_struct_map_entries": _case_digest_struct_map_entries,
+    "METSDigest.get_file_summary": _case_digest_file_summary,
+}
+
+
+def _get_peak_rss():
+    """Return the peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # It is in kilobytes on Linux but in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(name, mets_path, repeat):
+    """Set up and time the case ``name`` in this process and return its
+    results.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        case = CASES[name](mets_path, tmp_dir)
+        setup_peak_rss = _get_peak_rss()
+        best = min(timeit.repeat(case, number=1, repeat=repeat))
+    return {
+        "seconds": best,
+        "setup_peak_rss_bytes": setup_peak_rss,
+        "peak_rss_bytes": _get_peak_rss(),
+    }
+
+
+def run_case_in_subprocess(name, mets_path, repeat):
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.mets_helpers",
+            "--run-case",
+            name,
+            "--mets",
+            mets_path,
+            "--repeat",
+            str(repeat),
+        ]
+    )
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--events-per-file", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=None)
+    parser.add_argument("--output", help="path of the JSON file to write")
+    parser.add_argument("--run-case", choices=sorted(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--mets", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.mets, args.repeat)))
+        return
+    results = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "lxml": ".".join(map(str, etree.LXML_VERSION)),
+        "depth": args.depth,
+        "events_per_file": args.events_per_file,
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for files in args.files:
+            mets_path = os.path.join(tmp_dir, f"METS.{files}.xml")
+            mets_generator.write_mets(
+                mets_path,
+                files,
+                depth=args.depth,
+                events_per_file=args.events_per_file,
+            )
+            mets_size = os.path.getsize(mets_path)
+            print(f"{files} files, {mets_size / 1024**2:.1f} MiB METS")
+            for name in args.cases or CASES:
+                result = run_case_in_subprocess(name, mets_path, args.repeat)
+                result.update(name=name, files=files, mets_bytes=mets_size)
+                results["runs"].append(result)
+                print(
+                    f"  {name:<36} {result['seconds'] * 1000:10.1f} ms"
+                    f" {result['peak_rss_bytes'] / 1024**2:8.1f} MiB peak RSS"
+                )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmark of the precompiled METS XPath expressions.
+
+Compare the per-call cost of the queries the steps run once per file in a
+METS document with XPath strings (formatted and compiled on every call) and
+with the precompiled expressions of ``METSXPaths`` and the ``METSIndex`` ID
+maps. Run it from the root of the repository::
+
+    $ python -m benchmarks.xpath_registry --files 2000
+"""
+
+import argparse
+import timeit
+
+from amuser import constants as c
+from amuser.am_mets_ability import METSIndex
+from amuser.am_mets_ability import METSXPaths
+from benchmarks import mets_generator
+
+NSMAP = c.METS_NSMAP
+
+OBJECT_UUID_XPATH = (
+    "mets:techMD/mets:mdWrap/mets:xmlData/premis:object/"
+    'premis:objectIdentifier/premis:objectIdentifierType[text()="UUID"]/'
+    "../premis:objectIdentifierValue"
+)
+
+
+def get_cases(tree):
+    """Return (description, callable) pairs that each run a query once per
+    file of ``tree``.
+    """
+    files = METSXPaths.files_by_use(tree, use="original")
+    amd_sec_ids = [file_el.get("ADMID") for file_el in files]
+
+    def index_lookups():
+        # Includes building the index.
+        index = METSIndex(tree)
+        return [index.amd_secs[amd_sec_id] for amd_sec_id in amd_sec_ids]
+
+    amd_secs = index_lookups()
+
+    return [
+        (
+            "object UUID, XPath string",
+            lambda: [
+                amd_sec.xpath(OBJECT_UUID_XPATH, namespaces=NSMAP)
+                for amd_sec in amd_secs
+            ],
+        ),
+        (
+            "object UUID, precompiled",
+            lambda: [METSXPaths.object_uuid(amd_sec) for amd_sec in amd_secs],
+        ),
+        (
+            "amdSec by ID, formatted find",
+            lambda: [
+                tree.find(f'mets:amdSec[@ID="{amd_sec_id}"]', namespaces=NSMAP)
+                for amd_sec_id in amd_sec_ids
+            ],
+        ),
+        ("amdSec by ID, METSIndex", index_lookups),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    tree = mets_generator.generate_mets(args.files, events_per_file=0, rights=False)
+    print(f"{args.files} files, best of {args.repeat} runs")
+    for description, case in get_cases(tree):
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(
+            f"{description:<36} {best * 1000:10.2f} ms"
+            f" {best / args.files * 1e6:10.2f} us/file"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
+import asyncio
+import collections
 import logging
 import os
+import re
 
 import utils
 
 import amuser
+from amuser import selenium_ability
 from amuser.constants import APATHETIC_WAIT
+from amuser.constants import DOWNLOAD_CHUNK_SIZE
+from amuser.constants import DOWNLOAD_STALL_TIMEOUT
+from amuser.constants import JOB_WAIT_TIMEOUT
 from amuser.constants import MEDIUM_WAIT
 from amuser.constants import METS_NSMAP
 from amuser.constants import MICRO_WAIT
@@ -36,6 +43,7 @@ SS_USERNAME = "test"
 SS_PASSWORD = "test"
 SS_URL = "http://192.168.168.192:8000/"
 SS_API_KEY = None
+SS_API_KEY_CACHE_PATH = "~/.cache/amauat/ss-api-keys.json"
 SS_API_CONFIG_KEY = "storage_service"
 # Path relative to /home where transfer sources live.
 TRANSFER_SOURCE_PATH = "vagrant/archivematica-sampledata/TestTransfers/acceptance-tests"
@@ -64,6 +72,32 @@ MAX_SEARCH_DIP_BACKLOG_ATTEMPTS = 120
 MAX_CHECK_TRANSFER_APPEARED_ATTEMPTS = 1000
 MAX_CHECK_FOR_MS_GROUP_ATTEMPTS = 7200
 
+# Seconds during which the results of Storage Service topology lookups (e.g.,
+# the default transfer source location) are reused. Set to 0 to disable.
+SS_TOPOLOGY_CACHE_TTL = 300
+# Directory where the AIPs created from sample transfers are kept across runs
+# (see ``AIPResultCache`` in the steps utils module) and its maximum size.
+# The cache is disabled when no directory is set.
+AIP_CACHE_DIR = None
+AIP_CACHE_MAX_BYTES = 5 * 1024**3
+# Maximum number of sample transfers processed at the same time by the
+# pre-flight stage (see ``preflight_sample_transfers``).
+PREFLIGHT_CONCURRENCY = 4
+# Estimated memory in bytes that the parsed METS files shared between steps
+# (see ``METSCache`` in the steps utils module) may take.
+METS_CACHE_MAX_BYTES = 512 * 1024**2
+# Number of scenarios a pooled browser is used for before it is replaced (see
+# ``WebDriverPool`` in the selenium ability module).
+DRIVER_POOL_MAX_USES = 20
+
+SAMPLE_TRANSFER_STEP_PATTERN = re.compile(
+    r'^a "(?P<transfer_type>[^"]+)" transfer type located in'
+    r' "(?P<sample_transfer_path>[^"]+)"$'
+)
+# Steps of scenarios that change their AIP in the Storage Service, e.g., by
+# reingesting or deleting it. These scenarios never use cached AIPs.
+AIP_MODIFYING_STEP_PATTERN = re.compile(r"reingest|delet", re.IGNORECASE)
+
 
 def get_am_user(userdata):
     """Instantiate an ArchivematicaUser."""
@@ -79,6 +113,9 @@ def get_am_user(userdata):
             "ss_password": userdata.get("ss_password", SS_PASSWORD),
             "ss_url": userdata.get("ss_url", SS_URL),
             "ss_api_key": userdata.get("ss_api_key", SS_API_KEY),
+            "ss_api_key_cache_path": userdata.get(
+                "ss_api_key_cache", SS_API_KEY_CACHE_PATH
+            ),
             "driver_name": userdata.get("driver_name", DRIVER_NAME),
             "ssh_accessible": _bool(userdata.get("ssh_accessible", SSH_ACCESSIBLE)),
             "ssh_requires_password": _bool(
@@ -98,6 +135,9 @@ def get_am_user(userdata):
             "optimistic_wait": userdata.get("optimistic_wait", OPTIMISTIC_WAIT),
             "quick_wait": userdata.get("quick_wait", QUICK_WAIT),
             "micro_wait": userdata.get("micro_wait", MICRO_WAIT),
+            "job_wait_timeout": float(
+                userdata.get("job_wait_timeout", JOB_WAIT_TIMEOUT)
+            ),
             # User-customizable max attempt values:
             "max_click_transfer_directory_attempts": userdata.get(
                 "max_click_transfer_directory_attempts",
@@ -133,11 +173,151 @@ def get_am_user(userdata):
             "max_check_for_ms_group_attempts": userdata.get(
                 "max_check_for_ms_group_attempts", MAX_CHECK_FOR_MS_GROUP_ATTEMPTS
             ),
+            "download_chunk_size": int(
+                userdata.get("download_chunk_size", DOWNLOAD_CHUNK_SIZE)
+            ),
+            "download_stall_timeout": float(
+                userdata.get("download_stall_timeout", DOWNLOAD_STALL_TIMEOUT)
+            ),
         }
     )
     return amuser.ArchivematicaUser(**userdata)
 
 
+def get_api_clients_config(userdata):
+    return {
+        SS_API_CONFIG_KEY: {
+            "url": userdata.get("ss_url", SS_URL).rstrip("/"),
+            "username": userdata.get("ss_username", SS_USERNAME),
+            "api_key": userdata.get("ss_api_key", SS_API_KEY),
+        },
+        AM_API_CONFIG_KEY: {
+            "url": userdata.get("am_url", AM_URL).rstrip("/"),
+            "username": userdata.get("am_username", AM_USERNAME),
+            "api_key": userdata.get("am_api_key", AM_API_KEY),
+        },
+    }
+
+
+def configure_aip_result_cache(userdata, aip_result_cache):
+    aip_result_cache.path = userdata.get("aip_cache_dir", AIP_CACHE_DIR)
+    aip_result_cache.max_bytes = int(
+        userdata.get("aip_cache_max_bytes", AIP_CACHE_MAX_BYTES)
+    )
+    aip_result_cache.refresh = _bool(userdata.get("aip_cache_refresh", False))
+    # AIPs are only reused on the same AM and SS instances and builds. The
+    # build fields are the ones recorded in the "environment" of ``runs.json``.
+    aip_result_cache.fingerprint = {
+        "am_url": userdata.get("am_url", AM_URL).rstrip("/"),
+        "ss_url": userdata.get("ss_url", SS_URL).rstrip("/"),
+        "archivematica_version": userdata.get(
+            "archivematica_version", userdata.get("am_version", AM_VERSION)
+        ),
+        "archivematica_commit": userdata.get("archivematica_commit"),
+        "storage_service_version": userdata.get("storage_service_version"),
+        "storage_service_commit": userdata.get("storage_service_commit"),
+        "sampledata_commit": userdata.get("sampledata_commit"),
+    }
+
+
+def scenario_modifies_aip(scenario):
+    return any(
+        AIP_MODIFYING_STEP_PATTERN.search(step.name) for step in scenario.all_steps
+    )
+
+
+def get_sample_transfer_key(occurrences, scenario, transfer_type, sample_transfer_path):
+    """Return the key of the AIP of a sample transfer step of ``scenario``:
+    its transfer type, its sample transfer path and its occurrence, i.e., the
+    number of earlier steps of the run with the same transfer type and path
+    (counted in the ``occurrences`` counter), so that each step gets an AIP
+    of its own. The occurrence is ``None`` if the scenario modifies its AIP,
+    meaning that the AIP must not be cached.
+    """
+    if scenario_modifies_aip(scenario):
+        return transfer_type, sample_transfer_path, None
+    occurrence = occurrences[(transfer_type, sample_transfer_path)]
+    occurrences[(transfer_type, sample_transfer_path)] += 1
+    return transfer_type, sample_transfer_path, occurrence
+
+
+def get_sample_transfer_steps(context):
+    """Return the keys (see ``get_sample_transfer_key``) of the sample
+    transfer Given steps in the scenarios selected to run, in run order.
+    """
+    result = []
+    occurrences = collections.Counter()
+    for feature in context._runner.features:
+        if not feature.should_run(context.config):
+            continue
+        for scenario in feature.walk_scenarios():
+            if not scenario.should_run(context.config):
+                continue
+            for step in scenario.all_steps:
+                match = SAMPLE_TRANSFER_STEP_PATTERN.match(step.name)
+                if step.step_type == "given" and match:
+                    result.append(
+                        get_sample_transfer_key(
+                            occurrences,
+                            scenario,
+                            match.group("transfer_type"),
+                            match.group("sample_transfer_path"),
+                        )
+                    )
+    return result
+
+
+def preflight_sample_transfers(context):
+    """Create the AIPs of every sample transfer used by the selected scenarios
+    concurrently, before any scenario runs.
+
+    One transfer is started per step occurrence, since scenarios may modify
+    their AIP (e.g., by reingesting it). At most ``preflight_concurrency``
+    transfers are processed at the same time. The resulting transfer dicts are
+    stored in ``context.preflight_transfers``, keyed like in
+    ``get_sample_transfer_key``, for the sample transfer step to pick up.
+    Transfers that could not be created are left out, so their steps create
+    them again.
+    """
+    # Imported here because the steps utils module imports this one.
+    from features.steps import async_utils
+
+    userdata = context.config.userdata
+    concurrency = int(userdata.get("preflight_concurrency", PREFLIGHT_CONCURRENCY))
+    logger = logging.getLogger("amauat.environment")
+    keys = get_sample_transfer_steps(context)
+    logger.info(
+        "Pre-flight: creating %d AIPs from %d sample transfers",
+        len(keys),
+        len({key[:2] for key in keys}),
+    )
+
+    async def create_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        async with async_utils.AsyncAPIClient(
+            get_api_clients_config(userdata)
+        ) as client:
+
+            async def create(transfer_type, sample_transfer_path, occurrence):
+                async with semaphore:
+                    return await client.create_sample_transfer(
+                        sample_transfer_path,
+                        transfer_type=transfer_type,
+                        occurrence=occurrence,
+                    )
+
+            return await asyncio.gather(
+                *(create(*key) for key in keys), return_exceptions=True
+            )
+
+    context.preflight_transfers = collections.defaultdict(list)
+    for key, result in zip(keys, asyncio.run(create_all())):
+        if isinstance(result, Exception):
+            logger.warning("Pre-flight: could not create AIP for %s: %s", key, result)
+            continue
+        context.preflight_transfers[key].append(result)
+
+
 def before_all(context):
     logging_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     context.config.setup_logging(format=logging_format)
@@ -150,18 +330,63 @@ def before_all(context):
     formatter = logging.Formatter(logging_format)
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
+    # Imported here because the steps utils module imports this one.
+    from features.steps import utils as steps_utils
+
+    steps_utils.ss_topology_cache.ttl = float(
+        context.config.userdata.get("ss_topology_cache_ttl", SS_TOPOLOGY_CACHE_TTL)
+    )
+    configure_aip_result_cache(context.config.userdata, steps_utils.aip_result_cache)
+    steps_utils.mets_cache.max_bytes = int(
+        context.config.userdata.get("mets_cache_max_bytes", METS_CACHE_MAX_BYTES)
+    )
+    # Counts the sample transfer steps run (see ``get_sample_transfer_key``).
+    context.sample_transfer_occurrences = collections.Counter()
+    context.driver_pool = None
+    if _bool(context.config.userdata.get("driver_pool", False)):
+        context.driver_pool = selenium_ability.WebDriverPool(
+            max_uses=int(
+                context.config.userdata.get(
+                    "driver_pool_max_uses", DRIVER_POOL_MAX_USES
+                )
+            )
+        )
+    if _bool(context.config.userdata.get("preflight_aips", False)):
+        preflight_sample_transfers(context)
+
+
+def after_all(context):
+    """Log the usage statistics of the shared API connection pools, of the
+    Storage Service topology, AIP and METS caches and of the browser pool,
+    and quit the pooled browsers.
+    """
+    from features.steps import utils as steps_utils
+
+    logger = logging.getLogger("amauat.environment")
+    logger.info("API session pool stats: %s", steps_utils.api_session_registry.stats())
+    logger.info("SS topology cache stats: %s", steps_utils.ss_topology_cache.stats())
+    if steps_utils.aip_result_cache.path is not None:
+        logger.info("AIP result cache stats: %s", steps_utils.aip_result_cache.stats())
+    logger.info("METS cache stats: %s", steps_utils.mets_cache.stats())
+    if context.driver_pool is not None:
+        logger.info("Browser pool stats: %s", context.driver_pool.stats())
+        context.driver_pool.close()
+    steps_utils.api_session_registry.close()
 
 
 def before_scenario(context, scenario):
     """Instantiate an ``ArchivematicaUser`` instance. The ``ArchivematicaUser``
     instance creates many drivers/browsers. If we don't destroy then in between
     scenarios, we end up with too many and it causes the tests to fail. That is
-    why we are using ``before_scenario`` here and not ``before_all``.
+    why we are using ``before_scenario`` here and not ``before_all``. Only the
+    main browser of the user is kept across scenarios, in the browser pool,
+    when it is enabled.
     """
     userdata = context.config.userdata
     context.utils = utils
     if "driver_name" in userdata:
         context.am_user = get_am_user(userdata)
+        context.am_user.browser.driver_pool = context.driver_pool
         context.am_user.browser.set_up()
     context.TRANSFER_SOURCE_PATH = userdata.get(
         "transfer_source_path", TRANSFER_SOURCE_PATH
@@ -171,18 +396,7 @@ def before_scenario(context, scenario):
         "automation_tools_path", AUTOMATION_TOOLS_PATH
     )
     context.mets_nsmap = METS_NSMAP
-    context.api_clients_config = {
-        SS_API_CONFIG_KEY: {
-            "url": userdata.get("ss_url", SS_URL).rstrip("/"),
-            "username": userdata.get("ss_username", SS_USERNAME),
-            "api_key": userdata.get("ss_api_key", SS_API_KEY),
-        },
-        AM_API_CONFIG_KEY: {
-            "url": userdata.get("am_url", AM_URL).rstrip("/"),
-            "username": userdata.get("am_username", AM_USERNAME),
-            "api_key": userdata.get("am_api_key", AM_API_KEY),
-        },
-    }
+    context.api_clients_config = get_api_clients_config(userdata)
 
 
 def after_scenario(context, scenario):
@@ -10,6 +10,7 @@ from behave import use_step_matcher
 from behave import when
 from lxml import etree
 
+from amuser import am_mets_ability
 from features.steps import utils
 
 GPG_KEYS_DIR = "etc/gpgkeys"
@@ -94,6 +95,7 @@ def step_impl(context):
     context.am_user.browser.add_replicator_to_default_aip_stor_loc(
         replicator_location_uuid
     )
+    utils.ss_topology_cache.invalidate()
 
 
 @given(
@@ -109,6 +111,7 @@ def step_impl(context, attributes):
     context.scenario.location_uuid = context.am_user.browser.ensure_ss_location_exists(
         space_uuid, attributes
     )
+    utils.ss_topology_cache.invalidate()
 
 
 @given("an encrypted AIP in the standard GPG-encrypted space")
@@ -279,13 +282,8 @@ def step_impl(context, aip_description, second_aip_description, event_type):
     event_uuid = getattr(context.scenario, event_uuid_attr)
     with open(pointer_path) as filei:
         doc = etree.parse(filei)
-        premis_object_el = doc.find(
-            './/mets:mdWrap[@MDTYPE="PREMIS:OBJECT"]', context.am_user.mets.mets_nsmap
-        )
-        premis_relationship = premis_object_el.find(
-            "mets:xmlData/premis:object/premis:relationship",
-            context.am_user.mets.mets_nsmap,
-        )
+        xpaths = context.am_user.mets.xpaths
+        premis_relationship = xpaths.first(xpaths.pointer_premis_relationship, doc)
         premis_relationship_type = premis_relationship.find(
             "premis:relationshipType", context.am_user.mets.mets_nsmap
         ).text.strip()
@@ -674,16 +672,17 @@ def assert_pointer_transform_file_encryption(pointer_path, ns, fingerprint=None)
     with open(pointer_path) as filei:
         doc = etree.parse(filei)
         file_el = doc.find("mets:fileSec/mets:fileGrp/mets:file", ns)
+        xpaths = am_mets_ability.METSXPaths
         # <tranformFile> decryption element added, and decompression one
         # modified.
-        deco_tran_el = file_el.find(
-            'mets:transformFile[@TRANSFORMTYPE="decompression"]', ns
+        deco_tran_el = xpaths.first(
+            xpaths.transform_file, file_el, transform_type="decompression"
         )
         assert deco_tran_el is not None
         deco_transform_order = deco_tran_el.get("TRANSFORMORDER", ns)
         assert deco_transform_order == "2"
-        decr_tran_el = file_el.find(
-            'mets:transformFile[@TRANSFORMTYPE="decryption"]', ns
+        decr_tran_el = xpaths.first(
+            xpaths.transform_file, file_el, transform_type="decryption"
         )
         assert decr_tran_el is not None
         assert decr_tran_el.get("TRANSFORMORDER", ns) == "1"
@@ -696,17 +695,13 @@ def assert_pointer_transform_file_encryption(pointer_path, ns, fingerprint=None)
                 f" fingerprint {fingerprint}"
             )
         # premis:compositionLevel incremented
-        compos_lvl_el = doc.find(
-            "mets:amdSec/mets:techMD/mets:mdWrap/mets:xmlData/premis:object/premis:objectCharacteristics/premis:compositionLevel",
-            ns,
-        )
+        obj_chars_el = xpaths.first(xpaths.pointer_object_characteristics, doc)
+        assert obj_chars_el is not None
+        compos_lvl_el = obj_chars_el.find("premis:compositionLevel", ns)
         assert compos_lvl_el is not None
         assert compos_lvl_el.text.strip() == "2"
         # premis:inhibitors added
-        inhibitors_el = doc.find(
-            "mets:amdSec/mets:techMD/mets:mdWrap/mets:xmlData/premis:object/premis:objectCharacteristics/premis:inhibitors",
-            ns,
-        )
+        inhibitors_el = obj_chars_el.find("premis:inhibitors", ns)
         assert inhibitors_el is not None
         assert inhibitors_el.find("premis:inhibitorType", ns).text.strip() == ("GPG")
         assert inhibitors_el.find("premis:inhibitorTarget", ns).text.strip() == (
@@ -0,0 +1,148 @@
+"""Asynchronous API utilities for Steps files.
+
+The API helpers in ``utils`` are blocking. ``AsyncAPIClient`` exposes some of
+them as coroutines so a single process can drive many transfers at once: the
+HTTP requests run in a bounded pool of worker threads while units are waited
+for through the shared ``utils.UnitStatusPoller``, without holding a thread per
+unit.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from features.steps import utils
+
+logger = logging.getLogger("amauat.steps.async_utils")
+
+
+class AsyncAPIClient:
+    """Coroutine facade over the AM and SS API helpers in ``utils``.
+
+    At most ``max_concurrency`` API requests are in flight at any time. Use it
+    as an asynchronous context manager, or call ``close`` when done, to shut
+    down its worker threads::
+
+        async with AsyncAPIClient(context.api_clients_config) as client:
+            transfer = await client.start_transfer(transfer_path)
+            status = await client.wait_for_unit(transfer["transfer_uuid"])
+    """
+
+    def __init__(self, api_clients_config, max_concurrency=8, poller=None):
+        self.api_clients_config = api_clients_config
+        self.max_concurrency = max_concurrency
+        # Waits are delegated to the adaptive poller of the steps by default.
+        self.poller = poller or utils.unit_status_poller
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="async-api"
+        )
+        # Created lazily so that it is bound to the running event loop.
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def _call(self, func, *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def start_transfer(
+        self,
+        transfer_path,
+        transfer_name=None,
+        processing_config="automated",
+        transfer_type="standard",
+    ):
+        return await self._call(
+            utils.start_transfer,
+            self.api_clients_config,
+            transfer_path,
+            transfer_name=transfer_name,
+            processing_config=processing_config,
+            transfer_type=transfer_type,
+        )
+
+    async def check_unit_status(self, unit_uuid, unit="transfer"):
+        return await self._call(
+            utils.check_unit_status, self.api_clients_config, unit_uuid, unit
+        )
+
+    async def get_jobs(
+        self, unit_uuid, job_microservice=None, job_link_uuid=None, job_name=None
+    ):
+        return await self._call(
+            utils.get_jobs,
+            self.api_clients_config,
+            unit_uuid,
+            job_microservice=job_microservice,
+            job_link_uuid=job_link_uuid,
+            job_name=job_name,
+        )
+
+    async def download_package(self, package_uuid):
+        return await self._call(
+            utils.download_package, self.api_clients_config, package_uuid
+        )
+
+    async def copy_metadata_files(self, sip_uuid, relative_paths):
+        return await self._call(
+            utils.copy_metadata_files,
+            self.api_clients_config,
+            sip_uuid,
+            relative_paths,
+        )
+
+    async def wait_for_unit(self, unit_uuid, unit="transfer"):
+        """Wait for the ``unit`` ('transfer' or 'ingest') with UUID
+        ``unit_uuid`` to be COMPLETE or FAILED and return its last status
+        response. The unit is polled by ``poller`` (a
+        ``utils.UnitStatusPoller``) along with all the other units in flight.
+        """
+        resp = await asyncio.wrap_future(
+            self.poller.watch(self.api_clients_config, unit_uuid, unit)
+        )
+        logger.info("%s %s is %s", unit, unit_uuid, resp["status"])
+        return resp
+
+    async def create_sample_transfer(
+        self, sample_transfer_path, transfer_type="standard", occurrence=None
+    ):
+        """Coroutine version of ``utils.create_sample_transfer``."""
+        cache_key = utils.aip_result_cache.get_key(
+            sample_transfer_path, transfer_type, "automated", occurrence
+        )
+        transfer = await self._call(utils.aip_result_cache.get, cache_key)
+        if transfer is not None:
+            return transfer
+        transfer = await self._call(
+            utils.start_sample_transfer,
+            self.api_clients_config,
+            sample_transfer_path,
+            transfer_type=transfer_type,
+        )
+        transfer_result = {}
+        transfer_response = await self.wait_for_unit(transfer["transfer_uuid"])
+        if transfer_response["status"] != "FAILED":
+            sip_uuid = transfer_response["sip_uuid"]
+            ingest_response = await self.wait_for_unit(sip_uuid, "ingest")
+            if ingest_response["status"] != "FAILED":
+                transfer_result = await self._call(
+                    utils.extract_ingest_result, self.api_clients_config, sip_uuid
+                )
+        return await self._call(
+            utils.aip_result_cache.put,
+            cache_key,
+            utils.add_transfer_result(transfer, transfer_result),
+        )
@@ -7,13 +7,14 @@ contents of their AIPs without relying on user interface interactions.
 
 import os
 
-import metsrw
+import environment
 from behave import given
 from behave import then
 from behave import use_step_matcher
 from behave import when
 from lxml import etree
 
+from amuser import am_mets_ability
 from features.steps import utils
 
 # map the event types as written in the feature file
@@ -42,8 +43,23 @@ def format_no_files_error(transfer):
 
 @given('a "{transfer_type}" transfer type located in "{sample_transfer_path}"')
 def step_impl(context, transfer_type, sample_transfer_path):
+    key = environment.get_sample_transfer_key(
+        context.sample_transfer_occurrences,
+        context.scenario,
+        transfer_type,
+        sample_transfer_path,
+    )
+    # Use an AIP created by the pre-flight stage (see ``environment.py``) when
+    # there is one left for this sample transfer.
+    preflight_transfers = getattr(context, "preflight_transfers", {}).get(key)
+    if preflight_transfers:
+        context.current_transfer = preflight_transfers.pop()
+        return
     transfer = utils.create_sample_transfer(
-        context.api_clients_config, sample_transfer_path, transfer_type=transfer_type
+        context.api_clients_config,
+        sample_transfer_path,
+        transfer_type=transfer_type,
+        occurrence=key[2],
     )
     context.current_transfer = transfer
 
@@ -53,64 +69,41 @@ def step_impl(context):
     context.execute_steps(
         "Given a processing configuration for metadata only reingests\n"
     )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Select compression algorithm", choice_value="Uncompressed"
+    context.am_user.browser.set_processing_config_decisions(
+        {"Select compression algorithm": "Uncompressed"}
     )
-    context.am_user.browser.save_default_processing_config()
 
 
 @given("a processing configuration for metadata only reingests")
 def step_impl(context):
     context.am_user.browser.reset_default_processing_config()
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Normalize", choice_value="Do not normalize"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Reminder: add metadata if desired", choice_value="Continue"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Transcribe files (OCR)", choice_value="No"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store AIP", choice_value="Yes"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store AIP location", choice_value="Default location"
+    context.am_user.browser.set_processing_config_decisions(
+        {
+            "Normalize": "Do not normalize",
+            "Reminder: add metadata if desired": "Continue",
+            "Transcribe files (OCR)": "No",
+            "Store AIP": "Yes",
+            "Store AIP location": "Default location",
+        }
     )
-    context.am_user.browser.save_default_processing_config()
 
 
 @given("a processing configuration for partial reingests")
 def step_impl(context):
     context.am_user.browser.reset_default_processing_config()
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Normalize", choice_value="Normalize for access"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Approve normalization", choice_value="Yes"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Reminder: add metadata if desired", choice_value="Continue"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Transcribe files (OCR)", choice_value="No"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store AIP", choice_value="Yes"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store AIP location", choice_value="Default location"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Upload DIP", choice_value="Do not upload DIP"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store DIP", choice_value="Store DIP"
-    )
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Store DIP location", choice_value="Default location"
+    context.am_user.browser.set_processing_config_decisions(
+        {
+            "Normalize": "Normalize for access",
+            "Approve normalization": "Yes",
+            "Reminder: add metadata if desired": "Continue",
+            "Transcribe files (OCR)": "No",
+            "Store AIP": "Yes",
+            "Store AIP location": "Default location",
+            "Upload DIP": "Do not upload DIP",
+            "Store DIP": "Store DIP",
+            "Store DIP location": "Default location",
+        }
     )
-    context.am_user.browser.save_default_processing_config()
 
 
 @when(
@@ -186,7 +179,9 @@ def step_impl(context, metadata_file):
 
 @then("the AIP METS can be accessed and parsed by mets-reader-writer")
 def step_impl(context):
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
+    mets = utils.mets_cache.get_mets_document(
+        context.current_transfer["aip_mets_location"]
+    )
     error = (
         "METS read successfully by metsrw but does not contain an "
         "objects directory structure"
@@ -201,7 +196,9 @@ def step_impl(context):
     For each 'original' file entry assert that its path exists in the
     transfer directory.
     """
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
+    mets = utils.mets_cache.get_mets_document(
+        context.current_transfer["aip_mets_location"]
+    )
     # cache each query to the SS browse endpoint by directory name
     cached_directories = {}
     # look for an 'objects' directory in the transfer directory
@@ -272,15 +269,21 @@ def step_impl(context):
     "and metadata directories of the AIP"
 )
 def step_impl(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    filesec_files = utils.get_filesec_files(tree, nsmap=context.mets_nsmap)
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
+    filesec_files = utils.get_filesec_files(tree)
     assert filesec_files, format_no_files_error(context.current_transfer)
+    expected_entries = set()
     for filesec_file in filesec_files:
         flocat = filesec_file.find("mets:FLocat", namespaces=context.mets_nsmap)
         href = flocat.attrib["{http://www.w3.org/1999/xlink}href"]
-        assert os.path.exists(
-            os.path.join(context.current_transfer["extracted_aip_dir"], "data", href)
-        )
+        expected_entries.add((os.path.normpath(href), "Item"))
+    # The fileSec does not document directories.
+    utils.assert_entries_match_dir(
+        expected_entries,
+        os.path.join(context.current_transfer["extracted_aip_dir"], "data"),
+        "fileSec of the AIP METS",
+        types=("Item",),
+    )
 
 
 @then(
@@ -288,54 +291,52 @@ def step_impl(context):
 )
 def step_impl(context):
     root_path = os.path.join(context.current_transfer["extracted_aip_dir"], "data")
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    transfer_dir = utils.get_transfer_dir_from_structmap(
-        tree,
-        context.current_transfer["transfer_name"],
-        context.current_transfer["sip_uuid"],
-        nsmap=context.mets_nsmap,
+    digest = utils.mets_cache.get_digest(context.current_transfer["aip_mets_location"])
+    entries = digest.get_struct_map_entries(
+        "{}-{}".format(
+            context.current_transfer["transfer_name"],
+            context.current_transfer["sip_uuid"],
+        )
     )
     error = (
         'The {} file does not contain any "Directory" entries in its physical '
         "structMap".format(context.current_transfer["aip_mets_location"])
     )
-    assert len(transfer_dir), error
-    for item in transfer_dir:
-        utils.assert_structmap_item_path_exists(item, root_path)
+    assert entries, error
+    utils.assert_entries_match_dir(
+        entries, root_path, "physical structMap of the AIP METS"
+    )
 
 
 @then("every object in the AIP has been assigned a UUID in the AIP METS")
 def step_impl(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    filesec_files = utils.get_filesec_files(tree, nsmap=context.mets_nsmap)
-    assert filesec_files, format_no_files_error(context.current_transfer)
-    for filesec_file in filesec_files:
-        # remove the 'file-' prefix from the UUID of the file
-        file_uuid = filesec_file.attrib["ID"].split("file-")[-1]
-        amdsec_id = filesec_file.attrib["ADMID"]
-        amdsec = tree.find(
-            f'mets:amdSec[@ID="{amdsec_id}"]', namespaces=context.mets_nsmap
-        )
-        object_uuid = amdsec.xpath(
-            "mets:techMD/mets:mdWrap/mets:xmlData/premis:object/"
-            'premis:objectIdentifier/premis:objectIdentifierType[text()="UUID"]/'
-            "../premis:objectIdentifierValue",
-            namespaces=context.mets_nsmap,
-        )[0].text
-        assert object_uuid == file_uuid
+    summary = utils.mets_cache.get_file_summary(
+        context.current_transfer["aip_mets_location"]
+    )
+    assert len(summary), format_no_files_error(context.current_transfer)
+    # the file UUIDs exclude the 'file-' prefix of the IDs
+    mismatches = [
+        f"{summary.paths[i]}: {summary.object_uuids[i]} != {summary.file_uuids[i]}"
+        for i in summary.get_rows()
+        if summary.object_uuids[i] != summary.file_uuids[i]
+    ]
+    error = "Files whose PREMIS object UUID does not match their ID:\n  {}".format(
+        "\n  ".join(mismatches)
+    )
+    assert not mismatches, error
 
 
 @then("every object in the objects and metadata directories has an amdSec")
 def step_impl(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    filesec_files = utils.get_filesec_files(tree, nsmap=context.mets_nsmap)
-    assert filesec_files, format_no_files_error(context.current_transfer)
-    for filesec_file in filesec_files:
-        amdsec_id = filesec_file.attrib["ADMID"]
-        amdsec = tree.find(
-            f'mets:amdSec[@ID="{amdsec_id}"]', namespaces=context.mets_nsmap
-        )
-        assert amdsec is not None
+    summary = utils.mets_cache.get_file_summary(
+        context.current_transfer["aip_mets_location"]
+    )
+    assert len(summary), format_no_files_error(context.current_transfer)
+    missing = [
+        summary.paths[i] for i in summary.get_rows() if not summary.has_amd_secs[i]
+    ]
+    error = "Files without an amdSec:\n  {}".format("\n  ".join(missing))
+    assert not missing, error
 
 
 @then(
@@ -348,7 +349,7 @@ def step_impl(context):
         "repository code",
         "preservation system",
     }
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
     premis_events = tree.findall(
         'mets:amdSec/mets:digiprovMD/mets:mdWrap[@MDTYPE="PREMIS:EVENT"]/'
         "mets:xmlData/premis:event",
@@ -382,20 +383,23 @@ use_step_matcher("re")
 
 
 def assert_event_count(context, event_count, event_type):
+    """Assert that each original file in the AIP METS has ``event_count``
+    events of ``event_type``. Only the events in the amdSec of the first
+    ADMID of each file are counted (see ``METSFileSummary``), which is the
+    only one Archivematica gives original files.
+    """
     mets_path = context.current_transfer["aip_mets_location"]
     if event_type == "reingestion":
         mets_path = context.current_transfer["reingest_aip_mets_location"]
-    mets = metsrw.METSDocument.fromfile(mets_path)
-    original_files = [
-        fsentry for fsentry in mets.all_files() if fsentry.use == "original"
-    ]
+    summary = utils.mets_cache.get_file_summary(mets_path)
+    original_files = summary.get_rows(use="original")
     assert original_files, format_original_files_error(context.current_transfer)
-    for fsentry in original_files:
-        events = utils.get_premis_events_by_type(
-            fsentry, PREMIS_EVENT_TYPES[event_type]
-        )
-        error = f"Expected {event_count} {event_type} event(s) in the METS for file {fsentry.path}"
-        assert len(events) == event_count, error
+    counts = summary.get_event_counts(PREMIS_EVENT_TYPES[event_type])
+    wrong_files = [summary.paths[i] for i in original_files if counts[i] != event_count]
+    error = "Expected {} {} event(s) in the METS for files:\n  {}".format(
+        event_count, event_type, "\n  ".join(wrong_files)
+    )
+    assert not wrong_files, error
 
 
 @then("there is a.? (?P<event_type>.*) event for each original object in the AIP METS")
@@ -418,25 +422,24 @@ def step_impl(context, event_count, event_type):
     " a {event_type} event"
 )
 def step_impl(context, expected_files_count, event_type):
+    """Only the events in the amdSec of the first ADMID of each original
+    file are checked, like in ``assert_event_count``.
+    """
     if not expected_files_count:
         return
     mets_path = context.current_transfer["aip_mets_location"]
-    mets = metsrw.METSDocument.fromfile(mets_path)
-    original_files = [
-        fsentry for fsentry in mets.all_files() if fsentry.use == "original"
-    ]
+    summary = utils.mets_cache.get_file_summary(mets_path)
+    original_files = summary.get_rows(use="original")
     assert original_files, format_original_files_error(context.current_transfer)
-    files_with_event_type = []
-    for fsentry in original_files:
-        if utils.get_premis_events_by_type(fsentry, PREMIS_EVENT_TYPES[event_type]):
-            files_with_event_type.append(fsentry)
+    counts = summary.get_event_counts(PREMIS_EVENT_TYPES[event_type])
+    files_with_event_type = [summary.paths[i] for i in original_files if counts[i]]
     error = (
         "In the {mets} file only the following files had {event_type} events"
         " when {expected} were expected to have: {files}".format(
             mets=context.current_transfer["aip_mets_location"],
             event_type=event_type,
             expected=expected_files_count,
-            files=", ".join([entry.path for entry in files_with_event_type]),
+            files=", ".join(files_with_event_type),
         )
     )
     assert len(files_with_event_type) == expected_files_count, error
@@ -444,18 +447,19 @@ def step_impl(context, expected_files_count, event_type):
 
 @then("there is a current and a superseded techMD for each original object")
 def step_impl(context):
-    mets = metsrw.METSDocument.fromfile(
+    mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
     original_files = [
         fsentry for fsentry in mets.all_files() if fsentry.use == "original"
     ]
     assert original_files, format_original_files_error(context.current_transfer)
+    index = am_mets_ability.METSIndex(mets.tree)
     for fsentry in original_files:
-        techmds = mets.tree.findall(
-            f'mets:amdSec[@ID="{fsentry.admids[0]}"]/mets:techMD',
-            namespaces=context.mets_nsmap,
-        )
+        amdsec = index.amd_secs.get(fsentry.admids[0])
+        techmds = []
+        if amdsec is not None:
+            techmds = am_mets_ability.METSXPaths.tech_mds(amdsec)
         techmds_status = sorted([techmd.attrib["STATUS"] for techmd in techmds])
         error = (
             "Expected two techMD elements (current and superseded) for"
@@ -467,14 +471,17 @@ def step_impl(context):
 @then("there is a sourceMD containing a BagIt mdWrap in the AIP METS")
 def step_impl(context):
     utils.assert_source_md_in_bagit_mets(
-        etree.parse(context.current_transfer["aip_mets_location"]), context.mets_nsmap
+        utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"]),
+        context.mets_nsmap,
     )
 
 
 @then("there is a sourceMD containing a BagIt mdWrap in the reingested AIP METS")
 def step_impl(context):
     utils.assert_source_md_in_bagit_mets(
-        etree.parse(context.current_transfer["reingest_aip_mets_location"]),
+        utils.mets_cache.get_tree(
+            context.current_transfer["reingest_aip_mets_location"]
+        ),
         context.mets_nsmap,
     )
 
@@ -482,12 +489,10 @@ def step_impl(context):
 @then("there is a fileSec for deleted files for objects that were re-normalized")
 def step_impl(context):
     # get files that were deleted after reingest
-    reingest_mets = metsrw.METSDocument.fromfile(
+    reingest_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
-    deleted_files = utils.get_filesec_files(
-        reingest_mets.tree, use="deleted", nsmap=context.mets_nsmap
-    )
+    deleted_files = utils.get_filesec_files(reingest_mets.tree, use="deleted")
     # the GROUPID represents the UUID of the deleted file before being reingested
     # remove the "Group-" prefix to get its initial UUID
     deleted_file_uuids = [
@@ -495,7 +500,7 @@ def step_impl(context):
     ]
     # go through each normalized file in the original METS (before reingest)
     # and verify that its file_uuid is included in the deleted file uuids
-    initial_mets = metsrw.METSDocument.fromfile(
+    initial_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["aip_mets_location"]
     )
     original_files = [
@@ -618,25 +623,19 @@ def step_impl(context, microservice_name):
 
 @then("the METS file contains a dmdSec with DDI metadata")
 def step_impl(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    structmap = tree.find(
-        'mets:structMap[@TYPE="physical"]', namespaces=context.mets_nsmap
-    )
-    transfer_dir = structmap.find(
-        'mets:div[@LABEL="{}-{}"][@TYPE="Directory"]'.format(
-            context.current_transfer["transfer_name"],
-            context.current_transfer["sip_uuid"],
-        ),
-        namespaces=context.mets_nsmap,
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
+    transfer_dir = utils.get_transfer_dir_from_structmap(
+        tree,
+        context.current_transfer["transfer_name"],
+        context.current_transfer["sip_uuid"],
     )
     error = (
         'The {} file does not contain any "Directory" entries in its physical '
         "structMap".format(context.current_transfer["aip_mets_location"])
     )
     assert len(transfer_dir), error
-    objects_dir = transfer_dir.find(
-        'mets:div[@LABEL="objects"]', namespaces=context.mets_nsmap
-    )
+    xpaths = am_mets_ability.METSXPaths
+    objects_dir = xpaths.first(xpaths.directory_div, transfer_dir, label="objects")
     error = (
         'The {} file does not contain an "objects" directory entry in its physical '
         "structMap".format(context.current_transfer["aip_mets_location"])
@@ -644,13 +643,9 @@ def step_impl(context):
     assert len(objects_dir), error
     dmdsec_ids = objects_dir.attrib["DMDID"].strip().split(" ")
     dmdsecs_contain_ddi_metadata = False
-    namespaces = context.mets_nsmap.copy()
-    namespaces["ddi"] = "http://www.icpsr.umich.edu/DDI"
+    index = am_mets_ability.METSIndex(tree)
     for dmdsec_id in dmdsec_ids:
-        ddi_codebook = tree.find(
-            f'mets:dmdSec[@ID="{dmdsec_id}"]/mets:mdWrap/mets:xmlData/ddi:codebook',
-            namespaces=namespaces,
-        )
+        ddi_codebook = xpaths.first(xpaths.ddi_codebook, index.dmd_secs.get(dmdsec_id))
         if ddi_codebook is not None:
             dmdsecs_contain_ddi_metadata = True
     error = (
@@ -670,17 +665,12 @@ def step_impl(context, expected_object_count, object_type):
     DIRS = "directories"
     dir_ids = []
     item_ids = []
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
-    dmd_sec_ids = utils.retrieve_md_section_ids(
-        mets.tree, section="mets:dmdSec", md_type="DC", nsmap=context.mets_nsmap
-    )
-    for file in mets.all_files():
-        for dmd_sec in file.dmdsecs:
-            if dmd_sec.id_string in dmd_sec_ids:
-                if file.mets_div_type == "Directory":
-                    dir_ids.append(dmd_sec.id_string)
-                elif file.mets_div_type == "Item" and file.use == "original":
-                    item_ids.append(dmd_sec.id_string)
+    digest = utils.mets_cache.get_digest(context.current_transfer["aip_mets_location"])
+    for div_type, use, dmd_sec_id in digest.get_entry_dmd_sec_ids("DC"):
+        if div_type == "Directory":
+            dir_ids.append(dmd_sec_id)
+        elif div_type == "Item" and use == "original":
+            item_ids.append(dmd_sec_id)
     err = (
         "The {} file does not contain the correct number of DC dmdSecs: {} expected {}"
     )
@@ -706,23 +696,16 @@ def step_impl(context, expected_object_count, object_type):
     "there are {expected_entries_count:d} objects in the AIP METS with a rightsMD section containing PREMIS:RIGHTS"
 )
 def step_impl(context, expected_entries_count):
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
-    rights_linking_ids = utils.retrieve_rights_linking_object_identifiers(
-        mets.tree, nsmap=context.mets_nsmap
-    )
+    digest = utils.mets_cache.get_digest(context.current_transfer["aip_mets_location"])
+    rights_linking_ids = digest.get_rights_linking_object_identifiers()
     error = f"Expected objects with rightsMD sections: {expected_entries_count} is incorrect: {len(rights_linking_ids)}"
     assert len(rights_linking_ids) == expected_entries_count, error
 
 
 @then("there are {expected_entries_count:d} PREMIS:RIGHTS entries")
 def step_impl(context, expected_entries_count):
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
-    rights_md_ids = utils.retrieve_md_section_ids(
-        mets.tree,
-        section="mets:amdSec/mets:rightsMD",
-        md_type="PREMIS:RIGHTS",
-        nsmap=context.mets_nsmap,
-    )
+    digest = utils.mets_cache.get_digest(context.current_transfer["aip_mets_location"])
+    rights_md_ids = digest.get_md_section_ids("rightsMD", "PREMIS:RIGHTS")
     error = f"Expected objects with rightsMD sections: {expected_entries_count} is incorrect: {len(rights_md_ids)}"
     assert len(rights_md_ids) == expected_entries_count, error
 
@@ -731,7 +714,9 @@ def step_impl(context, expected_entries_count):
     "there are {expected_entries_count:d} submission documents listed in the AIP METS as submission documentation"
 )
 def step_impl(context, expected_entries_count):
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
+    mets = utils.mets_cache.get_mets_document(
+        context.current_transfer["aip_mets_location"]
+    )
     # Archivematica added submission documentation. We only care about
     # user submitted docs.
     METS = "METS.xml"
@@ -768,7 +753,9 @@ def step_impl(context):
 
 @then("the DIP contains access copies for each original object in the transfer")
 def step_impl(context):
-    mets = metsrw.METSDocument.fromfile(context.current_transfer["aip_mets_location"])
+    mets = utils.mets_cache.get_mets_document(
+        context.current_transfer["aip_mets_location"]
+    )
     # get the UUID of each 'original' file
     original_file_uuids = {
         fsentry.file_uuid for fsentry in mets.all_files() if fsentry.use == "original"
@@ -803,7 +790,7 @@ def step_impl(context):
     ], "Could not extract the rows of the reingested metadata.csv in {}".format(
         context.current_transfer["reingest_extracted_aip_dir"]
     )
-    reingest_mets = metsrw.METSDocument.fromfile(
+    reingest_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
     original_metadata_csv_filenames = [
@@ -873,7 +860,7 @@ def step_impl(context, dmdsec_status):
     else:
         mets_path = context.current_transfer["aip_mets_location"]
         rows = context.current_transfer["source_metadata_files"]
-    mets = metsrw.METSDocument.fromfile(mets_path)
+    mets = utils.mets_cache.get_mets_document(mets_path)
     errors = []
     dmdsec_error_template = (
         'Expected one dmdSec for filename "{}" with STATUS="{}" containing a '
@@ -940,7 +927,7 @@ def step_impl(context):
     ], "Could not extract the rows of the reingested source-metadata.csv in {}".format(
         context.current_transfer["reingest_extracted_aip_dir"]
     )
-    reingest_mets = metsrw.METSDocument.fromfile(
+    reingest_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
     original_source_metadata_filenames = [
@@ -1033,7 +1020,7 @@ def step_impl(context, dmdsec_status):
     ], "Could not extract the rows of the reingested source-metadata.csv in {}".format(
         context.current_transfer["reingest_extracted_aip_dir"]
     )
-    reingest_mets = metsrw.METSDocument.fromfile(
+    reingest_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
     original_source_metadata_filenames = [
@@ -1118,7 +1105,7 @@ def step_impl(context, dmdsec_status):
     ], "Could not extract the rows of the reingested source-metadata.csv in {}".format(
         context.current_transfer["reingest_extracted_aip_dir"]
     )
-    reingest_mets = metsrw.METSDocument.fromfile(
+    reingest_mets = utils.mets_cache.get_mets_document(
         context.current_transfer["reingest_aip_mets_location"]
     )
     rows = [
@@ -1187,7 +1174,7 @@ def step_impl(context, dmdsec_status):
     "PREMIS event with metadata validation details and pass outcome"
 )
 def step_impl(context):
-    mets = metsrw.METSDocument.fromfile(
+    mets = utils.mets_cache.get_mets_document(
         context.current_transfer.get(
             "reingest_aip_mets_location", context.current_transfer["aip_mets_location"]
         )
@@ -1342,7 +1329,7 @@ def step(context):
     error = "mets_structmap.xml file was not found in the transfer"
     assert os.path.exists(imported_structmap_file_path), error
 
-    mets = etree.parse(context.current_transfer["aip_mets_location"])
+    mets = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
     mets_logical_structmaps = [
         e
         for e in mets.findall(
@@ -1367,11 +1354,11 @@ def step(context):
 @then("there are 2 DSpace-specific descriptive metadata sections for each object")
 def step(context):
     expected_dmdsecs_count = 2
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    original_files = utils.get_filesec_files(
-        tree, use="original", nsmap=context.mets_nsmap
-    )
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
+    original_files = utils.get_filesec_files(tree, use="original")
     assert original_files, format_no_files_error(context.current_transfer)
+    index = am_mets_ability.METSIndex(tree)
+    xpaths = am_mets_ability.METSXPaths
     errors = []
     for original_file in original_files:
         dmdsec_ids = original_file.attrib.get("DMDID", "").split()
@@ -1385,10 +1372,7 @@ def step(context):
             )
             continue
         xpointer_dmdsec_id, dc_dmdsec_id = dmdsec_ids
-        pointer = tree.find(
-            f'//mets:dmdSec[@ID="{xpointer_dmdsec_id}"]/mets:mdRef',
-            namespaces=context.mets_nsmap,
-        )
+        pointer = xpaths.first(xpaths.md_ref, index.dmd_secs.get(xpointer_dmdsec_id))
         if pointer is None:
             errors.append(
                 f'Could not find Xpointer in dmdSec with ID="{xpointer_dmdsec_id}"'
@@ -1420,20 +1404,13 @@ def step(context):
                 )
         if errors:
             continue
-        identifier = tree.find(
-            f'//mets:dmdSec[@ID="{dc_dmdsec_id}"]/mets:mdWrap[@MDTYPE="DC"]'
-            "/mets:xmlData/dcterms:dublincore/dc:identifier",
-            namespaces=context.mets_nsmap,
-        )
+        dc_dmdsec = index.dmd_secs.get(dc_dmdsec_id)
+        identifier = xpaths.first(xpaths.dc_identifier, dc_dmdsec)
         if identifier is None:
             errors.append(
                 f'Could not find dc:identifier element in dmdSec with ID="{dc_dmdsec_id}"'
             )
-        terms = tree.find(
-            f'//mets:dmdSec[@ID="{dc_dmdsec_id}"]/mets:mdWrap[@MDTYPE="DC"]'
-            "/mets:xmlData/dcterms:dublincore/dcterms:isPartOf",
-            namespaces=context.mets_nsmap,
-        )
+        terms = xpaths.first(xpaths.dc_is_part_of, dc_dmdsec)
         if terms is None:
             errors.append(
                 f'Could not find dcterms:isPartOf element in dmdSec with ID="{dc_dmdsec_id}"'
@@ -1444,11 +1421,11 @@ def step(context):
 
 @then("there is a DSpace-specific rights metadata section for each object")
 def step(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
-    original_files = utils.get_filesec_files(
-        tree, use="original", nsmap=context.mets_nsmap
-    )
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
+    original_files = utils.get_filesec_files(tree, use="original")
     assert original_files, format_no_files_error(context.current_transfer)
+    index = am_mets_ability.METSIndex(tree)
+    xpaths = am_mets_ability.METSXPaths
     errors = []
     for original_file in original_files:
         amdsec_ids = original_file.attrib.get("ADMID", "").split()
@@ -1460,9 +1437,8 @@ def step(context):
             )
             continue
         xpointer_dmdsec_id = amdsec_ids[0]
-        pointer = tree.find(
-            f'//mets:amdSec[@ID="{xpointer_dmdsec_id}"]/mets:rightsMD/mets:mdRef',
-            namespaces=context.mets_nsmap,
+        pointer = xpaths.first(
+            xpaths.rights_md_ref, index.amd_secs.get(xpointer_dmdsec_id)
         )
         if pointer is None:
             errors.append(
@@ -1500,7 +1476,7 @@ def step(context):
 
 @then("the entries in the file section of the METS are sorted by file group")
 def step(context):
-    tree = etree.parse(context.current_transfer["aip_mets_location"])
+    tree = utils.mets_cache.get_tree(context.current_transfer["aip_mets_location"])
     file_groups = tree.findall(
         "mets:fileSec/mets:fileGrp",
         namespaces=context.mets_nsmap,
@@ -66,23 +66,24 @@ def step_impl(context):
     """Create a processing configuration that is a base for all policy
     check-targetted workflows.
     """
-    context.execute_steps(
-        "Given that the user has ensured that the default processing config is in its default state\n"
-        'And the processing config decision "Assign UUIDs to directories" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on preservation derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on access derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on originals" is set to "No"\n'
-        'And the processing config decision "Perform file format identification (Transfer)" is set to "Yes"\n'
-        'And the processing config decision "Create SIP(s)" is set to "Create single SIP and continue processing"\n'
-        'And the processing config decision "Approve normalization" is set to "Yes"\n'
-        'And the processing config decision "Perform file format identification (Submission documentation & metadata)" is set to "Yes"\n'
-        'And the processing config decision "Bind PIDs" is set to "No"\n'
-        'And the processing config decision "Store AIP" is set to "Yes"\n'
-        'And the processing config decision "Store AIP location" is set to "Store AIP in standard Archivematica Directory"\n'
-        'And the processing config decision "Store DIP" is set to "Reject DIP"\n'
-        'And the processing config decision "Document empty directories" is set to "No"\n'
-        'And the processing config decision "Generate thumbnails" is set to "No"\n'
-        'And the processing config decision "Upload DIP" is set to "Do not upload DIP"\n'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        {
+            "Assign UUIDs to directories": "No",
+            "Perform policy checks on preservation derivatives": "No",
+            "Perform policy checks on access derivatives": "No",
+            "Perform policy checks on originals": "No",
+            "Perform file format identification (Transfer)": "Yes",
+            "Create SIP(s)": "Create single SIP and continue processing",
+            "Approve normalization": "Yes",
+            "Perform file format identification (Submission documentation & metadata)": "Yes",
+            "Bind PIDs": "No",
+            "Store AIP": "Yes",
+            "Store AIP location": "Store AIP in standard Archivematica Directory",
+            "Store DIP": "Reject DIP",
+            "Document empty directories": "No",
+            "Generate thumbnails": "No",
+            "Upload DIP": "Do not upload DIP",
+        }
     )
 
 
@@ -447,19 +448,12 @@ def step_impl(context, validation_result):
 )
 def step_impl(context, event_outcome):
     events = []
-    for e in context.am_user.mets.get_premis_events(
-        context.am_user.browser.get_mets_via_api(
-            context.scenario.transfer_name,
-            context.am_user.browser.get_sip_uuid(context.scenario.transfer_name),
-        )
+    for e in utils.iter_premis_events_from_scenario(
+        context, event_types=("validation",), api=True
     ):
-        if (
-            e["event_type"] == "validation"
-            and e["event_detail"].startswith(MC_EVENT_DETAIL_PREFIX)
-            and e["event_outcome_detail_note"].startswith(
-                MC_EVENT_OUTCOME_DETAIL_NOTE_IMPLEMENTATION_CHECK_PREFIX
-            )
-        ):
+        if e["event_detail"].startswith(MC_EVENT_DETAIL_PREFIX) and e[
+            "event_outcome_detail_note"
+        ].startswith(MC_EVENT_OUTCOME_DETAIL_NOTE_IMPLEMENTATION_CHECK_PREFIX):
             events.append(e)
     assert events
     for e in events:
@@ -521,19 +515,12 @@ def step_impl(context, event_outcome):
 )
 def step_impl(context, event_outcome):
     events = []
-    for e in context.am_user.mets.get_premis_events(
-        context.am_user.browser.get_mets_via_api(
-            context.scenario.transfer_name,
-            context.am_user.browser.get_sip_uuid(context.scenario.transfer_name),
-        )
+    for e in utils.iter_premis_events_from_scenario(
+        context, event_types=("validation",), api=True
     ):
-        if (
-            e["event_type"] == "validation"
-            and e["event_detail"].startswith(MC_EVENT_DETAIL_PREFIX)
-            and e["event_outcome_detail_note"].startswith(
-                MC_EVENT_OUTCOME_DETAIL_NOTE_POLICY_CHECK_PREFIX
-            )
-        ):
+        if e["event_detail"].startswith(MC_EVENT_DETAIL_PREFIX) and e[
+            "event_outcome_detail_note"
+        ].startswith(MC_EVENT_OUTCOME_DETAIL_NOTE_POLICY_CHECK_PREFIX):
             events.append(e)
     assert events
     for e in events:
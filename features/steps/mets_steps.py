@@ -19,40 +19,30 @@ from features.steps import utils
     " {event_type} with properties {properties}"
 )
 def step_impl(context, count, event_type, properties):
-    mets = utils.get_mets_from_scenario(context)
-    events = []
     properties = json.loads(properties)
-    for premis_evt_el in mets.findall(
-        ".//premis:event", context.am_user.mets.mets_nsmap
+    events_count = 0
+    for premis_evt_el, _ in context.am_user.mets.iter_premis_event_elements(
+        utils.get_mets_source_from_scenario(context), event_types=(event_type,)
     ):
-        premis_evt_type_el = premis_evt_el.find(
-            "premis:eventType", context.am_user.mets.mets_nsmap
-        )
-        if premis_evt_type_el.text == event_type:
-            events.append(premis_evt_el)
-            utils.assert_premis_event(event_type, premis_evt_el, context)
-            utils.assert_premis_properties(premis_evt_el, context, properties)
-    assert len(events) == int(count), (
+        events_count += 1
+        utils.assert_premis_event(event_type, premis_evt_el, context)
+        utils.assert_premis_properties(premis_evt_el, context, properties)
+    assert events_count == int(count), (
         f"We expected to find {count} events of type {event_type} matching"
         f" properties `{str(properties)}` but in fact we only found"
-        f" {len(events)}."
+        f" {events_count}."
     )
 
 
 @then("in the METS file there are/is {count} PREMIS event(s) of type {event_type}")
 def step_impl(context, count, event_type):
-    mets = utils.get_mets_from_scenario(context)
-    events = []
-    for premis_evt_el in mets.findall(
-        ".//premis:event", context.am_user.mets.mets_nsmap
+    events_count = 0
+    for premis_evt_el, _ in context.am_user.mets.iter_premis_event_elements(
+        utils.get_mets_source_from_scenario(context), event_types=(event_type,)
     ):
-        premis_evt_type_el = premis_evt_el.find(
-            "premis:eventType", context.am_user.mets.mets_nsmap
-        )
-        if premis_evt_type_el.text == event_type:
-            events.append(premis_evt_el)
-            utils.assert_premis_event(event_type, premis_evt_el, context)
-    assert len(events) == int(count)
+        events_count += 1
+        utils.assert_premis_event(event_type, premis_evt_el, context)
+    assert events_count == int(count)
 
 
 @then(
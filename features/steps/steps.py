@@ -13,6 +13,66 @@ from features.steps import utils
 
 logger = logging.getLogger("amauat.steps")
 
+# Processing config decisions set, on top of the default state of the
+# default processing config, by the steps below in a single form submission.
+FULLY_AUTOMATED_DECISIONS = {
+    "Perform file format identification (Transfer)": "Yes",
+    "Create SIP(s)": "Create single SIP and continue processing",
+    "Perform file format identification (Ingest)": "Yes",
+    "Normalize": "Normalize for preservation and access",
+    "Approve normalization": "Yes",
+    "Perform file format identification (Submission documentation & metadata)": "Yes",
+    "Perform policy checks on preservation derivatives": "No",
+    "Perform policy checks on access derivatives": "No",
+    "Perform policy checks on originals": "No",
+    "Document empty directories": "No",
+    "Generate thumbnails": "No",
+    "Upload DIP": "Do not upload DIP",
+    "Store DIP": "Reject DIP",
+    "Store AIP": "Yes",
+    "Store AIP location": "Default location",
+}
+
+STORE_AIP_AUTOMATED_DECISIONS = {
+    "Assign UUIDs to directories": "No",
+    "Document empty directories": "No",
+    # TODO: change the below decision to 'Perform file format identification ...' post 1.8 if fixing-up this test.
+    "Select file format identification command (Transfer)": "Identify using Siegfried",
+    "Perform policy checks on originals": "No",
+    "Create SIP(s)": "Create single SIP and continue processing",
+    "Normalize": "Normalize for preservation",
+    "Approve normalization": "Yes",
+    "Perform policy checks on preservation derivatives": "No",
+    "Perform policy checks on access derivatives": "No",
+    # TODO: change the below decision to 'Perform file format identification ...' post 1.8 if fixing-up this test.
+    "Select file format identification command (Submission documentation & metadata)": "Identify using Siegfried",
+    "Bind PIDs": "No",
+}
+
+CREATE_AND_STORE_AIP_DECISIONS = {
+    "Document empty directories": "No",
+    "Assign UUIDs to directories": "No",
+    "Perform file format identification (Transfer)": "Yes",
+    "Perform policy checks on originals": "No",
+    "Create SIP(s)": "Create single SIP and continue processing",
+    "Perform file format identification (Ingest)": "Yes",
+    "Normalize": "Normalize for preservation",
+    "Approve normalization": "Yes",
+    "Perform policy checks on preservation derivatives": "No",
+    "Perform policy checks on access derivatives": "No",
+    "Perform file format identification (Submission documentation & metadata)": "Yes",
+    "Bind PIDs": "No",
+    "Store AIP": "Yes",
+    "Store AIP location": "Default location",
+}
+
+CREATE_SIPS_DECISION_POINT_DECISIONS = {
+    "Assign UUIDs to directories": "No",
+    # TODO: change the below decision to 'Perform file format identification ...' post 1.8 if fixing-up this test.
+    "Select file format identification command (Transfer)": "Identify using Siegfried",
+    "Perform policy checks on originals": "No",
+}
+
 
 # Givens
 # ------------------------------------------------------------------------------
@@ -55,18 +115,16 @@ def step_impl(context):
 
 @given("the reminder to add metadata is enabled")
 def step_impl(context):
-    context.am_user.browser.set_processing_config_decision(
-        decision_label="Reminder: add metadata if desired", choice_value="None"
+    context.am_user.browser.set_processing_config_decisions(
+        {"Reminder: add metadata if desired": "None"}
     )
-    context.am_user.browser.save_default_processing_config()
 
 
 def _set_config(context, decision_label, choice_value):
     """Helper to allow us to conveniently set processing configuration choices."""
-    context.am_user.browser.set_processing_config_decision(
-        decision_label=decision_label, choice_value=choice_value
+    context.am_user.browser.set_processing_config_decisions(
+        {decision_label: choice_value}
     )
-    context.am_user.browser.save_default_processing_config()
 
 
 @given('the processing config decision "{decision_label}" is set to "{choice_value}"')
@@ -83,10 +141,12 @@ def _resolve_all_steps(context):
     """Helper function to allow us to resolve all decision points in a
     configuration.
     """
-    context.execute_steps(
-        "Given a fully automated default processing config\n"
-        'And the processing config decision "Assign UUIDs to directories" is set to "No"\n'
-        'And the processing config decision "Bind PIDs" is set to "No"\n'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        decisions={
+            **FULLY_AUTOMATED_DECISIONS,
+            "Assign UUIDs to directories": "No",
+            "Bind PIDs": "No",
+        }
     )
 
 
@@ -122,11 +182,13 @@ def step_impl(context, attributes):
     context.scenario.space_uuid = context.am_user.browser.ensure_ss_space_exists(
         attributes
     )
+    utils.ss_topology_cache.invalidate()
 
 
 @given("the user has disabled the default transfer backlog location")
 def step_impl(context):
     context.am_user.browser.disable_default_transfer_backlog()
+    utils.ss_topology_cache.invalidate()
 
 
 @given("a fully automated default processing config")
@@ -135,23 +197,8 @@ def step_impl(context):
     creation of a DIP and an AIP in the context of testing the PID binding
     feature.
     """
-    context.execute_steps(
-        "Given that the user has ensured that the default processing config is in its default state\n"
-        'And the processing config decision "Perform file format identification (Transfer)" is set to "Yes"\n'
-        'And the processing config decision "Create SIP(s)" is set to "Create single SIP and continue processing"\n'
-        'And the processing config decision "Perform file format identification (Ingest)" is set to "Yes"\n'
-        'And the processing config decision "Normalize" is set to "Normalize for preservation and access"\n'
-        'And the processing config decision "Approve normalization" is set to "Yes"\n'
-        'And the processing config decision "Perform file format identification (Submission documentation & metadata)" is set to "Yes"\n'
-        'And the processing config decision "Perform policy checks on preservation derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on access derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on originals" is set to "No"\n'
-        'And the processing config decision "Document empty directories" is set to "No"\n'
-        'And the processing config decision "Generate thumbnails" is set to "No"\n'
-        'And the processing config decision "Upload DIP" is set to "Do not upload DIP"\n'
-        'And the processing config decision "Store DIP" is set to "Reject DIP"\n'
-        'And the processing config decision "Store AIP" is set to "Yes"\n'
-        'And the processing config decision "Store AIP location" is set to "Default location"\n'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        decisions=FULLY_AUTOMATED_DECISIONS
     )
 
 
@@ -159,42 +206,15 @@ def step_impl(context):
     'the default processing config is set to automate a transfer through to "Store AIP"'
 )
 def step_impl(context):
-    context.execute_steps(
-        "Given the default processing config is in its default state\n"
-        'And the processing config decision "Assign UUIDs to directories" is set to "No"\n'
-        'And the processing config decision "Document empty directories" is set to "No"\n'
-        # TODO: change the below step to 'Perform file format identification ...' post 1.8 if fixing-up this test.
-        'And the processing config decision "Select file format identification command (Transfer)" is set to "Identify using Siegfried"\n'
-        'And the processing config decision "Perform policy checks on originals" is set to "No"\n'
-        'And the processing config decision "Create SIP(s)" is set to "Create single SIP and continue processing"\n'
-        'And the processing config decision "Normalize" is set to "Normalize for preservation"\n'
-        'And the processing config decision "Approve normalization" is set to "Yes"\n'
-        'And the processing config decision "Perform policy checks on preservation derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on access derivatives" is set to "No"\n'
-        # TODO: change the below step to 'Perform file format identification ...' post 1.8 if fixing-up this test.
-        'And the processing config decision "Select file format identification command (Submission documentation & metadata)" is set to "Identify using Siegfried"\n'
-        'And the processing config decision "Bind PIDs" is set to "No"'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        decisions=STORE_AIP_AUTOMATED_DECISIONS
     )
 
 
 @given("a default processing config that creates and stores an AIP")
 def step_impl(context):
-    context.execute_steps(
-        "Given the default processing config is in its default state\n"
-        'And the processing config decision "Document empty directories" is set to "No"\n'
-        'And the processing config decision "Assign UUIDs to directories" is set to "No"\n'
-        'And the processing config decision "Perform file format identification (Transfer)" is set to "Yes"\n'
-        'And the processing config decision "Perform policy checks on originals" is set to "No"\n'
-        'And the processing config decision "Create SIP(s)" is set to "Create single SIP and continue processing"\n'
-        'And the processing config decision "Perform file format identification (Ingest)" is set to "Yes"\n'
-        'And the processing config decision "Normalize" is set to "Normalize for preservation"\n'
-        'And the processing config decision "Approve normalization" is set to "Yes"\n'
-        'And the processing config decision "Perform policy checks on preservation derivatives" is set to "No"\n'
-        'And the processing config decision "Perform policy checks on access derivatives" is set to "No"\n'
-        'And the processing config decision "Perform file format identification (Submission documentation & metadata)" is set to "Yes"\n'
-        'And the processing config decision "Bind PIDs" is set to "No"\n'
-        'And the processing config decision "Store AIP" is set to "Yes"\n'
-        'And the processing config decision "Store AIP location" is set to "Default location"\n'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        decisions=CREATE_AND_STORE_AIP_DECISIONS
     )
 
 
@@ -202,12 +222,8 @@ def step_impl(context):
     'a default processing config that gets a transfer to the "Create SIP(s)" decision point'
 )
 def step_impl(context):
-    context.execute_steps(
-        "Given the default processing config is in its default state\n"
-        'And the processing config decision "Assign UUIDs to directories" is set to "No"\n'
-        # TODO: change the below step to 'Perform file format identification ...' post 1.8 if fixing-up this test.
-        'And the processing config decision "Select file format identification command (Transfer)" is set to "Identify using Siegfried"\n'
-        'And the processing config decision "Perform policy checks on originals" is set to "No"\n'
+    context.am_user.browser.ensure_default_processing_config_in_default_state(
+        decisions=CREATE_SIPS_DECISION_POINT_DECISIONS
     )
 
 
@@ -1,17 +1,31 @@
 """Utilities for Steps files."""
 
+import collections
+import concurrent.futures
 import csv
 import datetime
+import difflib
+import functools
+import hashlib
+import io
+import json
 import logging
 import os
 import re
+import shutil
 import subprocess
 import tempfile
+import threading
 import time
+import weakref
 import zipfile
+from urllib import parse
 
 import environment
+import metsrw
+import requests
 import tenacity
+from amclient import errors as amclient_errors
 from amclient.amclient import AMClient
 from environment import AM_API_CONFIG_KEY
 from environment import SS_API_CONFIG_KEY
@@ -19,6 +33,10 @@ from lxml import etree
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 
+from amuser import am_mets_ability
+from amuser import lazy_aip
+from amuser import mets_digest
+
 logger = logging.getLogger("amauat.steps.utils")
 
 
@@ -102,7 +120,7 @@ def get_mets_from_scenario(context, api=False):
     if getattr(context, "current_transfer", None) is not None:
         # It is a black-box test so there is no need to download the METS again.
         # Try returning the reingested METS first if available.
-        return etree.parse(
+        return mets_cache.get_tree(
             context.current_transfer.get(
                 "reingest_aip_mets_location",
                 context.current_transfer["aip_mets_location"],
@@ -119,6 +137,42 @@ def get_mets_from_scenario(context, api=False):
     )
 
 
+def get_mets_source_from_scenario(context, api=False):
+    """Return the AIP METS file of the test scenario as something that can be
+    read incrementally (e.g., by ``iter_premis_events``) without building its
+    whole tree: the path of the METS file for black-box tests or a file
+    object with the METS retrieved as in ``get_mets_from_scenario`` otherwise.
+    """
+    if getattr(context, "current_transfer", None) is not None:
+        return context.current_transfer.get(
+            "reingest_aip_mets_location",
+            context.current_transfer["aip_mets_location"],
+        )
+    get_mets = context.am_user.browser.get_mets
+    if api:
+        get_mets = context.am_user.browser.get_mets_via_api
+    mets = get_mets(
+        context.scenario.transfer_name,
+        context.am_user.browser.get_sip_uuid(context.scenario.transfer_name),
+        parse_xml=False,
+    )
+    return io.BytesIO(mets.encode("utf8"))
+
+
+def iter_premis_events_from_scenario(context, event_types=None, api=False):
+    """Yield the PREMIS events of the AIP METS file of the test scenario as
+    dicts (see ``ArchivematicaMETSAbility.iter_premis_events``), read from
+    the METS digest for black-box tests.
+    """
+    if getattr(context, "current_transfer", None) is not None:
+        return mets_cache.get_digest(
+            get_mets_source_from_scenario(context)
+        ).iter_premis_events(event_types)
+    return context.am_user.mets.iter_premis_events(
+        get_mets_source_from_scenario(context, api=api), event_types=event_types
+    )
+
+
 def assert_premis_event(event_type, event, context):
     """Make PREMIS-event-type-specific assertions about ``event``."""
     if event_type == "unpacking":
@@ -313,8 +367,133 @@ def unzip(zip_path):
     return None
 
 
+class APISessionRegistry:
+    """Per-process registry of pooled, keep-alive ``requests`` sessions.
+
+    There is one session per API host (scheme and netloc) and each session
+    keeps at most ``pool_maxsize`` connections alive to its host. The
+    registry counts how often a session was reused (``session_hits``) or had
+    to be created (``session_misses``) and, through urllib3, how many of the
+    requests sent reused an already open connection.
+    """
+
+    def __init__(self, pool_maxsize=10):
+        self.pool_maxsize = pool_maxsize
+        self.session_hits = 0
+        self.session_misses = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, url):
+        parsed = parse.urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is not None:
+                self.session_hits += 1
+                return session
+            self.session_misses += 1
+            session = self._sessions[host] = requests.Session()
+            session.mount(
+                host,
+                requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=True
+                ),
+            )
+            return session
+
+    def stats(self):
+        connections = sent = 0
+        with self._lock:
+            for host, session in self._sessions.items():
+                pools = session.get_adapter(host).poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        connections += pool.num_connections
+                        sent += pool.num_requests
+        return {
+            "session_hits": self.session_hits,
+            "session_misses": self.session_misses,
+            "connections_opened": connections,
+            "requests_sent": sent,
+            "connections_reused": sent - connections,
+        }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+api_session_registry = APISessionRegistry()
+
+
+class PooledAMClient(AMClient):
+    """``AMClient`` that sends the requests of the endpoints we poll the most
+    (unit status, jobs, storage locations and pipelines) through the pooled
+    sessions of ``api_session_registry``. ``amclient`` opens a new session
+    for every request and has no transport hook, so the other endpoints keep
+    using ``AMClient``'s own implementation.
+
+    Errors are reported as ``amclient`` integer error codes, the same way
+    ``AMClient`` does, so ``call_api_endpoint`` can retry them.
+    """
+
+    def _get_json(self, url, headers, params=None):
+        session = api_session_registry.get_session(url)
+        try:
+            response = session.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.JSONDecodeError as err:
+            logger.warning("Could not parse JSON from %s: %s", url, err)
+            return amclient_errors.ERR_PARSE_JSON
+        except requests.exceptions.ConnectionError as err:
+            logger.error("Connection error %s", err)
+            return amclient_errors.ERR_SERVER_CONN
+        except requests.exceptions.RequestException as err:
+            logger.warning("GET request to %s failed: %s", url, err)
+            return amclient_errors.ERR_INVALID_RESPONSE
+
+    def get_transfer_status(self):
+        return self._get_json(
+            f"{self.am_url}/api/transfer/status/{self.transfer_uuid}/",
+            self._am_auth_headers(),
+        )
+
+    def get_ingest_status(self):
+        return self._get_json(
+            f"{self.am_url}/api/ingest/status/{self.sip_uuid}/",
+            self._am_auth_headers(),
+        )
+
+    def get_jobs(self):
+        params = {}
+        for attribute in ("microservice", "link_uuid", "name"):
+            value = getattr(self, f"job_{attribute}", None)
+            if value is not None:
+                params[attribute] = value
+        return self._get_json(
+            f"{self.am_url}/api/v2beta/jobs/{self.unit_uuid}",
+            self._am_auth_headers(),
+            params=params,
+        )
+
+    def list_storage_locations(self):
+        return self._get_json(
+            f"{self.ss_url}/api/v2/location/", self._ss_auth_headers()
+        )
+
+    def get_pipelines(self):
+        return self._get_json(
+            f"{self.ss_url}/api/v2/pipeline/", self._ss_auth_headers()
+        )
+
+
 def configure_ss_client(api_client_config):
-    am = AMClient()
+    am = PooledAMClient()
     am.ss_url = api_client_config["url"]
     am.ss_user_name = api_client_config["username"]
     am.ss_api_key = api_client_config["api_key"]
@@ -322,7 +501,7 @@ def configure_ss_client(api_client_config):
 
 
 def configure_am_client(api_client_config):
-    am = AMClient()
+    am = PooledAMClient()
     am.am_url = api_client_config["url"]
     am.am_user_name = api_client_config["username"]
     am.am_api_key = api_client_config["api_key"]
@@ -362,6 +541,64 @@ def call_api_endpoint(
     return response
 
 
+class TTLCache:
+    """Memoize the results of Storage Service topology lookups (e.g., the
+    UUID of the default transfer source location) for ``ttl`` seconds.
+
+    Steps that create or modify spaces and locations must call
+    ``invalidate`` so that later lookups see the new topology. A ``ttl`` of
+    zero disables the cache.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def memoize(self, func):
+        """Decorate a lookup function that takes the ``api_clients_config``
+        dict as its only argument. Results are cached per SS URL and user.
+        ``None`` results are not cached.
+        """
+
+        @functools.wraps(func)
+        def wrapper(api_clients_config):
+            ss_config = api_clients_config[SS_API_CONFIG_KEY]
+            key = (func.__name__, ss_config["url"], ss_config["username"])
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+            value = func(api_clients_config)
+            if value is not None and self.ttl > 0:
+                with self._lock:
+                    self._entries[key] = (now, value)
+            return value
+
+        return wrapper
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = {}
+            self.invalidations += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+ss_topology_cache = TTLCache()
+
+
 def browse_default_ts_location(api_clients_config, browse_path):
     """
     Return transferable directories and entities from a path
@@ -387,6 +624,7 @@ def browse_default_ts_location(api_clients_config, browse_path):
     return {}
 
 
+@ss_topology_cache.memoize
 def return_default_ts_location(api_clients_config):
     """
     Return the UUID of the default transfer source location.
@@ -407,6 +645,7 @@ def return_default_ts_location(api_clients_config):
             return location_object.get("uuid")
 
 
+@ss_topology_cache.memoize
 def get_default_ss_pipeline(api_clients_config):
     am = configure_ss_client(api_clients_config[SS_API_CONFIG_KEY])
     response = call_api_endpoint(
@@ -543,6 +782,9 @@ def download_package(api_clients_config, sip_uuid):
 
 
 def get_aip_file_location(extracted_aip_dir, relative_path):
+    # Only extract what is needed from AIPs that are extracted lazily.
+    if isinstance(extracted_aip_dir, lazy_aip.LazyAIP):
+        return extracted_aip_dir.get_path(relative_path)
     return os.path.join(extracted_aip_dir, relative_path)
 
 
@@ -609,20 +851,40 @@ def extract_package(api_clients_config, package_uuid, lookup_uuid=None):
     )
 
 
+def open_package(api_clients_config, package_uuid):
+    """Download a package and return a ``LazyAIP`` that extracts its files
+    on demand, or the path of the fully extracted package if it cannot be
+    read that way. The downloaded package is removed once it is extracted.
+    """
+    package_ss_filename = download_package(api_clients_config, package_uuid)
+    try:
+        aip = lazy_aip.LazyAIP(package_ss_filename)
+    except lazy_aip.LazyAIPError as err:
+        logger.info("Extracting package %s fully: %s", package_uuid, err)
+    else:
+        if package_uuid in aip.root:
+            aip.remove_archive_when_done()
+            return aip
+    return _automation_tools_extract_package(
+        package_ss_filename, package_uuid, tempfile.mkdtemp()
+    )
+
+
 def get_premis_events_by_type(entry, event_type):
     return [ev for ev in entry.get_premis_events() if ev.type == event_type]
 
 
-def get_transfer_dir_from_structmap(tree, transfer_name, sip_uuid, nsmap):
-    structmap = tree.find('mets:structMap[@TYPE="physical"]', namespaces=nsmap)
-    return structmap.find(
-        f'mets:div[@LABEL="{transfer_name}-{sip_uuid}"][@TYPE="Directory"]',
-        namespaces=nsmap,
+def get_transfer_dir_from_structmap(tree, transfer_name, sip_uuid):
+    xpaths = am_mets_ability.METSXPaths
+    return xpaths.first(
+        xpaths.directory_div,
+        xpaths.first(xpaths.physical_struct_map, tree),
+        label=f"{transfer_name}-{sip_uuid}",
     )
 
 
 def get_submission_docs_from_structmap(tree, transfer_name, sip_uuid, nsmap):
-    transfer_dir = get_transfer_dir_from_structmap(tree, transfer_name, sip_uuid, nsmap)
+    transfer_dir = get_transfer_dir_from_structmap(tree, transfer_name, sip_uuid)
     return transfer_dir.findall(
         'mets:div[@LABEL="objects"]/mets:div[@LABEL="submissionDocumentation"]'
         '//mets:div[@TYPE="Item"]',
@@ -654,22 +916,57 @@ def get_path_before_filename_change(entry, transfer_contains_objects_dir=False):
         return result
 
 
-def assert_structmap_item_path_exists(item, root_path, parent_path=""):
-    label = item.attrib.get("LABEL")
-    if label:
-        # the relative path of the item is represented by its LABEL attribute
-        path = os.path.join(root_path, parent_path, label)
-        if item.attrib["TYPE"] == "Item":
-            assert os.path.isfile(path)
-        elif item.attrib["TYPE"] == "Directory":
-            assert os.path.isdir(path)
-        else:
-            msg = "Cannot handle structMap items with attribute " 'TYPE "{}"'.format(
-                item.attrib["TYPE"]
-            )
-            raise ValueError(msg)
-        for child in item:
-            assert_structmap_item_path_exists(child, root_path, path)
+def get_dir_entries(root_path):
+    """Walk ``root_path`` once with ``os.scandir`` and return a set of
+    ``(relative path, type)`` tuples, where type is 'Directory' or 'Item' (a
+    file), for everything under it.
+    """
+    entries = set()
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(root_path, rel_dir)) as scandir_it:
+            for entry in scandir_it:
+                rel_path = os.path.join(rel_dir, entry.name)
+                if entry.is_dir():
+                    entries.add((rel_path, "Directory"))
+                    pending.append(rel_path)
+                else:
+                    entries.add((rel_path, "Item"))
+    return entries
+
+
+def assert_entries_match_dir(
+    expected_entries, root_path, description, types=("Directory", "Item")
+):
+    """Assert that the ``(relative path, type)`` tuples in
+    ``expected_entries`` (see ``METSDigest.get_struct_map_entries``) are exactly the
+    contents of ``root_path`` of the given ``types``, reporting every missing
+    and extra path at once. Only the top level directories that appear in
+    ``expected_entries`` are checked for extra paths, e.g. ``objects`` but not
+    ``logs``.
+    """
+    top_level_names = {path.split(os.sep, 1)[0] for path, _ in expected_entries}
+    actual_entries = {
+        (path, type_)
+        for path, type_ in get_dir_entries(root_path)
+        if type_ in types and path.split(os.sep, 1)[0] in top_level_names
+    }
+    missing = sorted(expected_entries - actual_entries)
+    extra = sorted(actual_entries - expected_entries)
+    errors = []
+    if missing:
+        errors.append(
+            f"{len(missing)} path(s) in the {description} are missing from"
+            f" {root_path}:"
+        )
+        errors.extend(f"  {path} ({type_})" for path, type_ in missing)
+    if extra:
+        errors.append(
+            f"{len(extra)} path(s) in {root_path} are not in the {description}:"
+        )
+        errors.extend(f"  {path} ({type_})" for path, type_ in extra)
+    assert not errors, "\n".join(errors)
 
 
 def is_valid_download(path):
@@ -683,36 +980,11 @@ def is_valid_download(path):
     assert os.stat(path).st_size >= 1, errors["size"]
 
 
-def retrieve_md_section_ids(tree, section, md_type, nsmap):
-    md_sec_ids = []
-    md_secs = tree.findall(section, namespaces=nsmap)
-    for md_sec in md_secs:
-        md_sec_id = md_sec.get("ID")
-        for md in md_sec:
-            if md.get("MDTYPE") == md_type:
-                md_sec_ids.append(md_sec_id)
-    return set(md_sec_ids)
-
-
-def retrieve_rights_linking_object_identifiers(tree, nsmap):
-    rights_objects = tree.findall(
-        "mets:amdSec/mets:rightsMD/mets:mdWrap/mets:xmlData/premis:rightsStatement/premis:linkingObjectIdentifier/premis:linkingObjectIdentifierValue",
-        namespaces=nsmap,
-    )
-    return {id_.text for id_ in rights_objects}
-
-
-def get_filesec_files(tree, use=None, nsmap=None):
-    if nsmap is None:
-        nsmap = {}
-    use_query = ""
+def get_filesec_files(tree, use=None):
     # an empty use parameter will retrieve all the files in the fileSec
     if use:
-        use_query = f'="{use}"'
-    return tree.findall(
-        f"mets:fileSec/mets:fileGrp[@USE{use_query}]/mets:file",
-        namespaces=nsmap,
-    )
+        return am_mets_ability.METSXPaths.files_by_use(tree, use=use)
+    return am_mets_ability.METSXPaths.files(tree)
 
 
 def start_sample_transfer(
@@ -742,17 +1014,120 @@ def start_sample_transfer(
         raise AssertionError(f"Error starting transfer: {err}")
 
 
-def wait_for_transfer(api_clients_config, transfer_uuid):
-    status = None
-    resp = None
-    try:
-        while status not in ("COMPLETE", "FAILED"):
-            time.sleep(environment.MEDIUM_WAIT)
-            resp = check_unit_status(api_clients_config, transfer_uuid, "transfer")
-            if isinstance(resp, int) or resp is None:
+class UnitStatusPoller:
+    """Poll the status of every in-flight transfer and ingest from a single
+    background thread.
+
+    Each call to ``watch`` registers a unit and returns a
+    ``concurrent.futures.Future`` that resolves to the last status response
+    of the unit once it reaches ``COMPLETE`` or ``FAILED``. On every tick the
+    thread checks all the units that are due in one batch. A unit is polled
+    again after ``min_interval`` seconds when its status or current
+    microservice changed since the previous check; otherwise its interval
+    grows by ``backoff_factor`` up to ``max_interval``, so units sitting in
+    long-running microservices (e.g., normalization) are checked less often.
+    """
+
+    terminal_statuses = ("COMPLETE", "FAILED")
+
+    def __init__(self, min_interval=None, max_interval=None, backoff_factor=1.5):
+        self.min_interval = min_interval or environment.OPTIMISTIC_WAIT
+        self.max_interval = max_interval or environment.APATHETIC_WAIT
+        self.backoff_factor = backoff_factor
+        self._units = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, api_clients_config, unit_uuid, unit="transfer"):
+        """Start watching the ``unit`` ('transfer' or 'ingest') with UUID
+        ``unit_uuid`` and return a future for its final status response.
+        Watching a unit that is already being watched returns the existing
+        future.
+        """
+        key = (unit, unit_uuid)
+        with self._lock:
+            watched = self._units.get(key)
+            if watched is None:
+                watched = self._units[key] = {
+                    "api_clients_config": api_clients_config,
+                    "future": concurrent.futures.Future(),
+                    "state": None,
+                    "interval": self.min_interval,
+                    "next_poll": time.monotonic() + self.min_interval,
+                }
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="unit-status-poller", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+        return watched["future"]
+
+    def _run(self):
+        while True:
+            # Clear the wakeup event before reading the units, so that a unit
+            # watched from now on sets it again and is not missed by the wait.
+            self._wakeup.clear()
+            with self._lock:
+                if not self._units:
+                    self._thread = None
+                    return
+                now = time.monotonic()
+                due = [
+                    (key, watched)
+                    for key, watched in self._units.items()
+                    if watched["next_poll"] <= now
+                ]
+                next_poll = min(w["next_poll"] for w in self._units.values())
+            if not due:
+                self._wakeup.wait(max(next_poll - now, 0))
                 continue
+            for key, watched in due:
+                self._poll(key, watched)
+
+    def _poll(self, key, watched):
+        unit, unit_uuid = key
+        try:
+            resp = check_unit_status(watched["api_clients_config"], unit_uuid, unit)
+        except Exception as err:
+            self._finish(key, exception=err)
+            return
+        if is_invalid_api_response(resp):
+            status = None
+        else:
             status = resp.get("status")
-        return resp
+            if status in self.terminal_statuses:
+                self._finish(key, result=resp)
+                return
+        state = (status, None if status is None else resp.get("microservice"))
+        if state != watched["state"]:
+            logger.info("%s %s is now %s in %s", unit, unit_uuid, *state)
+            watched["state"] = state
+            watched["interval"] = self.min_interval
+        else:
+            watched["interval"] = min(
+                watched["interval"] * self.backoff_factor, self.max_interval
+            )
+        watched["next_poll"] = time.monotonic() + watched["interval"]
+
+    def _finish(self, key, result=None, exception=None):
+        with self._lock:
+            watched = self._units.pop(key)
+        if exception is not None:
+            watched["future"].set_exception(exception)
+        else:
+            watched["future"].set_result(result)
+
+
+unit_status_poller = UnitStatusPoller()
+
+
+def wait_for_transfer(api_clients_config, transfer_uuid):
+    try:
+        return unit_status_poller.watch(
+            api_clients_config, transfer_uuid, "transfer"
+        ).result()
     except environment.EnvironmentError as err:
         raise AssertionError(
             f"Error checking transfer (uuid: {transfer_uuid}) status: {err}"
@@ -760,16 +1135,8 @@ def wait_for_transfer(api_clients_config, transfer_uuid):
 
 
 def wait_for_ingest(api_clients_config, sip_uuid):
-    status = None
-    resp = None
     try:
-        while status not in ("COMPLETE", "FAILED"):
-            time.sleep(environment.MEDIUM_WAIT)
-            resp = check_unit_status(api_clients_config, sip_uuid, unit="ingest")
-            if isinstance(resp, int) or resp is None:
-                continue
-            status = resp.get("status")
-        return resp
+        return unit_status_poller.watch(api_clients_config, sip_uuid, "ingest").result()
     except environment.EnvironmentError as err:
         raise AssertionError(f"Error checking ingest (uuid: {sip_uuid}) status: {err}")
 
@@ -791,8 +1158,21 @@ def get_ingest_result(api_clients_config, sip_uuid):
     ingest_response = wait_for_ingest(api_clients_config, sip_uuid)
     if ingest_response["status"] == "FAILED":
         return {}
-    extracted_aip_dir = extract_package(api_clients_config, sip_uuid)
+    return extract_ingest_result(api_clients_config, sip_uuid)
+
+
+def extract_ingest_result(api_clients_config, sip_uuid):
+    """Download the AIP of a completed ingest. Its files are extracted when
+    they are used, but the digest of its METS file is written right away.
+    """
+    extracted_aip_dir = open_package(api_clients_config, sip_uuid)
     aip_mets_location = get_aip_mets_location(extracted_aip_dir, sip_uuid)
+    # Write the METS digest now so that the METS assertions do not have to
+    # read the XML, in this run or in later runs using the cached AIP.
+    try:
+        mets_cache.get_digest(aip_mets_location)
+    except (OSError, etree.LxmlError, mets_digest.METSDigestError) as err:
+        logger.warning("Cannot write the digest of %s: %s", aip_mets_location, err)
     return {
         "sip_uuid": sip_uuid,
         "extracted_aip_dir": extracted_aip_dir,
@@ -800,13 +1180,369 @@ def get_ingest_result(api_clients_config, sip_uuid):
     }
 
 
+class AIPResultCache:
+    """Keep the AIPs created from sample transfers on disk across test runs.
+
+    Entries are keyed by the sample transfer path, the transfer type, the
+    processing configuration, the occurrence of the sample transfer step in the
+    run (so that each step gets an AIP of its own) and ``fingerprint``, a dict
+    describing the AM and SS instances (URLs, versions and commits). AIPs of
+    scenarios that modify them (key ``None``) are never cached, since the
+    cached copy would no longer match the Storage Service. Each entry is a
+    directory holding a copy of the AIP, compressed if it has not been
+    extracted yet (see ``lazy_aip.LazyAIP``) and extracted otherwise, and the
+    digest of its METS file next to it. The index holds the transfer dicts.
+    Loading an entry copies it to a new temporary directory, so scenarios can
+    modify the AIP freely, and parses its metadata CSV files again.
+
+    The least recently used entries are evicted once the cache is larger than
+    ``max_bytes``. The cache is disabled while ``path`` is ``None``. When
+    ``refresh`` is set, entries are never read but are still written.
+    """
+
+    index_filename = "index.json"
+
+    def __init__(self, path=None, max_bytes=5 * 1024**3, refresh=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.fingerprint = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get_key(
+        self, sample_transfer_path, transfer_type, processing_config, occurrence
+    ):
+        """Return the key of an AIP, or ``None`` if ``occurrence`` is ``None``,
+        meaning that the AIP must not be cached.
+        """
+        if occurrence is None:
+            return None
+        fields = dict(
+            self.fingerprint,
+            sample_transfer_path=sample_transfer_path,
+            transfer_type=transfer_type,
+            processing_config=processing_config,
+            occurrence=occurrence,
+        )
+        return hashlib.sha256(
+            json.dumps(fields, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key):
+        """Return a copy of the transfer dict cached under ``key`` or
+        ``None``.
+        """
+        if self.path is None or key is None:
+            return None
+        with self._lock:
+            index = self._read_index()
+            entry = index.get(key)
+            entry_path = os.path.join(self.path, key)
+            if (
+                self.refresh
+                or entry is None
+                or "aip_name" not in entry
+                or not os.path.exists(
+                    os.path.join(entry_path, entry["archive_name"] or entry["aip_name"])
+                )
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["last_used"] = time.time()
+            self._write_index(index)
+            transfer = dict(entry["transfer"])
+            # Copying preserves modification times, so the digest stays valid.
+            tmp_dir = os.path.join(tempfile.mkdtemp(), key)
+            shutil.copytree(entry_path, tmp_dir)
+        logger.info("Using cached AIP %s", transfer["sip_uuid"])
+        if entry.get("archive_name"):
+            extracted_aip_dir = lazy_aip.LazyAIP(
+                os.path.join(tmp_dir, entry["archive_name"]), extract_dir=tmp_dir
+            )
+            extracted_aip_dir.remove_archive_when_done()
+        else:
+            extracted_aip_dir = os.path.join(tmp_dir, entry["aip_name"])
+        transfer["extracted_aip_dir"] = extracted_aip_dir
+        transfer["aip_mets_location"] = get_aip_mets_location(
+            extracted_aip_dir, transfer["sip_uuid"]
+        )
+        transfer["metadata_csv_files"] = get_metadata_csv_files(
+            transfer["transfer_name"], transfer["transfer_uuid"], extracted_aip_dir
+        )
+        transfer["source_metadata_files"] = get_source_metadata(
+            transfer["transfer_name"], transfer["transfer_uuid"], extracted_aip_dir
+        )
+        return transfer
+
+    def put(self, key, transfer):
+        """Cache the AIP of ``transfer`` under ``key`` if it was created and
+        return ``transfer``.
+        """
+        if self.path is None or key is None or not transfer.get("extracted_aip_dir"):
+            return transfer
+        aip = transfer["extracted_aip_dir"]
+        archive_name = None
+        if isinstance(aip, lazy_aip.LazyAIP):
+            aip_dir = aip.path
+            # Cache the archive rather than extracting all of the AIP for it.
+            if os.path.isfile(aip.archive_path):
+                archive_name = os.path.basename(aip.archive_path)
+            else:
+                aip_dir = aip.extract_all()
+        else:
+            aip_dir = aip
+        aip_name = os.path.basename(aip_dir)
+        with self._lock:
+            entry_path = os.path.join(self.path, key)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            os.makedirs(entry_path)
+            if archive_name:
+                shutil.copy2(aip.archive_path, os.path.join(entry_path, archive_name))
+            else:
+                shutil.copytree(aip_dir, os.path.join(entry_path, aip_name))
+            # The digest of an AIP METS file is kept next to the AIP directory.
+            digest_path = self._get_digest_path(aip_dir, transfer["sip_uuid"])
+            if os.path.isfile(digest_path):
+                shutil.copy2(
+                    digest_path,
+                    self._get_digest_path(
+                        os.path.join(entry_path, aip_name), transfer["sip_uuid"]
+                    ),
+                )
+            index = self._read_index()
+            index[key] = {
+                "size": self._get_size(entry_path),
+                "last_used": time.time(),
+                "aip_name": aip_name,
+                "archive_name": archive_name,
+                "transfer": {
+                    "transfer_uuid": transfer["transfer_uuid"],
+                    "transfer_name": transfer["transfer_name"],
+                    "transfer_path": transfer["transfer_path"],
+                    "sip_uuid": transfer["sip_uuid"],
+                },
+            }
+            self._evict(index, keep=key)
+            self._write_index(index)
+        return transfer
+
+    def _evict(self, index, keep):
+        by_last_used = sorted(index, key=lambda k: index[k]["last_used"])
+        total_size = sum(entry["size"] for entry in index.values())
+        for key in by_last_used:
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = index.pop(key)
+            total_size -= entry["size"]
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            self.evictions += 1
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.path, self.index_filename)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, self.index_filename)
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(f"{index_path}.tmp", index_path)
+
+    @staticmethod
+    def _get_digest_path(aip_dir, sip_uuid):
+        return mets_digest.get_digest_path(
+            os.path.join(aip_dir, "data", f"METS.{sip_uuid}.xml")
+        )
+
+    @staticmethod
+    def _get_size(path):
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        return sum(
+            os.path.getsize(os.path.join(dirpath, filename))
+            for dirpath, _, filenames in os.walk(path)
+            for filename in filenames
+        )
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+aip_result_cache = AIPResultCache()
+
+
+class METSCache:
+    """Share the parsed AIP METS files between the steps of a run.
+
+    Parsed documents, either ``lxml`` trees, ``metsrw.METSDocument``
+    instances, ``METSFileSummary`` instances or ``METSDigest`` instances, are
+    cached by path and reused while the size and modification time of the
+    file stay the same. Since a parsed document takes several times the size
+    of its file in memory, each entry is accounted as ``size_factor`` times
+    its file size and the least recently used entries are evicted once the
+    total exceeds ``max_bytes``. Callers must not modify the documents they
+    get.
+    """
+
+    def __init__(self, max_bytes=512 * 1024**2, size_factor=10):
+        self.max_bytes = max_bytes
+        self.size_factor = size_factor
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (kind, path) => ((mtime, size), document, estimated bytes)
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._tmp_dir = None
+
+    def get_tree(self, path):
+        """Return the ``lxml`` element tree of the METS file at ``path``."""
+        return self._get("lxml", path, etree.parse)
+
+    def get_mets_document(self, path):
+        """Return the ``metsrw.METSDocument`` of the METS file at ``path``."""
+        return self._get("metsrw", path, metsrw.METSDocument.fromfile)
+
+    def get_file_summary(self, path):
+        """Return the ``METSFileSummary`` of the METS file at ``path``, read
+        from its digest. It is much smaller than the document, so it is
+        accounted as its file size.
+        """
+        return self._get(
+            "summary",
+            path,
+            lambda path: self.get_digest(path).get_file_summary(),
+            size_factor=1,
+        )
+
+    def get_digest(self, path):
+        """Return the ``METSDigest`` of the METS file at ``path``. If there is
+        no up to date digest next to it, it is written from the parsed METS
+        file, or to a temporary directory if that location is not writable.
+        The digest is on disk, so it is not accounted.
+        """
+        return self._get("digest", path, self._load_digest, size_factor=0)
+
+    def _load_digest(self, path):
+        digest = mets_digest.METSDigest.load(path)
+        if digest is not None:
+            return digest
+        tmp_digest_path = self._get_tmp_digest_path(path)
+        digest = mets_digest.METSDigest.load(path, path=tmp_digest_path)
+        if digest is not None:
+            return digest
+        tree = self.get_tree(path)
+        try:
+            return mets_digest.METSDigest.build(path, tree)
+        except (OSError, mets_digest.METSDigestError) as err:
+            logger.info(
+                "Writing the digest of %s to a temporary directory: %s", path, err
+            )
+            return mets_digest.METSDigest.build(path, tree, path=tmp_digest_path)
+
+    def _get_tmp_digest_path(self, path):
+        """Return the path of the digest of the METS file at ``path`` in the
+        temporary directory of the cache, which is removed at exit.
+        """
+        with self._lock:
+            if self._tmp_dir is None:
+                self._tmp_dir = tempfile.mkdtemp()
+                weakref.finalize(self, shutil.rmtree, self._tmp_dir, True)
+        name = hashlib.sha1(path.encode("utf8")).hexdigest()
+        return os.path.join(self._tmp_dir, name + mets_digest.DIGEST_SUFFIX)
+
+    def _get(self, kind, path, parse, size_factor=None):
+        path = os.fspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = (kind, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                logger.debug("METS cache hit for %s (%s)", path, kind)
+                return entry[1]
+            self.misses += 1
+        logger.debug("METS cache miss for %s (%s)", path, kind)
+        document = parse(path)
+        if size_factor is None:
+            size_factor = self.size_factor
+        entry_size = stat.st_size * size_factor
+        with self._lock:
+            self._discard(key)
+            if entry_size <= self.max_bytes:
+                self._entries[key] = (stamp, document, entry_size)
+                self._size += entry_size
+                while self._size > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+                    self.evictions += 1
+        return document
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "estimated_bytes": self._size,
+        }
+
+
+mets_cache = METSCache()
+
+
 def create_sample_transfer(
-    api_clients_config, sample_transfer_path, transfer_type="standard"
+    api_clients_config, sample_transfer_path, transfer_type="standard", occurrence=None
 ):
+    """Create an AIP from a sample transfer, or reuse the AIP in the AIP cache
+    for the ``occurrence``-th sample transfer step with this path and type.
+    The cache is not used if ``occurrence`` is ``None``, e.g., because the
+    scenario modifies the AIP.
+    """
+    cache_key = aip_result_cache.get_key(
+        sample_transfer_path, transfer_type, "automated", occurrence
+    )
+    transfer = aip_result_cache.get(cache_key)
+    if transfer is not None:
+        return transfer
     transfer = start_sample_transfer(
         api_clients_config, sample_transfer_path, transfer_type=transfer_type
     )
     transfer_result = get_transfer_result(api_clients_config, transfer["transfer_uuid"])
+    return aip_result_cache.put(
+        cache_key, add_transfer_result(transfer, transfer_result)
+    )
+
+
+def add_transfer_result(transfer, transfer_result):
+    """Update a started ``transfer`` with the AIP details in
+    ``transfer_result``, which is empty if the transfer or ingest failed.
+    """
     if not transfer_result:
         return transfer
     transfer["sip_uuid"] = transfer_result["sip_uuid"]
@@ -1025,18 +1761,15 @@ def get_metadata_csv_files(transfer_name, transfer_uuid, extracted_aip_dir):
     filename = "metadata.csv"
     # Look in the top level metadata directory first which is where metadata
     # only reingests will place the following updated files
-    csv_path = os.path.join(extracted_aip_dir, "data", "objects", "metadata", filename)
+    metadata_dir = get_aip_file_location(
+        extracted_aip_dir, os.path.join("data", "objects", "metadata")
+    )
+    csv_path = os.path.join(metadata_dir, filename)
     if not os.path.exists(csv_path):
         # Look in the metadata/transfers directory which is where the initial
         # ingest will place the original metadata XML files
         csv_path = os.path.join(
-            extracted_aip_dir,
-            "data",
-            "objects",
-            "metadata",
-            "transfers",
-            f"{transfer_name}-{transfer_uuid}",
-            filename,
+            metadata_dir, "transfers", f"{transfer_name}-{transfer_uuid}", filename
         )
         if not os.path.exists(csv_path):
             return []
@@ -1068,18 +1801,15 @@ def get_source_metadata(transfer_name, transfer_uuid, extracted_aip_dir):
     filename = "source-metadata.csv"
     # Look in the top level metadata directory first which is where metadata
     # only reingests will place the following updated metadata XML files
-    csv_path = os.path.join(extracted_aip_dir, "data", "objects", "metadata", filename)
+    metadata_dir = get_aip_file_location(
+        extracted_aip_dir, os.path.join("data", "objects", "metadata")
+    )
+    csv_path = os.path.join(metadata_dir, filename)
     if not os.path.exists(csv_path):
         # Look in the metadata/transfers directory which is where the initial
         # ingest will place the original metadata XML files
         csv_path = os.path.join(
-            extracted_aip_dir,
-            "data",
-            "objects",
-            "metadata",
-            "transfers",
-            f"{transfer_name}-{transfer_uuid}",
-            filename,
+            metadata_dir, "transfers", f"{transfer_name}-{transfer_uuid}", filename
         )
         if not os.path.exists(csv_path):
             return []
@@ -1210,25 +1940,147 @@ def find_aip_by_transfer_metadata(
     return result
 
 
-def assert_equal_lxml_elements(a, b):
-    # Compare tag and text contents.
-    assert a.tag == b.tag, f"Tags of {a} and {b} did not match"
-    assert a.text == b.text, f"Text of {a} and {b} did not match"
+# Attributes that metsrw regenerates with sequential and UUID based
+# identifiers.
+IGNORED_LXML_ATTRIBUTES = ("ID", "FILEID")
+
+
+def get_lxml_element_digests(element, ignored_attributes=IGNORED_LXML_ATTRIBUTES):
+    """Return a dict that maps ``element`` and each of its descendants to a
+    digest of its subtree: its tag, text, attributes (except
+    ``ignored_attributes``) and, in order, the digests of its children.
+    Digests are computed bottom-up in a single pass, so two subtrees are equal
+    if and only if (barring collisions) their digests are.
+    """
+    digests = {}
+    # Descendants come after their ancestors in document order.
+    for el in reversed(list(element.iter())):
+        attributes = sorted(
+            (k, v) for k, v in el.attrib.items() if k not in ignored_attributes
+        )
+        canonical = repr(
+            (str(el.tag), el.text, attributes, [digests[child] for child in el])
+        )
+        digests[el] = hashlib.sha256(canonical.encode("utf-8")).digest()
+    return digests
 
-    # Compare amount of children on both elements.
-    assert len(a) == len(b), f"Amount of children of {a} and {b} did not match"
 
-    # Compare attributes.
-    d_a = dict(a.attrib)
-    d_b = dict(b.attrib)
+def get_lxml_element_differences(a, b, ignored_attributes=IGNORED_LXML_ATTRIBUTES):
+    """Return the differences between the lxml elements ``a`` and ``b`` as a
+    list of messages that start with the path of the differing element.
+
+    Identical subtrees are recognized by their digests (see
+    ``get_lxml_element_digests``) and skipped. The children of differing
+    elements are aligned by their digests first and then by their tags and
+    attributes, so a child that was added or removed is reported once instead
+    of as a difference in every following sibling.
+    """
+    digests_a = get_lxml_element_digests(a, ignored_attributes)
+    digests_b = get_lxml_element_digests(b, ignored_attributes)
+
+    def get_attributes(el):
+        return {k: v for k, v in el.attrib.items() if k not in ignored_attributes}
+
+    def get_shallow_key(el):
+        return (str(el.tag), tuple(sorted(get_attributes(el).items())))
+
+    def align(children_a, children_b, path, key_a, key_b):
+        """Yield pairs of children to compare and messages about the children
+        that only one of the elements has.
+        """
+        matcher = difflib.SequenceMatcher(
+            a=[key_a(child) for child in children_a],
+            b=[key_b(child) for child in children_b],
+            autojunk=False,
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "replace" and key_a is not get_shallow_key:
+                yield from align(
+                    children_a[i1:i2],
+                    children_b[j1:j2],
+                    path,
+                    get_shallow_key,
+                    get_shallow_key,
+                )
+                continue
+            if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+                yield from zip(children_a[i1:i2], children_b[j1:j2])
+                continue
+            for child in children_a[i1:i2]:
+                yield f"{path}/{_get_lxml_path_step(child)}: only in the first element"
+            for child in children_b[j1:j2]:
+                yield f"{path}/{_get_lxml_path_step(child)}: only in the second element"
+
+    differences = []
+    pending = [(a, b)]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            differences.append(item)
+            continue
+        el_a, el_b = item
+        if digests_a[el_a] == digests_b[el_b]:
+            continue
+        path = _get_lxml_path(el_a, a)
+        if el_a.tag != el_b.tag:
+            differences.append(f"{path}: tag {el_a.tag} != {el_b.tag}")
+            continue
+        if el_a.text != el_b.text:
+            differences.append(f"{path}: text {el_a.text!r} != {el_b.text!r}")
+        attributes_a = get_attributes(el_a)
+        attributes_b = get_attributes(el_b)
+        if attributes_a != attributes_b:
+            differences.append(f"{path}: attributes {attributes_a} != {attributes_b}")
+        # Reversed so that differences are reported in document order.
+        pending.extend(
+            reversed(
+                list(
+                    align(
+                        list(el_a),
+                        list(el_b),
+                        path,
+                        digests_a.__getitem__,
+                        digests_b.__getitem__,
+                    )
+                )
+            )
+        )
+    return differences
+
+
+def _get_lxml_path(el, root):
+    """Return the path of ``el`` from ``root``, e.g.
+    ``mets:structMap/mets:div[1]/mets:div[2]``.
+    """
+    steps = [_get_lxml_path_step(el)]
+    while el is not root:
+        el = el.getparent()
+        steps.append(_get_lxml_path_step(el))
+    return "/".join(reversed(steps))
 
-    # Ignore attributes that metsrw regenerates with sequential and UUID
-    # based identifiers.
-    for attr_to_ignore in ["ID", "FILEID"]:
-        d_a.pop(attr_to_ignore, None)
-        d_b.pop(attr_to_ignore, None)
 
-    assert d_a == d_b, f"Attributes of {a} and {b} did not match"
+def _get_lxml_path_step(el):
+    """Return e.g. ``mets:div[2]`` for the second ``mets:div`` child of the
+    parent of ``el``.
+    """
+    if not isinstance(el.tag, str):
+        return "comment()"
+    name = etree.QName(el).localname
+    if el.prefix:
+        name = f"{el.prefix}:{name}"
+    parent = el.getparent()
+    if parent is None:
+        return name
+    position = 1 + sum(1 for _ in el.itersiblings(el.tag, preceding=True))
+    return f"{name}[{position}]"
+
 
-    for i, j in zip(a, b):
-        assert_equal_lxml_elements(i, j)
+def assert_equal_lxml_elements(a, b):
+    """Assert that the lxml elements ``a`` and ``b`` have the same tags, texts
+    and attributes (except ``IGNORED_LXML_ATTRIBUTES``) throughout their
+    subtrees, reporting all the differences at once.
+    """
+    differences = get_lxml_element_differences(a, b)
+    assert not differences, "{} and {} do not match:\n  {}".format(
+        a, b, "\n  ".join(differences)
+    )
@@ -207,6 +207,8 @@ def step_impl(context):
     """
     mets = context.scenario.mets
     ns = context.am_user.mets.mets_nsmap
+    xpaths = context.am_user.mets.xpaths
+    index = context.am_user.mets.get_index(mets)
     for type_, xpath in (
         ("physical", './/mets:structMap[@TYPE="physical"]'),
         ("logical", './/mets:structMap[@LABEL="Normative Directory Structure"]'),
@@ -220,7 +222,9 @@ def step_impl(context):
             ):
                 continue
             dirname = os.path.basename(dirpath)
-            mets_div_el = struct_map_el.find(f'.//mets:div[@LABEL="{dirname}"]', ns)
+            mets_div_el = xpaths.first(
+                xpaths.descendant_div, struct_map_el, label=dirname
+            )
             assert (
                 mets_div_el is not None
             ), f"Could not find a <mets:div> for directory at {dirpath} in {type_}-type structmap"
@@ -230,7 +234,7 @@ def step_impl(context):
             ):
                 continue
             dmdid = mets_div_el.get("DMDID")
-            dmdSec_el = mets.find(f'.//mets:dmdSec[@ID="{dmdid}"]', ns)
+            dmdSec_el = index.dmd_secs.get(dmdid)
             assert (
                 dmdSec_el is not None
             ), f"Could not find a <mets:dmdSec> for directory at {dirpath} in {type_}-type structmap"
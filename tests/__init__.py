@@ -0,0 +1,15 @@
+"""Unit tests of the helpers of the AMAUAT suite. They do not need an
+Archivematica instance; run them from the root of the repository with::
+
+    $ python -m unittest discover -s tests -t .
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The steps modules import the behave environment module as ``environment``.
+for path in (ROOT, os.path.join(ROOT, "features")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,77 @@
+"""Local stub HTTP server for the tests of the API helpers."""
+
+import http.server
+import json
+import threading
+
+
+class StubServer:
+    """HTTP server on a free local port that answers requests with the
+    function registered for their method and path, e.g.::
+
+        >>> server = StubServer()
+        >>> server.route("GET", "/api/ping/", lambda request: (200, {"ok": True}))
+        >>> with server:
+        ...     requests.get(f"{server.url}api/ping/").json()
+        {'ok': True}
+
+    Handlers take the request handler and return a status code and a JSON
+    body (or ``None``). Every request is recorded in ``requests`` as a
+    ``(method, path)`` tuple.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), self._get_handler_class()
+        )
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def route(self, method, path, handler):
+        self.routes[(method, path)] = handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _get_handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def _respond(self):
+                path = self.path.split("?")[0]
+                with server._lock:
+                    server.requests.append((self.command, path))
+                handler = server.routes.get((self.command, path))
+                if handler is None:
+                    status, body = 404, {"error": True}
+                else:
+                    status, body = handler(self)
+                content = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(content)
+
+            do_GET = do_HEAD = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
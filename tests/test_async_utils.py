@@ -0,0 +1,111 @@
+import asyncio
+import collections
+import threading
+import time
+import unittest
+from unittest import mock
+
+from features.steps import async_utils
+from features.steps import utils
+
+from .stub_server import StubServer
+
+UNIT_UUIDS = [f"00000000-0000-0000-0000-{i:012d}" for i in range(20)]
+
+
+def get_api_clients_config(url):
+    return {
+        "archivematica": {"url": url.rstrip("/"), "username": "test", "api_key": "k"},
+        "storage_service": {"url": url.rstrip("/"), "username": "test", "api_key": "k"},
+    }
+
+
+class AsyncAPIClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.api_clients_config = get_api_clients_config(self.server.url)
+        self.poller = utils.UnitStatusPoller(min_interval=0.01, max_interval=0.05)
+
+    def route_status(self, unit, unit_uuid, statuses):
+        """Answer the status requests of the unit with ``statuses`` in turn,
+        repeating the last one.
+        """
+        responses = collections.deque(statuses)
+
+        def handler(request):
+            status = responses.popleft() if len(responses) > 1 else responses[0]
+            return 200, {"status": status, "uuid": unit_uuid, "sip_uuid": unit_uuid}
+
+        self.server.route("GET", f"/api/{unit}/status/{unit_uuid}/", handler)
+
+    def test_wait_for_unit(self):
+        for unit_uuid in UNIT_UUIDS:
+            self.route_status(
+                "transfer", unit_uuid, ["PROCESSING", "PROCESSING", "COMPLETE"]
+            )
+        self.route_status("ingest", UNIT_UUIDS[0], ["PROCESSING", "FAILED"])
+
+        async def wait_for_all():
+            async with async_utils.AsyncAPIClient(
+                self.api_clients_config, max_concurrency=4, poller=self.poller
+            ) as client:
+                return await asyncio.gather(
+                    client.wait_for_unit(UNIT_UUIDS[0], "ingest"),
+                    *(client.wait_for_unit(unit_uuid) for unit_uuid in UNIT_UUIDS),
+                )
+
+        ingest, *transfers = asyncio.run(wait_for_all())
+        self.assertEqual(ingest["status"], "FAILED")
+        self.assertEqual([t["status"] for t in transfers], ["COMPLETE"] * 20)
+        self.assertEqual([t["uuid"] for t in transfers], UNIT_UUIDS)
+        requests = collections.Counter(self.server.requests)
+        for unit_uuid in UNIT_UUIDS:
+            self.assertEqual(requests[("GET", f"/api/transfer/status/{unit_uuid}/")], 3)
+
+    def test_wait_for_unit_error(self):
+        # Unknown units get a 404, which is retried and then raised.
+        async def wait():
+            async with async_utils.AsyncAPIClient(
+                self.api_clients_config, poller=self.poller
+            ) as client:
+                return await client.wait_for_unit(UNIT_UUIDS[0])
+
+        with mock.patch.object(utils.environment, "OPTIMISTIC_WAIT", 0):
+            with self.assertLogs(utils.logger, "WARNING"):
+                with self.assertRaises(utils.environment.EnvironmentError):
+                    asyncio.run(wait())
+
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def handler(request):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return 200, {"status": "PROCESSING"}
+
+        for unit_uuid in UNIT_UUIDS:
+            self.server.route("GET", f"/api/transfer/status/{unit_uuid}/", handler)
+
+        async def check_all():
+            async with async_utils.AsyncAPIClient(
+                self.api_clients_config, max_concurrency=3
+            ) as client:
+                return await asyncio.gather(
+                    *(client.check_unit_status(unit_uuid) for unit_uuid in UNIT_UUIDS)
+                )
+
+        responses = asyncio.run(check_all())
+        self.assertEqual([r["status"] for r in responses], ["PROCESSING"] * 20)
+        self.assertEqual(max_in_flight[0], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
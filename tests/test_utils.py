@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+
+from amuser import utils
+
+from .stub_server import StubServer
+
+
+class GetUnresolvedURLsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def test_get_unresolved_urls(self):
+        def slow_head(request):
+            time.sleep(0.5)
+            return 200, None
+
+        self.server.route("HEAD", "/ok/", lambda request: (200, None))
+        # Resolvers that do not implement HEAD, or that are too slow at it.
+        self.server.route("HEAD", "/no-head/", lambda request: (405, None))
+        self.server.route("GET", "/no-head/", lambda request: (200, {}))
+        self.server.route("HEAD", "/slow-head/", slow_head)
+        self.server.route("GET", "/slow-head/", lambda request: (200, {}))
+        urls = [
+            f"{self.server.url}{path}"
+            for path in ("ok/", "no-head/", "slow-head/", "missing/", "ok/")
+        ]
+
+        unresolved = utils.get_unresolved_urls(urls, timeout=0.2)
+
+        self.assertEqual(unresolved, {f"{self.server.url}missing/": "status code 404"})
+        self.assertEqual(self.server.requests.count(("HEAD", "/ok/")), 1)
+        self.assertNotIn(("GET", "/ok/"), self.server.requests)
+        self.assertIn(("GET", "/slow-head/"), self.server.requests)
+        self.assertFalse(utils.all_urls_resolve(urls))
+        self.assertTrue(utils.all_urls_resolve(urls[:3]))
+
+    def test_per_host_limits(self):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+        request_times = []
+
+        def handler(request):
+            with lock:
+                request_times.append(time.monotonic())
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return 200, None
+
+        urls = []
+        for i in range(12):
+            self.server.route("HEAD", f"/{i}/", handler)
+            urls.append(f"{self.server.url}{i}/")
+
+        unresolved = utils.get_unresolved_urls(
+            urls, max_workers=8, max_per_host=3, max_rate_per_host=40
+        )
+
+        self.assertEqual(unresolved, {})
+        self.assertLessEqual(max_in_flight[0], 3)
+        request_times.sort()
+        # 12 requests at 40 per second take at least 11 / 40 seconds.
+        self.assertGreaterEqual(request_times[-1] - request_times[0], 11 / 40 - 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()